@@ -0,0 +1,51 @@
+"""
+Ambiente do Alembic
+
+Roda com a conexão recebida em config.attributes["connection"] (startup da
+API/worker via app.core.migrations) ou, na linha de comando, com o engine
+assíncrono da aplicação.
+"""
+import asyncio
+from alembic import context
+from sqlalchemy.engine import Connection
+from app.core.database import Base, engine
+import app.models  # noqa: F401  (registra todos os modelos)
+
+config = context.config
+target_metadata = Base.metadata
+
+
+def do_run_migrations(connection: Connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        compare_type=True
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations():
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+        await connection.commit()
+    await engine.dispose()
+
+
+def run_migrations_offline():
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"}
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+elif config.attributes.get("connection") is not None:
+    do_run_migrations(config.attributes["connection"])
+else:
+    asyncio.run(run_async_migrations())
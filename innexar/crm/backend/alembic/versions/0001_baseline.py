@@ -0,0 +1,334 @@
+"""Esquema inicial (tabelas existentes antes do Alembic)
+
+Bancos criados com Base.metadata.create_all são marcados nesta revisão
+(stamp) por app.core.migrations em vez de recriar as tabelas.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('commission_structures',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('weekly_base', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('currency', sa.String(), nullable=True),
+    sa.Column('tiered_commissions', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('performance_bonuses', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('recurring_commission_rate', sa.Numeric(precision=5, scale=4), nullable=True),
+    sa.Column('new_client_bonus', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('new_client_threshold', sa.Integer(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_commission_structures_id'), 'commission_structures', ['id'], unique=False)
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('password_hash', sa.String(), nullable=False),
+    sa.Column('role', sa.String(length=20), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_table('ai_chat_messages',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('role', sa.String(length=20), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('message_metadata', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_ai_chat_messages_id'), 'ai_chat_messages', ['id'], unique=False)
+    op.create_table('ai_configs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('provider', sa.String(length=50), nullable=False),
+    sa.Column('model_name', sa.String(length=100), nullable=False),
+    sa.Column('api_key', sa.Text(), nullable=True),
+    sa.Column('base_url', sa.String(length=500), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('is_default', sa.Boolean(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('priority', sa.Integer(), nullable=True),
+    sa.Column('config', sa.JSON(), nullable=True),
+    sa.Column('created_by_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('last_tested_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_ai_configs_id'), 'ai_configs', ['id'], unique=False)
+    op.create_table('contacts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('email', sa.String(), nullable=True),
+    sa.Column('phone', sa.String(), nullable=True),
+    sa.Column('company', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('project_type', sa.String(), nullable=True),
+    sa.Column('budget_range', sa.String(), nullable=True),
+    sa.Column('timeline', sa.String(), nullable=True),
+    sa.Column('website', sa.String(), nullable=True),
+    sa.Column('linkedin', sa.String(), nullable=True),
+    sa.Column('position', sa.String(), nullable=True),
+    sa.Column('industry', sa.String(), nullable=True),
+    sa.Column('company_size', sa.String(), nullable=True),
+    sa.Column('source', sa.String(), nullable=True),
+    sa.Column('contact_metadata', sa.Text(), nullable=True),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_contacts_email'), 'contacts', ['email'], unique=False)
+    op.create_index(op.f('ix_contacts_id'), 'contacts', ['id'], unique=False)
+    op.create_index(op.f('ix_contacts_name'), 'contacts', ['name'], unique=False)
+    op.create_table('goals',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('goal_type', sa.Enum('INDIVIDUAL', 'TEAM', 'DEPARTMENT', name='goaltype'), nullable=True),
+    sa.Column('category', sa.Enum('REVENUE', 'DEALS', 'ACTIVITIES', 'CONVERSION_RATE', 'NEW_CLIENTS', 'CUSTOM', name='goalcategory'), nullable=True),
+    sa.Column('period', sa.Enum('DAILY', 'WEEKLY', 'MONTHLY', 'QUARTERLY', 'YEARLY', name='goalperiod'), nullable=True),
+    sa.Column('target_value', sa.Float(), nullable=False),
+    sa.Column('current_value', sa.Float(), nullable=True),
+    sa.Column('unit', sa.String(length=50), nullable=True),
+    sa.Column('creator_id', sa.Integer(), nullable=False),
+    sa.Column('assignee_id', sa.Integer(), nullable=True),
+    sa.Column('start_date', sa.DateTime(), nullable=False),
+    sa.Column('end_date', sa.DateTime(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.Enum('ACTIVE', 'PAUSED', 'COMPLETED', 'EXPIRED', name='goalstatus'), nullable=True),
+    sa.Column('progress_percentage', sa.Float(), nullable=True),
+    sa.Column('reward_description', sa.Text(), nullable=True),
+    sa.Column('penalty_description', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['assignee_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['creator_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_goals_id'), 'goals', ['id'], unique=False)
+    op.create_table('notifications',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('message', sa.Text(), nullable=False),
+    sa.Column('type', sa.String(length=50), nullable=True),
+    sa.Column('recipient_id', sa.Integer(), nullable=False),
+    sa.Column('related_entity_type', sa.String(length=50), nullable=True),
+    sa.Column('related_entity_id', sa.Integer(), nullable=True),
+    sa.Column('is_read', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('read_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['recipient_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_notifications_id'), 'notifications', ['id'], unique=False)
+    op.create_table('lead_analyses',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('contact_id', sa.Integer(), nullable=False),
+    sa.Column('company_info', sa.Text(), nullable=True),
+    sa.Column('market_analysis', sa.Text(), nullable=True),
+    sa.Column('financial_insights', sa.Text(), nullable=True),
+    sa.Column('recommendations', sa.Text(), nullable=True),
+    sa.Column('risk_assessment', sa.Text(), nullable=True),
+    sa.Column('opportunity_score', sa.Integer(), nullable=True),
+    sa.Column('analysis_metadata', sa.JSON(), nullable=True),
+    sa.Column('ai_model_used', sa.String(length=100), nullable=True),
+    sa.Column('analysis_status', sa.String(length=20), nullable=True),
+    sa.Column('error_message', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('analyzed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['contact_id'], ['contacts.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('contact_id')
+    )
+    op.create_index(op.f('ix_lead_analyses_id'), 'lead_analyses', ['id'], unique=False)
+    op.create_table('opportunities',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('contact_id', sa.Integer(), nullable=False),
+    sa.Column('value', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('stage', sa.String(), nullable=True),
+    sa.Column('probability', sa.Integer(), nullable=True),
+    sa.Column('expected_close_date', sa.Date(), nullable=True),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['contact_id'], ['contacts.id'], ),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_opportunities_id'), 'opportunities', ['id'], unique=False)
+    op.create_index(op.f('ix_opportunities_name'), 'opportunities', ['name'], unique=False)
+    op.create_table('projects',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('contact_id', sa.Integer(), nullable=False),
+    sa.Column('opportunity_id', sa.Integer(), nullable=True),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('planning_owner_id', sa.Integer(), nullable=True),
+    sa.Column('dev_owner_id', sa.Integer(), nullable=True),
+    sa.Column('project_type', sa.Enum('MARKETING_SITE', 'SAAS_PLATFORM', 'ENTERPRISE_SOFTWARE', 'CUSTOM_DEVELOPMENT', 'CONSULTING', 'OTHER', name='projecttype'), nullable=True),
+    sa.Column('status', sa.Enum('LEAD', 'QUALIFICACAO', 'PROPOSTA', 'APROVADO', 'EM_PLANEJAMENTO', 'PLANEJAMENTO_CONCLUIDO', 'EM_DESENVOLVIMENTO', 'EM_REVISAO', 'CONCLUIDO', 'CANCELADO', name='projectstatus'), nullable=True),
+    sa.Column('estimated_value', sa.String(), nullable=True),
+    sa.Column('approved_value', sa.String(), nullable=True),
+    sa.Column('start_date', sa.DateTime(), nullable=True),
+    sa.Column('expected_delivery_date', sa.DateTime(), nullable=True),
+    sa.Column('actual_delivery_date', sa.DateTime(), nullable=True),
+    sa.Column('technical_requirements', sa.Text(), nullable=True),
+    sa.Column('tech_stack', sa.String(), nullable=True),
+    sa.Column('repository_url', sa.String(), nullable=True),
+    sa.Column('deployment_url', sa.String(), nullable=True),
+    sa.Column('internal_notes', sa.Text(), nullable=True),
+    sa.Column('planning_notes', sa.Text(), nullable=True),
+    sa.Column('dev_notes', sa.Text(), nullable=True),
+    sa.Column('client_notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_to_planning_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_to_dev_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['contact_id'], ['contacts.id'], ),
+    sa.ForeignKeyConstraint(['dev_owner_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['opportunity_id'], ['opportunities.id'], ),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['planning_owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_projects_id'), 'projects', ['id'], unique=False)
+    op.create_index(op.f('ix_projects_name'), 'projects', ['name'], unique=False)
+    op.create_index(op.f('ix_projects_status'), 'projects', ['status'], unique=False)
+    op.create_table('activities',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('subject', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('due_date', sa.Date(), nullable=True),
+    sa.Column('due_time', sa.Time(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('contact_id', sa.Integer(), nullable=True),
+    sa.Column('opportunity_id', sa.Integer(), nullable=True),
+    sa.Column('project_id', sa.Integer(), nullable=True),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['contact_id'], ['contacts.id'], ),
+    sa.ForeignKeyConstraint(['opportunity_id'], ['opportunities.id'], ),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_activities_id'), 'activities', ['id'], unique=False)
+    op.create_table('commissions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('seller_id', sa.Integer(), nullable=False),
+    sa.Column('structure_id', sa.Integer(), nullable=True),
+    sa.Column('opportunity_id', sa.Integer(), nullable=True),
+    sa.Column('project_id', sa.Integer(), nullable=True),
+    sa.Column('deal_value', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('commission_rate', sa.Numeric(precision=5, scale=4), nullable=False),
+    sa.Column('commission_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('weekly_base', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('performance_bonus', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('new_client_bonus', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('total_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('payment_date', sa.DateTime(), nullable=True),
+    sa.Column('payment_period', sa.String(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['opportunity_id'], ['opportunities.id'], ),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+    sa.ForeignKeyConstraint(['seller_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['structure_id'], ['commission_structures.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_commissions_id'), 'commissions', ['id'], unique=False)
+    op.create_table('quote_requests',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('seller_id', sa.Integer(), nullable=False),
+    sa.Column('planning_owner_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('seller_notes', sa.Text(), nullable=True),
+    sa.Column('technologies', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('stages', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('estimated_deadline', sa.DateTime(), nullable=True),
+    sa.Column('estimated_hours', sa.Integer(), nullable=True),
+    sa.Column('technical_specs', sa.Text(), nullable=True),
+    sa.Column('ai_generated', sa.Boolean(), nullable=True),
+    sa.Column('estimated_value', sa.String(), nullable=True),
+    sa.Column('breakdown', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('seller_notified_at', sa.DateTime(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['planning_owner_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+    sa.ForeignKeyConstraint(['seller_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_quote_requests_id'), 'quote_requests', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_quote_requests_id'), table_name='quote_requests')
+    op.drop_table('quote_requests')
+    op.drop_index(op.f('ix_commissions_id'), table_name='commissions')
+    op.drop_table('commissions')
+    op.drop_index(op.f('ix_activities_id'), table_name='activities')
+    op.drop_table('activities')
+    op.drop_index(op.f('ix_projects_status'), table_name='projects')
+    op.drop_index(op.f('ix_projects_name'), table_name='projects')
+    op.drop_index(op.f('ix_projects_id'), table_name='projects')
+    op.drop_table('projects')
+    op.drop_index(op.f('ix_opportunities_name'), table_name='opportunities')
+    op.drop_index(op.f('ix_opportunities_id'), table_name='opportunities')
+    op.drop_table('opportunities')
+    op.drop_index(op.f('ix_lead_analyses_id'), table_name='lead_analyses')
+    op.drop_table('lead_analyses')
+    op.drop_index(op.f('ix_notifications_id'), table_name='notifications')
+    op.drop_table('notifications')
+    op.drop_index(op.f('ix_goals_id'), table_name='goals')
+    op.drop_table('goals')
+    op.drop_index(op.f('ix_contacts_name'), table_name='contacts')
+    op.drop_index(op.f('ix_contacts_id'), table_name='contacts')
+    op.drop_index(op.f('ix_contacts_email'), table_name='contacts')
+    op.drop_table('contacts')
+    op.drop_index(op.f('ix_ai_configs_id'), table_name='ai_configs')
+    op.drop_table('ai_configs')
+    op.drop_index(op.f('ix_ai_chat_messages_id'), table_name='ai_chat_messages')
+    op.drop_table('ai_chat_messages')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
+    op.drop_index(op.f('ix_commission_structures_id'), table_name='commission_structures')
+    op.drop_table('commission_structures')
+    for enum_name in ("goaltype", "goalcategory", "goalperiod", "goalstatus", "projecttype", "projectstatus"):
+        sa.Enum(name=enum_name).drop(op.get_bind(), checkfirst=True)
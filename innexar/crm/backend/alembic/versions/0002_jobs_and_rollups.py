@@ -0,0 +1,94 @@
+"""Fila de jobs (background_jobs) e agregados do dashboard (pipeline_rollups, activity_rollups)
+
+Bancos marcados na baseline não têm estas tabelas. Bancos de
+desenvolvimento que já as criaram por create_all mantêm as existentes.
+
+Revision ID: 0002_jobs_and_rollups
+Revises: 0001_baseline
+Create Date: 2026-10-18
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0002_jobs_and_rollups"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def _create_background_jobs():
+    op.create_table('background_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_type', sa.String(length=50), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.Column('dedupe_key', sa.String(length=100), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('locked_by', sa.String(length=100), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_background_jobs_dedupe_key', 'background_jobs', ['dedupe_key'], unique=False)
+    op.create_index(op.f('ix_background_jobs_id'), 'background_jobs', ['id'], unique=False)
+    op.create_index('ix_background_jobs_status_run_at', 'background_jobs', ['status', 'run_at'], unique=False)
+
+
+def _create_pipeline_rollups():
+    op.create_table('pipeline_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('stage', sa.String(), nullable=False),
+    sa.Column('opportunity_count', sa.Integer(), nullable=False),
+    sa.Column('total_value', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('weighted_value', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('owner_id', 'stage', name='uq_pipeline_rollups_owner_stage')
+    )
+    op.create_index(op.f('ix_pipeline_rollups_id'), 'pipeline_rollups', ['id'], unique=False)
+
+
+def _create_activity_rollups():
+    op.create_table('activity_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('activity_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('owner_id', 'status', name='uq_activity_rollups_owner_status')
+    )
+    op.create_index(op.f('ix_activity_rollups_id'), 'activity_rollups', ['id'], unique=False)
+
+
+TABLES = (
+    ("background_jobs", _create_background_jobs),
+    ("pipeline_rollups", _create_pipeline_rollups),
+    ("activity_rollups", _create_activity_rollups),
+)
+
+
+def upgrade() -> None:
+    existing = set() if context.is_offline_mode() else set(sa.inspect(op.get_bind()).get_table_names())
+    for table, create in TABLES:
+        if table not in existing:
+            create()
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_activity_rollups_id'), table_name='activity_rollups')
+    op.drop_table('activity_rollups')
+    op.drop_index(op.f('ix_pipeline_rollups_id'), table_name='pipeline_rollups')
+    op.drop_table('pipeline_rollups')
+    op.drop_index('ix_background_jobs_status_run_at', table_name='background_jobs')
+    op.drop_index(op.f('ix_background_jobs_id'), table_name='background_jobs')
+    op.drop_index('ix_background_jobs_dedupe_key', table_name='background_jobs')
+    op.drop_table('background_jobs')
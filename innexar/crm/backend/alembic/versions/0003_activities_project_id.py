@@ -0,0 +1,26 @@
+"""Coluna activities.project_id em bancos antigos
+
+Substitui o script avulso fix_activities_column.py: bancos criados antes da
+coluna existir e marcados na baseline recebem a coluna aqui.
+
+Revision ID: 0003_activities_project_id
+Revises: 0002_jobs_and_rollups
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0003_activities_project_id"
+down_revision = "0002_jobs_and_rollups"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "ALTER TABLE activities ADD COLUMN IF NOT EXISTS project_id INTEGER REFERENCES projects(id)"
+    )
+
+
+def downgrade() -> None:
+    # A coluna faz parte da baseline; nada a desfazer
+    pass
@@ -0,0 +1,58 @@
+"""Índices compostos e parciais para os filtros mais usados
+
+- opportunities (owner_id, stage): pipeline e dashboard por vendedor
+- activities (owner_id, status) e (owner_id, due_date) só das pendentes
+- notifications (recipient_id, is_read, created_at): não lidas / listagem
+- ai_chat_messages (user_id, created_at): histórico do chat
+- commissions (seller_id, payment_period): comissões do vendedor por período
+- lead_analyses (analysis_status) sem as concluídas: fila de análises
+- (created_at, id) nas listagens com paginação por cursor
+
+Os índices são criados sem CONCURRENTLY (a migração roda em transação); em
+tabelas muito grandes, crie-os antes manualmente com CONCURRENTLY e o
+if_not_exists torna esta revisão um no-op. Os planos podem ser conferidos com
+python -m app.scripts.check_index_plans.
+
+Revision ID: 0004_hot_path_indexes
+Revises: 0003_activities_project_id
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_hot_path_indexes"
+down_revision = "0003_activities_project_id"
+branch_labels = None
+depends_on = None
+
+# (nome, tabela, colunas, WHERE do índice parcial)
+INDEXES = (
+    ("ix_contacts_created_at_id", "contacts", ["created_at", "id"], None),
+    ("ix_contacts_owner_id_created_at_id", "contacts", ["owner_id", "created_at", "id"], None),
+    ("ix_opportunities_owner_id_stage", "opportunities", ["owner_id", "stage"], None),
+    ("ix_opportunities_created_at_id", "opportunities", ["created_at", "id"], None),
+    ("ix_activities_owner_id_status", "activities", ["owner_id", "status"], None),
+    ("ix_activities_pending_owner_id_due_date", "activities", ["owner_id", "due_date"], "status = 'pending'"),
+    ("ix_notifications_recipient_id_is_read_created_at", "notifications", ["recipient_id", "is_read", "created_at"], None),
+    ("ix_ai_chat_messages_user_id_created_at", "ai_chat_messages", ["user_id", "created_at"], None),
+    ("ix_commissions_seller_id_payment_period", "commissions", ["seller_id", "payment_period"], None),
+    ("ix_commissions_created_at_id", "commissions", ["created_at", "id"], None),
+    ("ix_lead_analyses_pending_status", "lead_analyses", ["analysis_status"], "analysis_status <> 'completed'"),
+    ("ix_lead_analyses_created_at_id", "lead_analyses", ["created_at", "id"], None),
+)
+
+
+def upgrade() -> None:
+    for name, table, columns, where in INDEXES:
+        op.create_index(
+            name, table, columns,
+            if_not_exists=True,
+            postgresql_where=sa.text(where) if where else None
+        )
+    for table in {table for _, table, _, _ in INDEXES}:
+        op.execute(f"ANALYZE {table}")
+
+
+def downgrade() -> None:
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
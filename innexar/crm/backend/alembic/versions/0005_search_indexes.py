@@ -0,0 +1,65 @@
+"""Extensões e índices da busca (pg_trgm + unaccent)
+
+As expressões indexadas precisam ser idênticas às de app.services.search.
+Sem permissão para criar as extensões a revisão é aplicada sem elas e a
+busca usa ILIKE.
+
+Revision ID: 0005_search_indexes
+Revises: 0004_hot_path_indexes
+Create Date: 2026-10-18
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0005_search_indexes"
+down_revision = "0004_hot_path_indexes"
+branch_labels = None
+depends_on = None
+
+# unaccent() é STABLE; índices de expressão exigem uma função IMMUTABLE
+SEARCH_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text "
+    "AS $$ SELECT public.unaccent('public.unaccent', $1) $$ "
+    "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT",
+)
+
+CONTACT_SEARCH_TEXT = (
+    "immutable_unaccent(lower(coalesce(contacts.name, '') || ' ' || "
+    "coalesce(contacts.email, '') || ' ' || coalesce(contacts.company, '')))"
+)
+OPPORTUNITY_SEARCH_TEXT = "immutable_unaccent(lower(coalesce(opportunities.name, '')))"
+
+SEARCH_INDEXES = (
+    ("ix_contacts_search_tsv", "contacts", f"gin (to_tsvector('simple', {CONTACT_SEARCH_TEXT}))"),
+    ("ix_contacts_search_trgm", "contacts", f"gin ({CONTACT_SEARCH_TEXT} gin_trgm_ops)"),
+    ("ix_opportunities_search_tsv", "opportunities", f"gin (to_tsvector('simple', {OPPORTUNITY_SEARCH_TEXT}))"),
+    ("ix_opportunities_search_trgm", "opportunities", f"gin ({OPPORTUNITY_SEARCH_TEXT} gin_trgm_ops)"),
+)
+
+
+def _statements():
+    yield from SEARCH_DDL
+    for name, table, definition in SEARCH_INDEXES:
+        yield f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING {definition}"
+
+
+def upgrade() -> None:
+    if context.is_offline_mode():
+        for statement in _statements():
+            op.execute(statement)
+        return
+    bind = op.get_bind()
+    try:
+        with bind.begin_nested():
+            for statement in _statements():
+                bind.execute(sa.text(statement))
+    except Exception as e:
+        print(f"⚠️ Busca full-text indisponível (pg_trgm/unaccent), usando ILIKE: {e}")
+
+
+def downgrade() -> None:
+    for name, _, _ in SEARCH_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    op.execute("DROP FUNCTION IF EXISTS immutable_unaccent(text)")
@@ -0,0 +1,24 @@
+"""Índice lower(email) em contacts para a busca por email exato
+
+A busca compara lower(contacts.email) com o termo (sem diferenciar
+maiúsculas); a expressão precisa ser idêntica à de app.services.search.
+
+Revision ID: 0006_contacts_email_lower
+Revises: 0005_search_indexes
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_contacts_email_lower"
+down_revision = "0005_search_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_contacts_email_lower", "contacts", [sa.text("lower(email)")], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_contacts_email_lower", table_name="contacts", if_exists=True)
@@ -0,0 +1,47 @@
+"""Índice único parcial de dedupe_key nos jobs ativos (pending/running)
+
+Antes a deduplicação era um SELECT seguido de INSERT, e dois agendamentos
+simultâneos podiam criar o mesmo job. Jobs ativos já duplicados são
+encerrados como falha antes de criar o índice: fica o que está em execução
+ou, entre pendentes, o mais antigo.
+
+Revision ID: 0007_jobs_active_dedupe
+Revises: 0006_contacts_email_lower
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_jobs_active_dedupe"
+down_revision = "0006_contacts_email_lower"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        UPDATE background_jobs AS job
+        SET status = 'failed', completed_at = now() AT TIME ZONE 'utc', locked_at = NULL, locked_by = NULL,
+            last_error = 'Job duplicado (mesma dedupe_key de outro job ativo)'
+        WHERE job.status IN ('pending', 'running')
+          AND job.dedupe_key IS NOT NULL
+          AND EXISTS (
+              SELECT 1 FROM background_jobs AS other
+              WHERE other.dedupe_key = job.dedupe_key
+                AND other.status IN ('pending', 'running')
+                AND other.id <> job.id
+                AND (other.status = 'running') >= (job.status = 'running')
+                AND ((other.status = 'running') > (job.status = 'running') OR other.id < job.id)
+          )
+        """
+    )
+    op.create_index(
+        "ix_background_jobs_active_dedupe_key", "background_jobs", ["dedupe_key"],
+        unique=True, if_not_exists=True,
+        postgresql_where=sa.text("status IN ('pending', 'running')")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_background_jobs_active_dedupe_key", table_name="background_jobs", if_exists=True)
@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List, Optional
+from sqlalchemy import select, func
+from typing import List, Optional, Union
 from app.core.database import get_db
+from app.core.read_replica import get_read_db
 from app.models.activity import Activity
 from app.models.user import User
 from app.api.dependencies import get_current_user, get_user_role_str
+from app.services.export import export_response, model_columns
+from app.core.pagination import CursorPage, SortKey, apply_offset, paginate, use_cursor
+from app.services.rollup import activity_state, track_activity
 from pydantic import BaseModel
 from datetime import datetime, date, time
 
@@ -43,14 +47,24 @@ class ActivityResponse(ActivityBase):
     class Config:
         from_attributes = True
 
-@router.get("/", response_model=List[ActivityResponse])
+# Por vencimento; atividades sem data/hora ficam no fim (como NULLS LAST)
+ACTIVITY_SORT = SortKey((
+    func.coalesce(Activity.due_date, date.max),
+    func.coalesce(Activity.due_time, time.max),
+    Activity.id
+))
+
+@router.get("/", response_model=Union[CursorPage[ActivityResponse], List[ActivityResponse]])
 async def list_activities(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     skip: int = 0,
     limit: int = 100,
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    pagination: str = "offset",
+    cursor: Optional[str] = None
 ):
+    """Lista atividades por vencimento (pagination=cursor retorna items + next_cursor/prev_cursor)"""
     query = select(Activity)
     if get_user_role_str(current_user) == "vendedor":
         query = query.where(Activity.owner_id == current_user.id)
@@ -58,11 +72,32 @@ async def list_activities(
     if status:
         query = query.where(Activity.status == status)
     
-    query = query.offset(skip).limit(limit).order_by(Activity.due_date, Activity.due_time)
+    if use_cursor(pagination, cursor):
+        page = await paginate(db, query, ACTIVITY_SORT, cursor, limit)
+        page.items = [ActivityResponse.model_validate(activity) for activity in page.items]
+        return page
+    
+    query = apply_offset(query, ACTIVITY_SORT, skip, limit)
     result = await db.execute(query)
     activities = result.scalars().all()
     return [ActivityResponse.model_validate(activity) for activity in activities]
 
+@router.get("/export")
+async def export_activities(
+    format: str = "csv",
+    gzip: bool = False,
+    updated_since: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Exporta atividades em CSV/NDJSON via streaming (vendedor exporta apenas os seus)"""
+    columns = model_columns(Activity)
+    query = select(*columns).order_by(Activity.id)
+    if get_user_role_str(current_user) == "vendedor":
+        query = query.where(Activity.owner_id == current_user.id)
+    if updated_since:
+        query = query.where(Activity.updated_at >= updated_since)
+    return export_response(query, [column.key for column in columns], format, gzip, "activities")
+
 @router.post("/", response_model=ActivityResponse)
 async def create_activity(
     activity_data: ActivityCreate,
@@ -74,6 +109,7 @@ async def create_activity(
         owner_id=current_user.id
     )
     db.add(activity)
+    await track_activity(db, None, activity_state(activity))
     await db.commit()
     await db.refresh(activity)
     return ActivityResponse.model_validate(activity)
@@ -113,9 +149,11 @@ async def update_activity(
     if not activity:
         raise HTTPException(status_code=404, detail="Atividade não encontrada")
     
+    before = activity_state(activity)
     for key, value in activity_data.model_dump(exclude_unset=True).items():
         setattr(activity, key, value)
     
+    await track_activity(db, before, activity_state(activity))
     await db.commit()
     await db.refresh(activity)
     return ActivityResponse.model_validate(activity)
@@ -136,6 +174,7 @@ async def delete_activity(
     if not activity:
         raise HTTPException(status_code=404, detail="Atividade não encontrada")
     
+    await track_activity(db, activity_state(activity), None)
     await db.delete(activity)
     await db.commit()
     return {"message": "Atividade deletada"}
@@ -1,14 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
-from app.core.database import get_db
+from app.core.database import get_db, AsyncSessionLocal
 from app.models.user import User
 from app.models.ai_config import AIConfig, AIModelStatus
 from app.models.ai_chat import AIChatMessage
 from app.api.dependencies import get_current_user, get_user_role_str
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, AsyncIterator, Awaitable, Callable, Type
 import httpx
+from app.core.http_clients import get_http_client
+from app.core.config import settings
+from app.services.llm_cache import llm_cache, llm_cache_key
+from app.services.ai_config_cache import active_ai_config_cache
+from app.services.ai_router import ai_router, get_ai_candidates, AIProviderError
+from app.services.structured_output import (
+    NATIVE_SCHEMA_PROVIDERS,
+    ModelT,
+    StructuredOutputError,
+    output_schema,
+    parse_structured_output,
+    schema_instruction,
+    schema_name,
+)
 import json
 import os
 import re
@@ -20,6 +35,7 @@ class AIRequest(BaseModel):
     prompt: str
     context: Optional[Dict[str, Any]] = None
     max_tokens: int = 1000
+    stream: bool = False  # Resposta em Server-Sent Events, token a token
 
 class GenerateProposalRequest(BaseModel):
     opportunity_id: int
@@ -36,7 +52,11 @@ class GenerateQuoteRequest(BaseModel):
     estimated_hours: int
 
 async def get_active_ai_config(db: AsyncSession) -> Optional[AIConfig]:
-    """Busca a configuração de IA ativa e padrão"""
+    """Retorna a configuração de IA ativa e padrão (em cache no processo)"""
+    return await active_ai_config_cache.get(db, _load_active_ai_config)
+
+async def _load_active_ai_config(db: AsyncSession) -> Optional[AIConfig]:
+    """Busca a configuração de IA ativa e padrão no banco"""
     # Primeiro tenta buscar o padrão ativo
     result = await db.execute(
         select(AIConfig).where(
@@ -45,7 +65,7 @@ async def get_active_ai_config(db: AsyncSession) -> Optional[AIConfig]:
                 AIConfig.is_active == True,
                 AIConfig.status == AIModelStatus.ACTIVE.value
             )
-        ).order_by(AIConfig.priority.desc())
+        ).order_by(AIConfig.priority.desc()).limit(1)
     )
     config = result.scalar_one_or_none()
     
@@ -57,23 +77,123 @@ async def get_active_ai_config(db: AsyncSession) -> Optional[AIConfig]:
                     AIConfig.is_active == True,
                     AIConfig.status == AIModelStatus.ACTIVE.value
                 )
-            ).order_by(AIConfig.priority.desc(), AIConfig.is_default.desc())
+            ).order_by(AIConfig.priority.desc(), AIConfig.is_default.desc()).limit(1)
         )
         config = result.scalar_one_or_none()
     
     return config
 
-async def call_ai_api(prompt: str, max_tokens: int = 1000, db: Optional[AsyncSession] = None, config: Optional[AIConfig] = None) -> str:
-    """Chama a API de IA baseado na configuração"""
+async def call_ai_api(
+    prompt: str,
+    max_tokens: int = 1000,
+    db: Optional[AsyncSession] = None,
+    config: Optional[AIConfig] = None,
+    cache_namespace: Optional[str] = None,
+    cache_ttl: Optional[int] = None,
+    hedge: bool = False,
+    json_schema: Optional[Dict[str, Any]] = None
+) -> str:
+    """Chama a API de IA baseado na configuração.
+
+    Sem config explícita, a chamada passa pelo roteador (failover entre as
+    configurações ativas); hedge=True dispara o próximo provider em paralelo
+    quando o primeiro demora (endpoints sensíveis à latência).
+
+    Com cache_namespace, respostas para o mesmo (provider, modelo, prompt
+    normalizado, max_tokens) são reaproveitadas por cache_ttl segundos.
+
+    json_schema pede a resposta em JSON nesse schema (ver call_ai_structured).
+    """
+    if not config and db and settings.AI_ROUTER_ENABLED:
+        candidates = await get_ai_candidates(db)
+        if candidates:
+            hedge_delay = settings.AI_ROUTER_HEDGE_DELAY if hedge else None
+            # A chave do cache usa a configuração preferida, mesmo que outra responda
+            return await _cached_ai_call(
+                prompt, max_tokens, candidates[0], cache_namespace, cache_ttl, json_schema,
+                lambda: ai_router.call(
+                    candidates,
+                    lambda candidate: _dispatch_ai_call(prompt, max_tokens, candidate, json_schema),
+                    hedge_delay=hedge_delay
+                )
+            )
+    
     # Se não tiver config, buscar do banco
     if not config and db:
         config = await get_active_ai_config(db)
     
+    return await _cached_ai_call(
+        prompt, max_tokens, config, cache_namespace, cache_ttl, json_schema,
+        lambda: _dispatch_ai_call(prompt, max_tokens, config, json_schema)
+    )
+
+async def call_ai_structured(
+    prompt: str,
+    output_model: Type[ModelT],
+    max_tokens: int = 1000,
+    db: Optional[AsyncSession] = None,
+    config: Optional[AIConfig] = None,
+    cache_namespace: Optional[str] = None,
+    cache_ttl: Optional[int] = None,
+    hedge: bool = False
+) -> ModelT:
+    """Chama a IA pedindo a resposta no schema de output_model e devolve o modelo validado.
+
+    Usa o modo JSON/tool use nativo do provider quando existe. Levanta
+    StructuredOutputError se a resposta não validar ou se o provider recusar
+    o modo estruturado; o chamador pode então usar o prompt em texto.
+    """
+    try:
+        response = await call_ai_api(
+            prompt, max_tokens, db=db, config=config,
+            cache_namespace=cache_namespace, cache_ttl=cache_ttl, hedge=hedge,
+            json_schema=output_schema(output_model)
+        )
+    except AIProviderError as e:
+        if e.upstream_status in (400, 422):
+            # Modelo/endpoint sem suporte a response_format, format ou tools
+            raise StructuredOutputError(f"Provider recusou a saída estruturada: {e.detail}")
+        raise
+    return parse_structured_output(response, output_model)
+
+async def _cached_ai_call(
+    prompt: str,
+    max_tokens: int,
+    config: Optional[AIConfig],
+    cache_namespace: Optional[str],
+    cache_ttl: Optional[int],
+    json_schema: Optional[Dict[str, Any]],
+    call: Callable[[], Awaitable[str]]
+) -> str:
+    if cache_namespace and settings.LLM_CACHE_ENABLED:
+        provider = config.provider if config else "grok-legacy"
+        model = config.model_name if config else "grok-1"
+        if json_schema is not None:
+            # Mesmo prompt com e sem schema gera respostas diferentes
+            prompt = f"{prompt}\n{json.dumps(json_schema, sort_keys=True)}"
+        return await llm_cache.get_or_call(
+            cache_namespace,
+            llm_cache_key(provider, model, prompt, max_tokens),
+            call,
+            ttl=cache_ttl
+        )
+    return await call()
+
+async def _dispatch_ai_call(
+    prompt: str,
+    max_tokens: int,
+    config: Optional[AIConfig],
+    json_schema: Optional[Dict[str, Any]] = None
+) -> str:
+    """Envia o prompt ao provider da configuração"""
+    if json_schema is not None and (not config or config.provider not in NATIVE_SCHEMA_PROVIDERS):
+        # Provider sem schema na requisição: o schema vai no prompt
+        prompt += schema_instruction(json_schema)
+    
     # Fallback para variável de ambiente (compatibilidade)
     if not config:
         api_key = os.getenv("GROK_API_KEY")
         if api_key:
-            config = None  # Usar função antiga
             return await _call_grok_api_legacy(prompt, max_tokens, api_key)
         else:
             raise HTTPException(
@@ -86,176 +206,203 @@ async def call_ai_api(prompt: str, max_tokens: int = 1000, db: Optional[AsyncSes
     
     try:
         if config.provider == "grok":
-            return await _call_grok_api(prompt, max_tokens, config)
+            return await _call_grok_api(prompt, max_tokens, config, json_schema)
         elif config.provider == "openai":
-            return await _call_openai_api(prompt, max_tokens, config)
+            return await _call_openai_api(prompt, max_tokens, config, json_schema)
         elif config.provider == "anthropic":
-            return await _call_anthropic_api(prompt, max_tokens, config)
+            return await _call_anthropic_api(prompt, max_tokens, config, json_schema)
         elif config.provider == "ollama":
-            return await _call_ollama_api(prompt, max_tokens, config)
+            return await _call_ollama_api(prompt, max_tokens, config, json_schema)
         elif config.provider == "google":
             return await _call_google_api(prompt, max_tokens, config)
         elif config.provider == "mistral":
-            return await _call_mistral_api(prompt, max_tokens, config)
+            return await _call_mistral_api(prompt, max_tokens, config, json_schema)
         elif config.provider == "cohere":
             return await _call_cohere_api(prompt, max_tokens, config)
         else:
             raise HTTPException(status_code=500, detail=f"Provider '{config.provider}' não suportado")
     except HTTPException:
         raise
+    except httpx.TransportError as e:
+        raise AIProviderError(f"Erro ao chamar API de IA ({config.provider}): {str(e) or e.__class__.__name__}", retryable=True)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao chamar API de IA: {str(e)}")
 
 async def _call_grok_api_legacy(prompt: str, max_tokens: int, api_key: str) -> str:
     """Função legada para Grok (compatibilidade)"""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://api.x.ai/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "grok-1",
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": max_tokens,
-                "temperature": 0.7
-            },
-            timeout=60.0
-        )
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail=f"Erro na API do Grok: {response.status_code}")
-        data = response.json()
-        return data["choices"][0]["message"]["content"]
+    client = get_http_client("grok")
+    response = await client.post(
+        "https://api.x.ai/v1/chat/completions",
+        headers={
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        },
+        json={
+            "model": "grok-1",
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": 0.7
+        }
+    )
+    if response.status_code != 200:
+        raise AIProviderError(f"Erro na API do Grok: {response.status_code}", upstream_status=response.status_code)
+    data = response.json()
+    return data["choices"][0]["message"]["content"]
 
-async def _call_grok_api(prompt: str, max_tokens: int, config: AIConfig) -> str:
+async def _call_grok_api(prompt: str, max_tokens: int, config: AIConfig, json_schema: Optional[Dict[str, Any]] = None) -> str:
     """Chama a API do Grok/xAI"""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://api.x.ai/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {config.api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": config.model_name,
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": max_tokens,
-                "temperature": 0.7
-            },
-            timeout=60.0
-        )
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail=f"Erro na API do Grok: {response.status_code}")
-        data = response.json()
-        return data["choices"][0]["message"]["content"]
+    client = get_http_client("grok")
+    payload = {
+        "model": config.model_name,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+        "temperature": 0.7
+    }
+    if json_schema is not None:
+        payload["response_format"] = {
+            "type": "json_schema",
+            "json_schema": {"name": schema_name(json_schema), "schema": json_schema}
+        }
+    response = await client.post(
+        "https://api.x.ai/v1/chat/completions",
+        headers={
+            "Authorization": f"Bearer {config.api_key}",
+            "Content-Type": "application/json"
+        },
+        json=payload
+    )
+    if response.status_code != 200:
+        raise AIProviderError(f"Erro na API do Grok: {response.status_code}", upstream_status=response.status_code)
+    data = response.json()
+    return data["choices"][0]["message"]["content"]
 
-async def _call_openai_api(prompt: str, max_tokens: int, config: AIConfig) -> str:
+async def _call_openai_api(prompt: str, max_tokens: int, config: AIConfig, json_schema: Optional[Dict[str, Any]] = None) -> str:
     """Chama a API do OpenAI"""
     base_url = config.base_url or "https://api.openai.com/v1"
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{base_url}/chat/completions",
-            headers={
-                "Authorization": f"Bearer {config.api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": config.model_name,
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": max_tokens,
-                "temperature": 0.7
-            },
-            timeout=60.0
-        )
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail=f"Erro na API do OpenAI: {response.status_code}")
-        data = response.json()
-        return data["choices"][0]["message"]["content"]
+    client = get_http_client("openai")
+    payload = {
+        "model": config.model_name,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+        "temperature": 0.7
+    }
+    if json_schema is not None:
+        payload["response_format"] = {
+            "type": "json_schema",
+            "json_schema": {"name": schema_name(json_schema), "schema": json_schema}
+        }
+    response = await client.post(
+        f"{base_url}/chat/completions",
+        headers={
+            "Authorization": f"Bearer {config.api_key}",
+            "Content-Type": "application/json"
+        },
+        json=payload
+    )
+    if response.status_code != 200:
+        raise AIProviderError(f"Erro na API do OpenAI: {response.status_code}", upstream_status=response.status_code)
+    data = response.json()
+    return data["choices"][0]["message"]["content"]
 
-async def _call_anthropic_api(prompt: str, max_tokens: int, config: AIConfig) -> str:
+async def _call_anthropic_api(prompt: str, max_tokens: int, config: AIConfig, json_schema: Optional[Dict[str, Any]] = None) -> str:
     """Chama a API do Anthropic (Claude)"""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://api.anthropic.com/v1/messages",
-            headers={
-                "x-api-key": config.api_key,
-                "anthropic-version": "2023-06-01",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": config.model_name,
-                "max_tokens": max_tokens,
-                "messages": [{"role": "user", "content": prompt}]
-            },
-            timeout=60.0
-        )
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail=f"Erro na API do Anthropic: {response.status_code}")
-        data = response.json()
-        return data["content"][0]["text"]
-
-async def _call_ollama_api(prompt: str, max_tokens: int, config: AIConfig) -> str:
+    client = get_http_client("anthropic")
+    payload = {
+        "model": config.model_name,
+        "max_tokens": max_tokens,
+        "messages": [{"role": "user", "content": prompt}]
+    }
+    if json_schema is not None:
+        # Saída estruturada via tool use obrigatório: o JSON vem no input da ferramenta
+        tool = schema_name(json_schema)
+        payload["tools"] = [{
+            "name": tool,
+            "description": "Registra a resposta no formato estruturado",
+            "input_schema": json_schema
+        }]
+        payload["tool_choice"] = {"type": "tool", "name": tool}
+    response = await client.post(
+        "https://api.anthropic.com/v1/messages",
+        headers={
+            "x-api-key": config.api_key,
+            "anthropic-version": "2023-06-01",
+            "Content-Type": "application/json"
+        },
+        json=payload
+    )
+    if response.status_code != 200:
+        raise AIProviderError(f"Erro na API do Anthropic: {response.status_code}", upstream_status=response.status_code)
+    data = response.json()
+    if json_schema is not None:
+        for block in data["content"]:
+            if block.get("type") == "tool_use":
+                return json.dumps(block["input"], ensure_ascii=False)
+    return data["content"][0]["text"]
+
+async def _call_ollama_api(prompt: str, max_tokens: int, config: AIConfig, json_schema: Optional[Dict[str, Any]] = None) -> str:
     """Chama a API do Ollama (local)"""
     base_url = config.base_url or "http://localhost:11434"
+    payload = {
+        "model": config.model_name,
+        "prompt": prompt,
+        "stream": False,
+        "options": {
+            "num_predict": max_tokens
+        }
+    }
+    if json_schema is not None:
+        # Ollama >= 0.5 restringe a geração ao schema informado em "format"
+        payload["format"] = json_schema
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{base_url}/api/generate",
-                json={
-                    "model": config.model_name,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "num_predict": max_tokens
-                    }
-                },
-                timeout=120.0  # Ollama pode ser mais lento
-            )
-            
-            if response.status_code != 200:
-                error_text = response.text[:500] if hasattr(response, 'text') else str(response.status_code)
-                try:
-                    error_data = response.json()
-                    error_detail = error_data.get("error", error_text)
-                except:
-                    error_detail = error_text
-                
-                # Mensagens mais específicas para erros comuns
-                if response.status_code == 404:
-                    raise HTTPException(
-                        status_code=500,
-                        detail=f"Modelo '{config.model_name}' não encontrado no Ollama. Verifique se o modelo está instalado (use 'ollama list' para ver modelos disponíveis). Erro: {error_detail}"
-                    )
-                elif response.status_code == 400:
-                    raise HTTPException(
-                        status_code=500,
-                        detail=f"Erro na requisição ao Ollama. Verifique se o modelo '{config.model_name}' está correto. Erro: {error_detail}"
-                    )
-                else:
-                    raise HTTPException(
-                        status_code=500,
-                        detail=f"Erro na API do Ollama ({response.status_code}): {error_detail}"
-                    )
+        client = get_http_client("ollama")
+        response = await client.post(
+            f"{base_url}/api/generate",
+            json=payload
+        )
+        
+        if response.status_code != 200:
+            error_text = response.text[:500] if hasattr(response, 'text') else str(response.status_code)
+            try:
+                error_data = response.json()
+                error_detail = error_data.get("error", error_text)
+            except:
+                error_detail = error_text
             
-            data = response.json()
-            if "response" not in data:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Resposta inválida do Ollama. Verifique se o modelo '{config.model_name}' está funcionando corretamente."
+            # Mensagens mais específicas para erros comuns
+            if response.status_code == 404:
+                raise AIProviderError(
+                    f"Modelo '{config.model_name}' não encontrado no Ollama. Verifique se o modelo está instalado (use 'ollama list' para ver modelos disponíveis). Erro: {error_detail}",
+                    upstream_status=response.status_code
                 )
-            return data.get("response", "")
+            elif response.status_code == 400:
+                raise AIProviderError(
+                    f"Erro na requisição ao Ollama. Verifique se o modelo '{config.model_name}' está correto. Erro: {error_detail}",
+                    upstream_status=response.status_code
+                )
+            else:
+                raise AIProviderError(
+                    f"Erro na API do Ollama ({response.status_code}): {error_detail}",
+                    upstream_status=response.status_code
+                )
+        
+        data = response.json()
+        if "response" not in data:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Resposta inválida do Ollama. Verifique se o modelo '{config.model_name}' está funcionando corretamente."
+            )
+        return data.get("response", "")
     
     except httpx.ConnectError:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Não foi possível conectar ao Ollama em {base_url}. Verifique se o Ollama está rodando e se o túnel está ativo."
+        raise AIProviderError(
+            f"Não foi possível conectar ao Ollama em {base_url}. Verifique se o Ollama está rodando e se o túnel está ativo.",
+            retryable=True
         )
     except httpx.TimeoutException:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Timeout ao conectar com o Ollama. O modelo pode estar demorando muito para responder ou a conexão está lenta."
+        raise AIProviderError(
+            f"Timeout ao conectar com o Ollama. O modelo pode estar demorando muito para responder ou a conexão está lenta.",
+            retryable=True
         )
     except HTTPException:
         raise
@@ -281,117 +428,270 @@ async def _call_google_api(prompt: str, max_tokens: int, config: AIConfig) -> st
         )
     
     try:
-        async with httpx.AsyncClient() as client:
-            # Usar v1 em vez de v1beta (mais estável)
-            # Adicionar prefixo "models/" se não tiver
-            model_name = config.model_name
-            if not model_name.startswith("models/"):
-                model_name = f"models/{model_name}"
-            
-            url = f"https://generativelanguage.googleapis.com/v1/{model_name}:generateContent"
-            
-            response = await client.post(
-                url,
-                params={"key": api_key},
-                json={
-                    "contents": [{
-                        "parts": [{"text": prompt}]
-                    }],
-                    "generationConfig": {
-                        "maxOutputTokens": max_tokens,
-                        "temperature": 0.7
-                    }
-                },
-                timeout=60.0
+        client = get_http_client("google")
+        # Usar v1 em vez de v1beta (mais estável)
+        # Adicionar prefixo "models/" se não tiver
+        model_name = config.model_name
+        if not model_name.startswith("models/"):
+            model_name = f"models/{model_name}"
+        
+        url = f"https://generativelanguage.googleapis.com/v1/{model_name}:generateContent"
+        
+        response = await client.post(
+            url,
+            params={"key": api_key},
+            json={
+                "contents": [{
+                    "parts": [{"text": prompt}]
+                }],
+                "generationConfig": {
+                    "maxOutputTokens": max_tokens,
+                    "temperature": 0.7
+                }
+            }
+        )
+        
+        if response.status_code != 200:
+            error_text = response.text[:500] if hasattr(response, 'text') else str(response.status_code)
+            try:
+                error_data = response.json()
+                error_detail = error_data.get("error", {}).get("message", error_text)
+            except:
+                error_detail = error_text
+            raise AIProviderError(
+                f"Erro na API do Google Gemini ({response.status_code}): {error_detail}",
+                upstream_status=response.status_code
             )
-            
-            if response.status_code != 200:
-                error_text = response.text[:500] if hasattr(response, 'text') else str(response.status_code)
-                try:
-                    error_data = response.json()
-                    error_detail = error_data.get("error", {}).get("message", error_text)
-                except:
-                    error_detail = error_text
-                raise HTTPException(
-                    status_code=500, 
-                    detail=f"Erro na API do Google Gemini ({response.status_code}): {error_detail}"
-                )
-            
-            data = response.json()
-            
-            # Verificar estrutura da resposta
-            if "candidates" not in data or len(data["candidates"]) == 0:
-                raise HTTPException(
-                    status_code=500,
-                    detail="Resposta inválida da API do Google Gemini: nenhum candidato encontrado"
-                )
-            
-            candidate = data["candidates"][0]
-            if "content" not in candidate:
-                raise HTTPException(
-                    status_code=500,
-                    detail="Resposta inválida da API do Google Gemini: conteúdo não encontrado"
-                )
-            
-            if "parts" not in candidate["content"] or len(candidate["content"]["parts"]) == 0:
-                raise HTTPException(
-                    status_code=500,
-                    detail="Resposta inválida da API do Google Gemini: partes não encontradas"
-                )
-            
-            return candidate["content"]["parts"][0]["text"]
-            
+        
+        data = response.json()
+        
+        # Verificar estrutura da resposta
+        if "candidates" not in data or len(data["candidates"]) == 0:
+            raise HTTPException(
+                status_code=500,
+                detail="Resposta inválida da API do Google Gemini: nenhum candidato encontrado"
+            )
+        
+        candidate = data["candidates"][0]
+        if "content" not in candidate:
+            raise HTTPException(
+                status_code=500,
+                detail="Resposta inválida da API do Google Gemini: conteúdo não encontrado"
+            )
+        
+        if "parts" not in candidate["content"] or len(candidate["content"]["parts"]) == 0:
+            raise HTTPException(
+                status_code=500,
+                detail="Resposta inválida da API do Google Gemini: partes não encontradas"
+            )
+        
+        return candidate["content"]["parts"][0]["text"]
+        
     except HTTPException:
         raise
     except httpx.TimeoutException:
-        raise HTTPException(status_code=500, detail="Timeout ao chamar API do Google Gemini")
+        raise AIProviderError("Timeout ao chamar API do Google Gemini", retryable=True)
     except httpx.RequestError as e:
-        raise HTTPException(status_code=500, detail=f"Erro de conexão com API do Google Gemini: {str(e)}")
+        raise AIProviderError(f"Erro de conexão com API do Google Gemini: {str(e)}", retryable=True)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao chamar Google Gemini API: {str(e)}")
 
-async def _call_mistral_api(prompt: str, max_tokens: int, config: AIConfig) -> str:
+async def _call_mistral_api(prompt: str, max_tokens: int, config: AIConfig, json_schema: Optional[Dict[str, Any]] = None) -> str:
     """Chama a API do Mistral AI"""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://api.mistral.ai/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {config.api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": config.model_name,
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": max_tokens,
-                "temperature": 0.7
-            },
-            timeout=60.0
-        )
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail=f"Erro na API do Mistral: {response.status_code}")
-        data = response.json()
-        return data["choices"][0]["message"]["content"]
+    client = get_http_client("mistral")
+    payload = {
+        "model": config.model_name,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+        "temperature": 0.7
+    }
+    if json_schema is not None:
+        # Mistral aceita só o modo JSON; o schema vai no prompt
+        payload["response_format"] = {"type": "json_object"}
+    response = await client.post(
+        "https://api.mistral.ai/v1/chat/completions",
+        headers={
+            "Authorization": f"Bearer {config.api_key}",
+            "Content-Type": "application/json"
+        },
+        json=payload
+    )
+    if response.status_code != 200:
+        raise AIProviderError(f"Erro na API do Mistral: {response.status_code}", upstream_status=response.status_code)
+    data = response.json()
+    return data["choices"][0]["message"]["content"]
 
 async def _call_cohere_api(prompt: str, max_tokens: int, config: AIConfig) -> str:
     """Chama a API do Cohere"""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://api.cohere.ai/v1/generate",
-            headers={
-                "Authorization": f"Bearer {config.api_key}",
-                "Content-Type": "application/json"
-            },
+    client = get_http_client("cohere")
+    response = await client.post(
+        "https://api.cohere.ai/v1/generate",
+        headers={
+            "Authorization": f"Bearer {config.api_key}",
+            "Content-Type": "application/json"
+        },
+        json={
+            "model": config.model_name,
+            "prompt": prompt,
+            "max_tokens": max_tokens
+        }
+    )
+    if response.status_code != 200:
+        raise AIProviderError(f"Erro na API do Cohere: {response.status_code}", upstream_status=response.status_code)
+    data = response.json()
+    return data["generations"][0]["text"]
+
+# ==================== STREAMING ====================
+
+STREAM_PROVIDER_URLS = {
+    "grok": ("Grok", "https://api.x.ai/v1/chat/completions"),
+    "openai": ("OpenAI", "https://api.openai.com/v1/chat/completions"),
+    "mistral": ("Mistral", "https://api.mistral.ai/v1/chat/completions"),
+}
+
+async def stream_ai_api(prompt: str, max_tokens: int = 1000, db: Optional[AsyncSession] = None, config: Optional[AIConfig] = None) -> AsyncIterator[str]:
+    """Chama a API de IA em modo streaming, gerando os trechos de texto conforme chegam.
+
+    Providers sem streaming implementado (Google, Cohere, Grok legado) geram a
+    resposta completa em um único trecho.
+    """
+    if not config and db:
+        config = await get_active_ai_config(db)
+    
+    if not config or config.provider not in ("grok", "openai", "mistral", "anthropic", "ollama"):
+        yield await call_ai_api(prompt, max_tokens, config=config)
+        return
+    
+    if not config.api_key and config.provider != "ollama":
+        raise HTTPException(status_code=500, detail=f"API key não configurada para {config.provider}")
+    
+    try:
+        if config.provider == "anthropic":
+            stream = _stream_anthropic_api(prompt, max_tokens, config)
+        elif config.provider == "ollama":
+            stream = _stream_ollama_api(prompt, max_tokens, config)
+        else:
+            stream = _stream_chat_completions_api(prompt, max_tokens, config)
+        async for text in stream:
+            yield text
+    except HTTPException:
+        raise
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=500, detail=f"Timeout ao chamar API de IA ({config.provider})")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao chamar API de IA: {str(e)}")
+
+async def _stream_chat_completions_api(prompt: str, max_tokens: int, config: AIConfig) -> AsyncIterator[str]:
+    """Streaming no formato chat/completions (OpenAI, Grok e Mistral)"""
+    label, url = STREAM_PROVIDER_URLS[config.provider]
+    if config.provider == "openai" and config.base_url:
+        url = f"{config.base_url}/chat/completions"
+    
+    client = get_http_client(config.provider)
+    async with client.stream(
+        "POST",
+        url,
+        headers={
+            "Authorization": f"Bearer {config.api_key}",
+            "Content-Type": "application/json"
+        },
+        json={
+            "model": config.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": 0.7,
+            "stream": True
+        }
+    ) as response:
+        if response.status_code != 200:
+            raise HTTPException(status_code=500, detail=f"Erro na API do {label}: {response.status_code}")
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            choices = json.loads(data).get("choices") or []
+            if choices:
+                text = (choices[0].get("delta") or {}).get("content")
+                if text:
+                    yield text
+
+async def _stream_anthropic_api(prompt: str, max_tokens: int, config: AIConfig) -> AsyncIterator[str]:
+    """Streaming da API de mensagens do Anthropic (Claude)"""
+    client = get_http_client("anthropic")
+    async with client.stream(
+        "POST",
+        "https://api.anthropic.com/v1/messages",
+        headers={
+            "x-api-key": config.api_key,
+            "anthropic-version": "2023-06-01",
+            "Content-Type": "application/json"
+        },
+        json={
+            "model": config.model_name,
+            "max_tokens": max_tokens,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": True
+        }
+    ) as response:
+        if response.status_code != 200:
+            raise AIProviderError(f"Erro na API do Anthropic: {response.status_code}", upstream_status=response.status_code)
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            event = json.loads(line[5:].strip())
+            if event.get("type") == "content_block_delta":
+                text = (event.get("delta") or {}).get("text")
+                if text:
+                    yield text
+            elif event.get("type") == "message_stop":
+                break
+            elif event.get("type") == "error":
+                message = (event.get("error") or {}).get("message", "erro desconhecido")
+                raise HTTPException(status_code=500, detail=f"Erro na API do Anthropic: {message}")
+
+async def _stream_ollama_api(prompt: str, max_tokens: int, config: AIConfig) -> AsyncIterator[str]:
+    """Streaming da API do Ollama (uma linha JSON por trecho)"""
+    base_url = config.base_url or "http://localhost:11434"
+    client = get_http_client("ollama")
+    try:
+        async with client.stream(
+            "POST",
+            f"{base_url}/api/generate",
             json={
                 "model": config.model_name,
                 "prompt": prompt,
-                "max_tokens": max_tokens
-            },
-            timeout=60.0
+                "stream": True,
+                "options": {
+                    "num_predict": max_tokens
+                }
+            }
+        ) as response:
+            if response.status_code != 200:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Erro na API do Ollama ({response.status_code}). Verifique se o modelo '{config.model_name}' está instalado."
+                )
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise HTTPException(status_code=500, detail=f"Erro na API do Ollama: {chunk['error']}")
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    break
+    except httpx.ConnectError:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Não foi possível conectar ao Ollama em {base_url}. Verifique se o Ollama está rodando e se o túnel está ativo."
         )
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail=f"Erro na API do Cohere: {response.status_code}")
-        data = response.json()
-        return data["generations"][0]["text"]
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Formata um evento Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 @router.post("/chat")
 async def chat_with_ai(
@@ -480,6 +780,14 @@ Responda de forma natural e amigável, mas seja proativo em executar ações qua
 
         full_prompt = context_prompt + f"Usuário: {request.prompt}\n\nAssistente:"
 
+        if request.stream:
+            config = await get_active_ai_config(db)
+            return StreamingResponse(
+                _stream_chat_events(request, full_prompt, config, current_user),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+
         # Salvar mensagem do usuário
         user_message = AIChatMessage(
             user_id=current_user.id,
@@ -506,58 +814,7 @@ Responda de forma natural e amigável, mas seja proativo em executar ações qua
                 detail=f"Erro ao processar requisição com IA: {str(e)}"
             )
 
-        # Detectar e executar ações na resposta da IA
-        action_executed = False
-        action_result = None
-        final_response = response
-        
-        # Verificar se a resposta contém uma chamada de função
-        action_patterns = [
-            r'create_contact\s*\([^)]*\)',
-            r'update_contact\s*\([^)]*\)',
-            r'create_opportunity\s*\([^)]*\)',
-            r'update_opportunity\s*\([^)]*\)',
-            r'create_activity\s*\([^)]*\)',
-            r'list_contacts\s*\([^)]*\)',
-            r'list_opportunities\s*\([^)]*\)'
-        ]
-        
-        for pattern in action_patterns:
-            match = re.search(pattern, response, re.IGNORECASE)
-            if match:
-                action_call = match.group(0)
-                try:
-                    action_result = await _execute_ai_action(action_call, db, current_user)
-                    action_executed = True
-                    # Substituir a chamada de função pelo resultado
-                    final_response = response.replace(action_call, action_result)
-                    break
-                except Exception as e:
-                    print(f"Erro ao executar ação: {str(e)}")
-                    action_result = f"Erro ao executar ação: {str(e)}"
-                    final_response = response.replace(action_call, action_result)
-                    break
-
-        # Salvar resposta da IA
-        ai_message = AIChatMessage(
-            user_id=current_user.id,
-            role="assistant",
-            content=final_response,
-            message_metadata={
-                "action_executed": action_executed,
-                "action_result": action_result,
-                "original_response": response
-            } if action_executed else None
-        )
-        db.add(ai_message)
-        await db.commit()
-
-        return {
-            "response": final_response,
-            "timestamp": datetime.utcnow().isoformat(),
-            "action_executed": action_executed,
-            "action_result": action_result
-        }
+        return await _finalize_chat_response(response, db, current_user)
 
     except HTTPException:
         raise
@@ -567,6 +824,96 @@ Responda de forma natural e amigável, mas seja proativo em executar ações qua
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Erro no chat com IA: {str(e)}")
 
+async def _finalize_chat_response(response: str, db: AsyncSession, current_user: User) -> Dict[str, Any]:
+    """Detecta e executa ações na resposta completa da IA e salva a mensagem do assistente"""
+    # Detectar e executar ações na resposta da IA
+    action_executed = False
+    action_result = None
+    final_response = response
+    
+    # Verificar se a resposta contém uma chamada de função
+    action_patterns = [
+        r'create_contact\s*\([^)]*\)',
+        r'update_contact\s*\([^)]*\)',
+        r'create_opportunity\s*\([^)]*\)',
+        r'update_opportunity\s*\([^)]*\)',
+        r'create_activity\s*\([^)]*\)',
+        r'list_contacts\s*\([^)]*\)',
+        r'list_opportunities\s*\([^)]*\)'
+    ]
+    
+    for pattern in action_patterns:
+        match = re.search(pattern, response, re.IGNORECASE)
+        if match:
+            action_call = match.group(0)
+            try:
+                action_result = await _execute_ai_action(action_call, db, current_user)
+                action_executed = True
+                # Substituir a chamada de função pelo resultado
+                final_response = response.replace(action_call, action_result)
+                break
+            except Exception as e:
+                print(f"Erro ao executar ação: {str(e)}")
+                action_result = f"Erro ao executar ação: {str(e)}"
+                final_response = response.replace(action_call, action_result)
+                break
+
+    # Salvar resposta da IA
+    ai_message = AIChatMessage(
+        user_id=current_user.id,
+        role="assistant",
+        content=final_response,
+        message_metadata={
+            "action_executed": action_executed,
+            "action_result": action_result,
+            "original_response": response
+        } if action_executed else None
+    )
+    db.add(ai_message)
+    await db.commit()
+
+    return {
+        "response": final_response,
+        "timestamp": datetime.utcnow().isoformat(),
+        "action_executed": action_executed,
+        "action_result": action_result
+    }
+
+async def _stream_chat_events(
+    request: AIRequest,
+    full_prompt: str,
+    config: Optional[AIConfig],
+    current_user: User
+) -> AsyncIterator[str]:
+    """Gera os eventos SSE do chat: 'token' a cada trecho, 'done' ao final (com ações e persistência) ou 'error'"""
+    # Sessão própria: o stream continua depois que o endpoint retorna
+    async with AsyncSessionLocal() as db:
+        try:
+            db.add(AIChatMessage(
+                user_id=current_user.id,
+                role="user",
+                content=request.prompt
+            ))
+            await db.flush()
+            
+            chunks = []
+            async for text in stream_ai_api(full_prompt, request.max_tokens, config=config):
+                chunks.append(text)
+                yield _sse_event("token", {"text": text})
+            
+            result = await _finalize_chat_response("".join(chunks), db, current_user)
+        except HTTPException as e:
+            await db.rollback()
+            yield _sse_event("error", {"detail": e.detail})
+            return
+        except Exception as e:
+            await db.rollback()
+            print(f"Erro no streaming do chat com IA: {str(e)}")
+            yield _sse_event("error", {"detail": f"Erro no chat com IA: {str(e)}"})
+            return
+    
+    yield _sse_event("done", result)
+
 async def _execute_ai_action(action_string: str, db: AsyncSession, current_user: User) -> str:
     """Executa uma ação da IA baseada na string gerada pelo modelo"""
     try:
@@ -613,11 +960,9 @@ async def _execute_ai_action(action_string: str, db: AsyncSession, current_user:
 
         # Executar ação baseada no nome da função
         if func_name == "create_contact":
-            from fastapi import BackgroundTasks
-            # Criar BackgroundTasks vazio (não podemos passar do contexto atual)
-            # A análise será iniciada no próprio endpoint ai_create_contact
+            # A análise do lead é agendada na fila de jobs pelo próprio ai_create_contact
             request = AICreateContactRequest(**args)
-            result = await ai_create_contact(request, db, current_user, background_tasks=None)
+            result = await ai_create_contact(request, db, current_user)
             return result.message if hasattr(result, 'message') else str(result)
         
         elif func_name == "update_contact":
@@ -862,7 +1207,7 @@ async def suggest_next_steps(
         4. Possíveis objeções e como contorná-las
         """
 
-        suggestions = await call_ai_api(prompt, 1000, db)
+        suggestions = await call_ai_api(prompt, 1000, db, cache_namespace="suggest_next_steps", cache_ttl=600)
 
         return {
             "suggestions": suggestions,
@@ -872,3 +1217,31 @@ async def suggest_next_steps(
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro nas sugestões: {str(e)}")
+
+@router.get("/cache/stats")
+async def get_ai_cache_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """Métricas do cache de respostas da IA (apenas admin)"""
+    if get_user_role_str(current_user) != "admin":
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    return llm_cache.stats()
+
+@router.delete("/cache")
+async def clear_ai_cache(
+    current_user: User = Depends(get_current_user)
+):
+    """Limpa o cache local de respostas da IA (apenas admin)"""
+    if get_user_role_str(current_user) != "admin":
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    llm_cache.clear()
+    return {"message": "Cache de IA limpo"}
+
+@router.get("/router/stats")
+async def get_ai_router_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """Estado dos circuit breakers e contadores de failover/hedge (apenas admin)"""
+    if get_user_role_str(current_user) != "admin":
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    return ai_router.stats()
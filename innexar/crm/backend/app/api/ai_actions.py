@@ -1,7 +1,7 @@
 """
 Sistema de ações que a IA pode executar no CRM
 """
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.core.database import get_db
@@ -10,6 +10,9 @@ from app.models.contact import Contact
 from app.models.opportunity import Opportunity
 from app.models.activity import Activity
 from app.api.dependencies import get_current_user, get_user_role_str
+from app.services.rollup import opportunity_state, activity_state, track_opportunity, track_activity
+from app.services.jobs import enqueue_lead_analysis
+from app.services.search import search_contacts, search_opportunities
 from pydantic import BaseModel
 from typing import Dict, Any, Optional, List
 from datetime import datetime
@@ -70,7 +73,6 @@ class AIActionResponse(BaseModel):
 @router.post("/create-contact", response_model=AIActionResponse)
 async def ai_create_contact(
     request: AICreateContactRequest,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -101,18 +103,14 @@ async def ai_create_contact(
         )
         
         db.add(contact)
-        await db.commit()
-        await db.refresh(contact)
+        await db.flush()
         
-        # Se for um lead (status="lead"), iniciar análise automática em background
+        # Se for um lead (status="lead"), agendar análise automática
         if contact.status == "lead":
-            from app.api.lead_analysis import analyze_lead_background
-            if background_tasks:
-                background_tasks.add_task(analyze_lead_background, contact.id)
-            else:
-                # Se não tiver background_tasks, usar asyncio
-                import asyncio
-                asyncio.create_task(analyze_lead_background(contact.id))
+            await enqueue_lead_analysis(db, contact.id)
+        
+        await db.commit()
+        await db.refresh(contact)
         
         return AIActionResponse(
             success=True,
@@ -204,10 +202,9 @@ async def ai_create_opportunity(
         
         # Se não tiver contact_id mas tiver contact_name, buscar ou criar contato
         if not contact_id and request.contact_name:
-            result = await db.execute(
-                select(Contact).where(Contact.name.ilike(f"%{request.contact_name}%"))
-            )
-            contact = result.scalar_one_or_none()
+            # Melhor contato com todas as palavras do nome (sem similaridade aproximada)
+            matches = await search_contacts(db, request.contact_name, limit=1, fuzzy=False)
+            contact = matches[0][0] if matches else None
             
             if not contact:
                 # Criar contato automaticamente
@@ -258,6 +255,7 @@ async def ai_create_opportunity(
                 pass
         
         db.add(opportunity)
+        await track_opportunity(db, None, opportunity_state(opportunity))
         await db.commit()
         await db.refresh(opportunity)
         
@@ -312,6 +310,7 @@ async def ai_update_opportunity(
             )
         
         # Atualizar campos
+        before = opportunity_state(opportunity)
         update_data = request.model_dump(exclude_unset=True, exclude={"opportunity_id"})
         for key, value in update_data.items():
             if value is not None:
@@ -324,6 +323,7 @@ async def ai_update_opportunity(
                     setattr(opportunity, key, value)
         
         opportunity.updated_at = datetime.utcnow()
+        await track_opportunity(db, before, opportunity_state(opportunity))
         await db.commit()
         await db.refresh(opportunity)
         
@@ -372,6 +372,7 @@ async def ai_create_activity(
                 pass
         
         db.add(activity)
+        await track_activity(db, None, activity_state(activity))
         await db.commit()
         await db.refresh(activity)
         
@@ -402,22 +403,17 @@ async def ai_list_contacts(
     limit: int = 10
 ):
     """Lista contatos para a IA consultar"""
-    query = select(Contact)
-    
     user_role = get_user_role_str(current_user)
-    if user_role == "vendedor":
-        query = query.where(Contact.owner_id == current_user.id)
+    owner_id = current_user.id if user_role == "vendedor" else None
     
     if search:
-        query = query.where(
-            Contact.name.ilike(f"%{search}%") |
-            Contact.email.ilike(f"%{search}%") |
-            Contact.company.ilike(f"%{search}%")
-        )
-    
-    query = query.limit(limit)
-    result = await db.execute(query)
-    contacts = result.scalars().all()
+        contacts = [c for c, _ in await search_contacts(db, search, owner_id=owner_id, limit=limit)]
+    else:
+        query = select(Contact)
+        if owner_id is not None:
+            query = query.where(Contact.owner_id == owner_id)
+        result = await db.execute(query.limit(limit))
+        contacts = result.scalars().all()
     
     return {
         "contacts": [
@@ -441,18 +437,17 @@ async def ai_list_opportunities(
     limit: int = 10
 ):
     """Lista oportunidades para a IA consultar"""
-    query = select(Opportunity)
-    
     user_role = get_user_role_str(current_user)
-    if user_role == "vendedor":
-        query = query.where(Opportunity.owner_id == current_user.id)
+    owner_id = current_user.id if user_role == "vendedor" else None
     
     if search:
-        query = query.where(Opportunity.name.ilike(f"%{search}%"))
-    
-    query = query.limit(limit)
-    result = await db.execute(query)
-    opportunities = result.scalars().all()
+        opportunities = [o for o, _ in await search_opportunities(db, search, owner_id=owner_id, limit=limit)]
+    else:
+        query = select(Opportunity)
+        if owner_id is not None:
+            query = query.where(Opportunity.owner_id == owner_id)
+        result = await db.execute(query.limit(limit))
+        opportunities = result.scalars().all()
     
     return {
         "opportunities": [
@@ -5,6 +5,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc
 from app.core.database import get_db
+from app.core.read_replica import get_read_db
 from app.models.user import User
 from app.models.ai_chat import AIChatMessage
 from app.api.dependencies import get_current_user
@@ -28,7 +29,7 @@ class ChatMessageResponse(BaseModel):
 async def get_chat_history(
     skip: int = 0,
     limit: int = 50,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Retorna histórico de chat do usuário"""
@@ -8,10 +8,13 @@ from app.core.database import get_db
 from app.models.user import User
 from app.models.ai_config import AIConfig, AIModelProvider, AIModelStatus
 from app.api.dependencies import get_current_user, get_user_role_str
+from app.core.cache import cached_response
+from app.services.ai_config_cache import invalidate_active_ai_config
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 import httpx
+from app.core.http_clients import get_http_client
 import json
 
 router = APIRouter(prefix="/ai-config", tags=["ai-config"])
@@ -108,6 +111,7 @@ AVAILABLE_MODELS = {
 }
 
 @router.get("/models", response_model=Dict[str, List[Dict[str, str]]])
+@cached_response("ai_models", ttl=3600, per_user=False)
 async def get_available_models(
     current_user: User = Depends(get_current_user)
 ):
@@ -134,45 +138,45 @@ async def list_google_models(
     api_key = api_key.strip()
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://generativelanguage.googleapis.com/v1/models",
-                params={"key": api_key},
-                timeout=10.0
+        client = get_http_client("google")
+        response = await client.get(
+            "https://generativelanguage.googleapis.com/v1/models",
+            params={"key": api_key},
+            timeout=10.0
+        )
+        
+        if response.status_code != 200:
+            error_text = response.text[:500] if hasattr(response, 'text') else str(response.status_code)
+            try:
+                error_data = response.json()
+                error_detail = error_data.get("error", {}).get("message", error_text)
+            except:
+                error_detail = error_text
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Erro ao listar modelos: {error_detail}"
             )
-            
-            if response.status_code != 200:
-                error_text = response.text[:500] if hasattr(response, 'text') else str(response.status_code)
-                try:
-                    error_data = response.json()
-                    error_detail = error_data.get("error", {}).get("message", error_text)
-                except:
-                    error_detail = error_text
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Erro ao listar modelos: {error_detail}"
-                )
-            
-            data = response.json()
-            models = []
-            
-            if "models" in data:
-                for model in data["models"]:
-                    name = model.get("name", "")
-                    # Filtrar apenas modelos que suportam generateContent
-                    supported_methods = model.get("supportedGenerationMethods", [])
-                    if "generateContent" in supported_methods:
-                        display_name = model.get("displayName", name)
-                        # Remover prefixo "models/" se existir
-                        if name.startswith("models/"):
-                            name = name.replace("models/", "")
-                        models.append({
-                            "name": name,
-                            "display": display_name
-                        })
-            
-            return {"models": models}
-            
+        
+        data = response.json()
+        models = []
+        
+        if "models" in data:
+            for model in data["models"]:
+                name = model.get("name", "")
+                # Filtrar apenas modelos que suportam generateContent
+                supported_methods = model.get("supportedGenerationMethods", [])
+                if "generateContent" in supported_methods:
+                    display_name = model.get("displayName", name)
+                    # Remover prefixo "models/" se existir
+                    if name.startswith("models/"):
+                        name = name.replace("models/", "")
+                    models.append({
+                        "name": name,
+                        "display": display_name
+                    })
+        
+        return {"models": models}
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -246,6 +250,7 @@ async def create_ai_config(
     db.add(config)
     await db.commit()
     await db.refresh(config)
+    await invalidate_active_ai_config()
     
     return AIConfigResponse(
         id=config.id,
@@ -296,6 +301,7 @@ async def update_ai_config(
     config.updated_at = datetime.utcnow()
     await db.commit()
     await db.refresh(config)
+    await invalidate_active_ai_config()
     
     return AIConfigResponse(
         id=config.id,
@@ -333,6 +339,7 @@ async def delete_ai_config(
     
     await db.delete(config)
     await db.commit()
+    await invalidate_active_ai_config()
     
     return {"message": "Configuração deletada com sucesso"}
 
@@ -365,6 +372,7 @@ async def test_ai_config(
         config.last_error = None if test_result["success"] else test_result.get("error", "Erro desconhecido")
         
         await db.commit()
+        await invalidate_active_ai_config()
         
         return test_result
         
@@ -373,6 +381,7 @@ async def test_ai_config(
         config.status = AIModelStatus.ERROR.value
         config.last_error = str(e)
         await db.commit()
+        await invalidate_active_ai_config()
         
         return {
             "success": False,
@@ -385,83 +394,83 @@ async def _test_provider_connection(config: AIConfig) -> Dict[str, Any]:
     
     try:
         if config.provider == "grok":
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://api.x.ai/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {config.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": config.model_name,
-                        "messages": [{"role": "user", "content": test_prompt}],
-                        "max_tokens": 10
-                    },
-                    timeout=10.0
-                )
-                if response.status_code == 200:
-                    return {"success": True, "message": "Conexão bem-sucedida"}
-                else:
-                    return {"success": False, "error": f"Status {response.status_code}: {response.text[:200]}"}
+            client = get_http_client("grok")
+            response = await client.post(
+                "https://api.x.ai/v1/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {config.api_key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": config.model_name,
+                    "messages": [{"role": "user", "content": test_prompt}],
+                    "max_tokens": 10
+                },
+                timeout=10.0
+            )
+            if response.status_code == 200:
+                return {"success": True, "message": "Conexão bem-sucedida"}
+            else:
+                return {"success": False, "error": f"Status {response.status_code}: {response.text[:200]}"}
         
         elif config.provider == "openai":
             base_url = config.base_url or "https://api.openai.com/v1"
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{base_url}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {config.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": config.model_name,
-                        "messages": [{"role": "user", "content": test_prompt}],
-                        "max_tokens": 10
-                    },
-                    timeout=10.0
-                )
-                if response.status_code == 200:
-                    return {"success": True, "message": "Conexão bem-sucedida"}
-                else:
-                    return {"success": False, "error": f"Status {response.status_code}: {response.text[:200]}"}
+            client = get_http_client("openai")
+            response = await client.post(
+                f"{base_url}/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {config.api_key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": config.model_name,
+                    "messages": [{"role": "user", "content": test_prompt}],
+                    "max_tokens": 10
+                },
+                timeout=10.0
+            )
+            if response.status_code == 200:
+                return {"success": True, "message": "Conexão bem-sucedida"}
+            else:
+                return {"success": False, "error": f"Status {response.status_code}: {response.text[:200]}"}
         
         elif config.provider == "anthropic":
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://api.anthropic.com/v1/messages",
-                    headers={
-                        "x-api-key": config.api_key,
-                        "anthropic-version": "2023-06-01",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": config.model_name,
-                        "max_tokens": 10,
-                        "messages": [{"role": "user", "content": test_prompt}]
-                    },
-                    timeout=10.0
-                )
-                if response.status_code == 200:
-                    return {"success": True, "message": "Conexão bem-sucedida"}
-                else:
-                    return {"success": False, "error": f"Status {response.status_code}: {response.text[:200]}"}
+            client = get_http_client("anthropic")
+            response = await client.post(
+                "https://api.anthropic.com/v1/messages",
+                headers={
+                    "x-api-key": config.api_key,
+                    "anthropic-version": "2023-06-01",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": config.model_name,
+                    "max_tokens": 10,
+                    "messages": [{"role": "user", "content": test_prompt}]
+                },
+                timeout=10.0
+            )
+            if response.status_code == 200:
+                return {"success": True, "message": "Conexão bem-sucedida"}
+            else:
+                return {"success": False, "error": f"Status {response.status_code}: {response.text[:200]}"}
         
         elif config.provider == "ollama":
             base_url = config.base_url or "http://localhost:11434"
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{base_url}/api/generate",
-                    json={
-                        "model": config.model_name,
-                        "prompt": test_prompt,
-                        "stream": False
-                    },
-                    timeout=10.0
-                )
-                if response.status_code == 200:
-                    return {"success": True, "message": "Conexão bem-sucedida"}
-                else:
-                    return {"success": False, "error": f"Status {response.status_code}: {response.text[:200]}"}
+            client = get_http_client("ollama")
+            response = await client.post(
+                f"{base_url}/api/generate",
+                json={
+                    "model": config.model_name,
+                    "prompt": test_prompt,
+                    "stream": False
+                },
+                timeout=10.0
+            )
+            if response.status_code == 200:
+                return {"success": True, "message": "Conexão bem-sucedida"}
+            else:
+                return {"success": False, "error": f"Status {response.status_code}: {response.text[:200]}"}
         
         elif config.provider == "google":
             if not config.api_key:
@@ -477,122 +486,122 @@ async def _test_provider_connection(config: AIConfig) -> Dict[str, Any]:
                     "error": "API key inválida. A chave do Google Gemini deve começar com 'AIza'. Verifique se copiou a chave completa."
                 }
             
-            async with httpx.AsyncClient() as client:
-                try:
-                    # Primeiro, verificar se o modelo existe listando os modelos disponíveis
-                    list_response = await client.get(
-                        "https://generativelanguage.googleapis.com/v1/models",
-                        params={"key": api_key},
-                        timeout=5.0
-                    )
-                    
-                    available_models = []
-                    if list_response.status_code == 200:
-                        list_data = list_response.json()
-                        if "models" in list_data:
-                            for model in list_data["models"]:
-                                model_name_clean = model.get("name", "").replace("models/", "")
-                                supported_methods = model.get("supportedGenerationMethods", [])
-                                if "generateContent" in supported_methods:
-                                    available_models.append(model_name_clean)
-                    
-                    # Adicionar prefixo "models/" se não tiver
-                    model_name = config.model_name
-                    if not model_name.startswith("models/"):
-                        model_name = f"models/{model_name}"
-                    
-                    # Verificar se o modelo está disponível
-                    model_name_clean = config.model_name
-                    if available_models and model_name_clean not in available_models:
-                        # Tentar encontrar modelo similar
-                        similar = [m for m in available_models if model_name_clean.lower() in m.lower() or m.lower() in model_name_clean.lower()]
-                        if not similar:
-                            error_msg = f"Modelo '{config.model_name}' não encontrado.\n\nModelos disponíveis:\n{', '.join(available_models[:10])}"
-                            if len(available_models) > 10:
-                                error_msg += f"\n... e mais {len(available_models) - 10} modelos"
-                            return {"success": False, "error": error_msg}
-                    
-                    response = await client.post(
-                        f"https://generativelanguage.googleapis.com/v1/{model_name}:generateContent",
-                        params={"key": api_key},
-                        json={
-                            "contents": [{
-                                "parts": [{"text": test_prompt}]
-                            }],
-                            "generationConfig": {
-                                "maxOutputTokens": 10
-                            }
-                        },
-                        timeout=10.0
-                    )
-                    if response.status_code == 200:
-                        data = response.json()
-                        if "candidates" in data and len(data["candidates"]) > 0:
-                            return {"success": True, "message": "Conexão bem-sucedida"}
-                        else:
-                            return {"success": False, "error": "Resposta inválida da API"}
-                    else:
-                        error_text = response.text[:200] if hasattr(response, 'text') else str(response.status_code)
-                        try:
-                            error_data = response.json()
-                            error_detail = error_data.get("error", {}).get("message", error_text)
-                            # Mensagem mais amigável para erro de API key
-                            if "API key" in error_detail or "api key" in error_detail.lower():
-                                error_detail = "API key inválida. Verifique:\n1. Se a chave está completa (começa com 'AIza')\n2. Se não há espaços extras\n3. Se a API 'Generative Language API' está ativada no Google Cloud\n4. Se a chave não tem restrições que bloqueiam o uso"
-                            elif "not found" in error_detail.lower() or "404" in error_text:
-                                if available_models:
-                                    error_detail = f"Modelo não encontrado.\n\nModelos disponíveis:\n{', '.join(available_models[:10])}"
-                                    if len(available_models) > 10:
-                                        error_detail += f"\n... e mais {len(available_models) - 10} modelos"
-                                else:
-                                    error_detail = "Modelo não encontrado. Use o botão 'Buscar modelos disponíveis' para ver os modelos suportados."
-                        except:
-                            error_detail = error_text
-                        return {"success": False, "error": f"Status {response.status_code}: {error_detail}"}
-                except httpx.TimeoutException:
-                    return {"success": False, "error": "Timeout ao conectar com o provider"}
-                except Exception as e:
-                    return {"success": False, "error": str(e)}
-        
-        elif config.provider == "mistral":
-            async with httpx.AsyncClient() as client:
+            client = get_http_client("google")
+            try:
+                # Primeiro, verificar se o modelo existe listando os modelos disponíveis
+                list_response = await client.get(
+                    "https://generativelanguage.googleapis.com/v1/models",
+                    params={"key": api_key},
+                    timeout=5.0
+                )
+                
+                available_models = []
+                if list_response.status_code == 200:
+                    list_data = list_response.json()
+                    if "models" in list_data:
+                        for model in list_data["models"]:
+                            model_name_clean = model.get("name", "").replace("models/", "")
+                            supported_methods = model.get("supportedGenerationMethods", [])
+                            if "generateContent" in supported_methods:
+                                available_models.append(model_name_clean)
+                
+                # Adicionar prefixo "models/" se não tiver
+                model_name = config.model_name
+                if not model_name.startswith("models/"):
+                    model_name = f"models/{model_name}"
+                
+                # Verificar se o modelo está disponível
+                model_name_clean = config.model_name
+                if available_models and model_name_clean not in available_models:
+                    # Tentar encontrar modelo similar
+                    similar = [m for m in available_models if model_name_clean.lower() in m.lower() or m.lower() in model_name_clean.lower()]
+                    if not similar:
+                        error_msg = f"Modelo '{config.model_name}' não encontrado.\n\nModelos disponíveis:\n{', '.join(available_models[:10])}"
+                        if len(available_models) > 10:
+                            error_msg += f"\n... e mais {len(available_models) - 10} modelos"
+                        return {"success": False, "error": error_msg}
+                
                 response = await client.post(
-                    "https://api.mistral.ai/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {config.api_key}",
-                        "Content-Type": "application/json"
-                    },
+                    f"https://generativelanguage.googleapis.com/v1/{model_name}:generateContent",
+                    params={"key": api_key},
                     json={
-                        "model": config.model_name,
-                        "messages": [{"role": "user", "content": test_prompt}],
-                        "max_tokens": 10
+                        "contents": [{
+                            "parts": [{"text": test_prompt}]
+                        }],
+                        "generationConfig": {
+                            "maxOutputTokens": 10
+                        }
                     },
                     timeout=10.0
                 )
                 if response.status_code == 200:
-                    return {"success": True, "message": "Conexão bem-sucedida"}
+                    data = response.json()
+                    if "candidates" in data and len(data["candidates"]) > 0:
+                        return {"success": True, "message": "Conexão bem-sucedida"}
+                    else:
+                        return {"success": False, "error": "Resposta inválida da API"}
                 else:
-                    return {"success": False, "error": f"Status {response.status_code}: {response.text[:200]}"}
+                    error_text = response.text[:200] if hasattr(response, 'text') else str(response.status_code)
+                    try:
+                        error_data = response.json()
+                        error_detail = error_data.get("error", {}).get("message", error_text)
+                        # Mensagem mais amigável para erro de API key
+                        if "API key" in error_detail or "api key" in error_detail.lower():
+                            error_detail = "API key inválida. Verifique:\n1. Se a chave está completa (começa com 'AIza')\n2. Se não há espaços extras\n3. Se a API 'Generative Language API' está ativada no Google Cloud\n4. Se a chave não tem restrições que bloqueiam o uso"
+                        elif "not found" in error_detail.lower() or "404" in error_text:
+                            if available_models:
+                                error_detail = f"Modelo não encontrado.\n\nModelos disponíveis:\n{', '.join(available_models[:10])}"
+                                if len(available_models) > 10:
+                                    error_detail += f"\n... e mais {len(available_models) - 10} modelos"
+                            else:
+                                error_detail = "Modelo não encontrado. Use o botão 'Buscar modelos disponíveis' para ver os modelos suportados."
+                    except:
+                        error_detail = error_text
+                    return {"success": False, "error": f"Status {response.status_code}: {error_detail}"}
+            except httpx.TimeoutException:
+                return {"success": False, "error": "Timeout ao conectar com o provider"}
+            except Exception as e:
+                return {"success": False, "error": str(e)}
+        
+        elif config.provider == "mistral":
+            client = get_http_client("mistral")
+            response = await client.post(
+                "https://api.mistral.ai/v1/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {config.api_key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": config.model_name,
+                    "messages": [{"role": "user", "content": test_prompt}],
+                    "max_tokens": 10
+                },
+                timeout=10.0
+            )
+            if response.status_code == 200:
+                return {"success": True, "message": "Conexão bem-sucedida"}
+            else:
+                return {"success": False, "error": f"Status {response.status_code}: {response.text[:200]}"}
         
         elif config.provider == "cohere":
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://api.cohere.ai/v1/generate",
-                    headers={
-                        "Authorization": f"Bearer {config.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": config.model_name,
-                        "prompt": test_prompt,
-                        "max_tokens": 10
-                    },
-                    timeout=10.0
-                )
-                if response.status_code == 200:
-                    return {"success": True, "message": "Conexão bem-sucedida"}
-                else:
-                    return {"success": False, "error": f"Status {response.status_code}: {response.text[:200]}"}
+            client = get_http_client("cohere")
+            response = await client.post(
+                "https://api.cohere.ai/v1/generate",
+                headers={
+                    "Authorization": f"Bearer {config.api_key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": config.model_name,
+                    "prompt": test_prompt,
+                    "max_tokens": 10
+                },
+                timeout=10.0
+            )
+            if response.status_code == 200:
+                return {"success": True, "message": "Conexão bem-sucedida"}
+            else:
+                return {"success": False, "error": f"Status {response.status_code}: {response.text[:200]}"}
         
         else:
             return {"success": False, "error": f"Provider '{config.provider}' não suportado"}
@@ -220,7 +220,7 @@ IMPORTANT: You CANNOT create contacts, opportunities, or execute actions in the
 
         try:
             # Usar configuração de IA ativa (call_ai_api já busca automaticamente)
-            response = await call_ai_api(full_prompt, max_tokens=1000, db=db)
+            response = await call_ai_api(full_prompt, max_tokens=1000, db=db, cache_namespace="public_chat", hedge=True)
             
             return {
                 "response": response,
@@ -1,10 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_
-from sqlalchemy.orm import selectinload
 from decimal import Decimal
 from datetime import datetime, date
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union
 from pydantic import BaseModel
 
 from app.core.database import get_db
@@ -13,6 +12,10 @@ from app.models.commission import CommissionStructure, Commission, QuoteRequest
 from app.models.opportunity import Opportunity
 from app.models.project import Project
 from app.api.dependencies import get_current_user, get_user_role_str
+from app.core.cache import cached_response
+from app.core.pagination import CursorPage, SortKey, apply_offset, paginate, use_cursor
+from app.services.user_names import UserNameResolver, resolve_user_names
+from app.services.commission_engine import CommissionBatchReport, compile_structure, get_structure, run_commission_batch
 
 router = APIRouter(prefix="/commissions", tags=["commissions"])
 
@@ -113,40 +116,6 @@ async def create_structure(
     return structure
 
 
-def calculate_commission(deal_value: float, structure: CommissionStructure) -> Dict[str, Decimal]:
-    """Calcula comissão baseado na estrutura"""
-    deal_decimal = Decimal(str(deal_value))
-    
-    # Encontrar faixa de comissão
-    commission_rate = Decimal("0")
-    for tier in structure.tiered_commissions:
-        min_val = Decimal(str(tier["min"]))
-        max_val = Decimal(str(tier.get("max", float("inf"))))
-        if min_val <= deal_decimal <= max_val:
-            commission_rate = Decimal(str(tier["rate"]))
-            break
-    
-    commission_amount = deal_decimal * commission_rate
-    
-    # Calcular bônus de performance
-    performance_bonus = Decimal("0")
-    for bonus in structure.performance_bonuses:
-        if deal_decimal >= Decimal(str(bonus["threshold"])):
-            performance_bonus = Decimal(str(bonus["bonus"]))
-    
-    weekly_base = structure.weekly_base
-    
-    total = weekly_base + commission_amount + performance_bonus
-    
-    return {
-        "weekly_base": weekly_base,
-        "commission_rate": commission_rate,
-        "commission_amount": commission_amount,
-        "performance_bonus": performance_bonus,
-        "total_amount": total
-    }
-
-
 @router.post("/calculate")
 async def calculate_commission(
     request: CommissionCalculationRequest,
@@ -160,26 +129,19 @@ async def calculate_commission(
     # Buscar estrutura ativa (ou usar padrão)
     structure = None
     if request.structure_id:
-        result = await db.execute(
-            select(CommissionStructure).where(
-                CommissionStructure.id == request.structure_id,
-                CommissionStructure.is_active == True
-            )
-        )
-        structure = result.scalar_one_or_none()
+        structure = await get_structure(db, request.structure_id)
+        if structure and not structure.is_active:
+            structure = None
 
     if not structure:
         # Usar estrutura padrão
-        result = await db.execute(
-            select(CommissionStructure).where(CommissionStructure.is_active == True).limit(1)
-        )
-        structure = result.scalar_one_or_none()
+        structure = await get_structure(db)
 
     if not structure:
         raise HTTPException(status_code=404, detail="Nenhuma estrutura de comissão ativa encontrada")
 
     # Calcular comissão
-    result = calculate_commission(deal_value=request.deal_value, structure=structure)
+    result = compile_structure(structure).calculate(request.deal_value)
 
     return {
         "deal_value": request.deal_value,
@@ -211,22 +173,13 @@ async def calculate_opportunity_commission(
         raise HTTPException(status_code=403, detail="Acesso negado")
     
     # Buscar estrutura (ou usar padrão)
-    if structure_id:
-        result = await db.execute(
-            select(CommissionStructure).where(CommissionStructure.id == structure_id)
-        )
-        structure = result.scalar_one_or_none()
-    else:
-        result = await db.execute(
-            select(CommissionStructure).where(CommissionStructure.is_active == True)
-        )
-        structure = result.scalar_one_or_none()
+    structure = await get_structure(db, structure_id)
     
     if not structure:
         raise HTTPException(status_code=404, detail="Estrutura de comissão não encontrada")
     
     deal_value = float(opportunity.value or 0)
-    calculation = calculate_commission(deal_value, structure)
+    calculation = compile_structure(structure).calculate(deal_value)
     
     return {
         "opportunity_id": opportunity_id,
@@ -239,36 +192,75 @@ async def calculate_opportunity_commission(
     }
 
 
-@router.get("/", response_model=List[CommissionResponse])
-async def list_commissions(
+@router.post("/batch", response_model=CommissionBatchReport)
+async def run_period_commissions(
+    payment_period: str,
+    structure_id: Optional[int] = None,
+    dry_run: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Lista todas as comissões - apenas admin"""
+    """Calcula as comissões de todos os deals ganhos no período (ex.: 2025-01) - apenas admin
+
+    Deals que já têm comissão são ignorados; dry_run devolve o relatório sem gravar.
+    """
     if get_user_role_str(current_user) != "admin":
         raise HTTPException(status_code=403, detail="Acesso negado")
     
-    result = await db.execute(
-        select(Commission)
-        .options(selectinload(Commission.seller))
-        .order_by(Commission.created_at.desc())
+    structure = await get_structure(db, structure_id)
+    if not structure:
+        raise HTTPException(status_code=404, detail="Estrutura de comissão não encontrada")
+    
+    try:
+        return await run_commission_batch(db, payment_period, structure, dry_run=dry_run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _commission_response(c: Commission, names: UserNameResolver) -> CommissionResponse:
+    return CommissionResponse(
+        id=c.id,
+        seller_id=c.seller_id,
+        seller_name=names.get(c.seller_id),
+        deal_value=float(c.deal_value),
+        commission_amount=float(c.commission_amount),
+        total_amount=float(c.total_amount),
+        status=c.status,
+        payment_period=c.payment_period,
+        created_at=c.created_at
     )
+
+
+COMMISSION_SORT = SortKey((Commission.created_at, Commission.id), descending=True)
+
+
+@router.get("/", response_model=Union[CursorPage[CommissionResponse], List[CommissionResponse]])
+@cached_response("commissions", ttl=60, per_user=False, invalidated_by=(Commission, User))
+async def list_commissions(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    skip: int = 0,
+    limit: Optional[int] = None,
+    pagination: str = "offset",
+    cursor: Optional[str] = None
+):
+    """Lista todas as comissões - apenas admin (sem limit no modo offset retorna todas)"""
+    if get_user_role_str(current_user) != "admin":
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    
+    query = select(Commission)
+    
+    if use_cursor(pagination, cursor):
+        page = await paginate(db, query, COMMISSION_SORT, cursor, limit or 100)
+        names = await resolve_user_names(db, (c.seller_id for c in page.items))
+        page.items = [_commission_response(c, names) for c in page.items]
+        return page
+    
+    result = await db.execute(apply_offset(query, COMMISSION_SORT, skip, limit))
     commissions = result.scalars().all()
+    names = await resolve_user_names(db, (c.seller_id for c in commissions))
     
-    return [
-        CommissionResponse(
-            id=c.id,
-            seller_id=c.seller_id,
-            seller_name=c.seller.name if c.seller else None,
-            deal_value=float(c.deal_value),
-            commission_amount=float(c.commission_amount),
-            total_amount=float(c.total_amount),
-            status=c.status,
-            payment_period=c.payment_period,
-            created_at=c.created_at
-        )
-        for c in commissions
-    ]
+    return [_commission_response(c, names) for c in commissions]
 
 
 @router.get("/seller/{seller_id}", response_model=List[CommissionResponse])
@@ -289,21 +281,9 @@ async def get_seller_commissions(
     if period:
         query = query.where(Commission.payment_period == period)
     
-    result = await db.execute(query.options(selectinload(Commission.seller)))
+    result = await db.execute(query)
     commissions = result.scalars().all()
+    names = await resolve_user_names(db, (seller_id,))
     
-    return [
-        CommissionResponse(
-            id=c.id,
-            seller_id=c.seller_id,
-            seller_name=c.seller.name if c.seller else None,
-            deal_value=float(c.deal_value),
-            commission_amount=float(c.commission_amount),
-            total_amount=float(c.total_amount),
-            status=c.status,
-            payment_period=c.payment_period,
-            created_at=c.created_at
-        )
-        for c in commissions
-    ]
+    return [_commission_response(c, names) for c in commissions]
 
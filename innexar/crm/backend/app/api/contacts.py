@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List, Optional
+from typing import List, Optional, Union
 from app.core.database import get_db
+from app.core.read_replica import get_read_db
 from app.models.contact import Contact
 from app.models.user import User
 from app.api.dependencies import get_current_user, get_user_role_str
+from app.services.export import export_response, model_columns
+from app.core.pagination import CursorPage, SortKey, apply_offset, paginate, use_cursor
+from app.services.jobs import enqueue_lead_analysis
+from app.services.contact_import import ContactImportReport, detect_format, import_contacts
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -60,27 +65,52 @@ class ContactResponse(ContactBase):
     class Config:
         from_attributes = True
 
-@router.get("/", response_model=List[ContactResponse])
+CONTACT_SORT = SortKey((Contact.created_at, Contact.id))
+
+@router.get("/", response_model=Union[CursorPage[ContactResponse], List[ContactResponse]])
 async def list_contacts(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    pagination: str = "offset",
+    cursor: Optional[str] = None
 ):
+    """Lista contatos (pagination=cursor retorna items + next_cursor/prev_cursor)"""
     # Vendedor vê apenas seus contatos, admin vê todos
     query = select(Contact)
     if get_user_role_str(current_user) == "vendedor":
         query = query.where(Contact.owner_id == current_user.id)
     
-    query = query.offset(skip).limit(limit)
+    if use_cursor(pagination, cursor):
+        page = await paginate(db, query, CONTACT_SORT, cursor, limit)
+        page.items = [ContactResponse.model_validate(contact) for contact in page.items]
+        return page
+    
+    query = apply_offset(query, CONTACT_SORT, skip, limit)
     result = await db.execute(query)
     contacts = result.scalars().all()
     return [ContactResponse.model_validate(contact) for contact in contacts]
 
+@router.get("/export")
+async def export_contacts(
+    format: str = "csv",
+    gzip: bool = False,
+    updated_since: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Exporta contatos em CSV/NDJSON via streaming (vendedor exporta apenas os seus)"""
+    columns = model_columns(Contact)
+    query = select(*columns).order_by(Contact.id)
+    if get_user_role_str(current_user) == "vendedor":
+        query = query.where(Contact.owner_id == current_user.id)
+    if updated_since:
+        query = query.where(Contact.updated_at >= updated_since)
+    return export_response(query, [column.key for column in columns], format, gzip, "contacts")
+
 @router.post("/", response_model=ContactResponse)
 async def create_contact(
     contact_data: ContactCreate,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -89,16 +119,41 @@ async def create_contact(
         owner_id=current_user.id
     )
     db.add(contact)
-    await db.commit()
-    await db.refresh(contact)
+    await db.flush()
     
-    # Se for um lead, iniciar análise automática
+    # Se for um lead, agendar análise automática (mesma transação do contato)
     if contact.status == "lead":
-        from app.api.lead_analysis import analyze_lead_background
-        background_tasks.add_task(analyze_lead_background, contact.id)
+        await enqueue_lead_analysis(db, contact.id)
+    
+    await db.commit()
+    await db.refresh(contact)
     
     return ContactResponse.model_validate(contact)
 
+@router.post("/import", response_model=ContactImportReport)
+async def import_contacts_file(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    analyze_leads: bool = True,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Importa contatos de um arquivo CSV ou NDJSON (deduplicação por email)
+
+    Colunas/chaves aceitas: name (obrigatório), email, phone, company, status,
+    notes, project_type, budget_range, timeline, website, linkedin, position,
+    industry, company_size, source. Os contatos ficam com o usuário atual como
+    responsável e leads novos entram na fila de análise (analyze_leads).
+    """
+    fmt = format or detect_format(file.filename, file.content_type)
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="Formato deve ser 'csv' ou 'ndjson'")
+    
+    try:
+        return await import_contacts(db, file.file, fmt, current_user.id, analyze_leads)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/{contact_id}", response_model=ContactResponse)
 async def get_contact(
     contact_id: int,
@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.core.database import get_db
 from app.core.auth import verify_token
+from app.core.user_cache import CachedUser, get_cached_user, cache_user
 from app.models.user import User, UserRole
 
 security = HTTPBearer()
@@ -25,7 +26,7 @@ def is_user_role(user: User, role: UserRole) -> bool:
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
-) -> User:
+) -> CachedUser:
     token = credentials.credentials
     payload = verify_token(token)
     
@@ -42,8 +43,13 @@ async def get_current_user(
             detail="Token inválido"
         )
     
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    user = await get_cached_user(user_id)
+    if user is None:
+        result = await db.execute(select(User).where(User.id == user_id))
+        db_user = result.scalar_one_or_none()
+        if db_user:
+            user = CachedUser.from_user(db_user)
+            await cache_user(user)
     
     if not user or not user.is_active:
         raise HTTPException(
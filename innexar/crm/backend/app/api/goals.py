@@ -1,16 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_, desc
+from sqlalchemy.orm import aliased
 from app.core.database import get_db
 from app.models.user import User, UserRole
 from app.models.goal import Goal, GoalType, GoalPeriod, GoalStatus, GoalCategory
 from app.api.dependencies import get_current_user, get_user_role_str
+from app.core.cache import cached_response
+from app.services.user_names import resolve_user_names
+from app.services.goal_progress import enqueue_goal_progress, recompute_goal_progress
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, timedelta
 
 router = APIRouter(prefix="/goals", tags=["goals"])
 
+Assignee = aliased(User)
+Creator = aliased(User)
+
+def _select_goals():
+    """Metas com os nomes do responsável e do criador na mesma consulta"""
+    return (
+        select(Goal, Assignee.name.label("assignee_name"), Creator.name.label("creator_name"))
+        .outerjoin(Assignee, Assignee.id == Goal.assignee_id)
+        .outerjoin(Creator, Creator.id == Goal.creator_id)
+    )
+
 class GoalCreate(BaseModel):
     title: str
     description: Optional[str] = None
@@ -97,10 +112,12 @@ async def create_goal(
     db.add(goal)
     await db.commit()
     await db.refresh(goal)
+    await enqueue_goal_progress([goal.assignee_id or goal.creator_id])
 
-    return await _format_goal_response(goal, db)
+    return await _goal_response(goal, db)
 
 @router.get("/", response_model=List[GoalResponse])
+@cached_response("goals", ttl=60, invalidated_by=(Goal, User))
 async def list_goals(
     goal_type: Optional[GoalType] = None,
     status: Optional[GoalStatus] = None,
@@ -109,7 +126,7 @@ async def list_goals(
     current_user: User = Depends(get_current_user)
 ):
     """Lista metas com filtros"""
-    query = select(Goal)
+    query = _select_goals()
 
     # Filtros
     if goal_type:
@@ -135,9 +152,19 @@ async def list_goals(
     query = query.order_by(desc(Goal.created_at))
 
     result = await db.execute(query)
-    goals = result.scalars().all()
 
-    return [await _format_goal_response(goal, db) for goal in goals]
+    return [_format_goal_response(row.Goal, row.assignee_name, row.creator_name) for row in result]
+
+@router.post("/recompute")
+async def recompute_goals(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Recalcula o progresso de todas as metas ativas a partir dos dados do CRM (apenas admin)"""
+    if get_user_role_str(current_user) != "admin":
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    updated = await recompute_goal_progress(db)
+    return {"message": "Progresso das metas recalculado", "updated": updated}
 
 @router.get("/{goal_id}", response_model=GoalResponse)
 async def get_goal(
@@ -146,18 +173,19 @@ async def get_goal(
     current_user: User = Depends(get_current_user)
 ):
     """Busca meta específica"""
-    result = await db.execute(select(Goal).where(Goal.id == goal_id))
-    goal = result.scalar_one_or_none()
+    result = await db.execute(_select_goals().where(Goal.id == goal_id))
+    row = result.one_or_none()
 
-    if not goal:
+    if not row:
         raise HTTPException(status_code=404, detail="Meta não encontrada")
+    goal = row.Goal
 
     # Verifica permissões
     user_role = get_user_role_str(current_user)
     if user_role != "admin" and goal.assignee_id != current_user.id:
         raise HTTPException(status_code=403, detail="Acesso negado")
 
-    return await _format_goal_response(goal, db)
+    return _format_goal_response(goal, row.assignee_name, row.creator_name)
 
 @router.put("/{goal_id}", response_model=GoalResponse)
 async def update_goal(
@@ -189,8 +217,9 @@ async def update_goal(
 
     await db.commit()
     await db.refresh(goal)
+    await enqueue_goal_progress([goal.assignee_id or goal.creator_id])
 
-    return await _format_goal_response(goal, db)
+    return await _goal_response(goal, db)
 
 @router.delete("/{goal_id}")
 async def delete_goal(
@@ -244,21 +273,15 @@ async def update_progress(
 
     await db.commit()
 
-    return await _format_goal_response(goal, db)
+    return await _goal_response(goal, db)
 
-async def _format_goal_response(goal: Goal, db: AsyncSession) -> GoalResponse:
-    """Formata resposta da meta com nomes dos usuários"""
-    assignee_name = None
-    if goal.assignee_id:
-        result = await db.execute(select(User.name).where(User.id == goal.assignee_id))
-        assignee_name = result.scalar_one_or_none()
-
-    creator_name = ""
-    result = await db.execute(select(User.name).where(User.id == goal.creator_id))
-    creator_name_result = result.scalar_one_or_none()
-    if creator_name_result:
-        creator_name = creator_name_result
+async def _goal_response(goal: Goal, db: AsyncSession) -> GoalResponse:
+    """Resposta de uma meta avulsa (nomes em uma única consulta)"""
+    names = await resolve_user_names(db, (goal.assignee_id, goal.creator_id))
+    return _format_goal_response(goal, names.get(goal.assignee_id), names.get(goal.creator_id))
 
+def _format_goal_response(goal: Goal, assignee_name: Optional[str], creator_name: Optional[str]) -> GoalResponse:
+    """Formata resposta da meta com nomes dos usuários"""
     return GoalResponse(
         id=goal.id,
         title=goal.title,
@@ -271,7 +294,7 @@ async def _format_goal_response(goal: Goal, db: AsyncSession) -> GoalResponse:
         unit=goal.unit,
         assignee_id=goal.assignee_id,
         assignee_name=assignee_name,
-        creator_name=creator_name,
+        creator_name=creator_name or "",
         start_date=goal.start_date,
         end_date=goal.end_date,
         completed_at=goal.completed_at,
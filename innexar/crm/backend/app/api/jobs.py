@@ -0,0 +1,68 @@
+"""
+API de acompanhamento da fila de jobs em background
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.core.database import get_db
+from app.models.user import User
+from app.models.background_job import BackgroundJob
+from app.api.dependencies import get_current_user, get_user_role_str
+from pydantic import BaseModel
+from typing import Optional, List, Dict, Any
+from datetime import datetime
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+class JobResponse(BaseModel):
+    id: int
+    job_type: str
+    payload: Optional[Dict[str, Any]] = None
+    status: str
+    attempts: int
+    max_attempts: int
+    run_at: datetime
+    last_error: Optional[str] = None
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+@router.get("/", response_model=List[JobResponse])
+async def list_jobs(
+    status: Optional[str] = None,
+    job_type: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Lista jobs (apenas admin)"""
+    if get_user_role_str(current_user) != "admin":
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    
+    query = select(BackgroundJob)
+    if status:
+        query = query.where(BackgroundJob.status == status)
+    if job_type:
+        query = query.where(BackgroundJob.job_type == job_type)
+    
+    result = await db.execute(query.order_by(BackgroundJob.id.desc()).offset(skip).limit(limit))
+    return [JobResponse.model_validate(job) for job in result.scalars().all()]
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Retorna o status de um job (apenas admin)"""
+    if get_user_role_str(current_user) != "admin":
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    
+    job = await db.get(BackgroundJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    
+    return JobResponse.model_validate(job)
@@ -1,22 +1,33 @@
 """
 API para análise automática de leads pela IA
 """
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.core.database import get_db
+from app.core.read_replica import get_read_db
 from app.models.user import User
 from app.models.contact import Contact
 from app.models.lead_analysis import LeadAnalysis
 from app.models.ai_config import AIConfig, AIModelStatus
 from app.api.dependencies import get_current_user, get_user_role_str
-from app.api.ai import call_ai_api, get_active_ai_config
+from app.core.pagination import CursorPage, SortKey, apply_offset, paginate, use_cursor
+from app.api.ai import call_ai_api, call_ai_structured, get_active_ai_config
+from app.core.config import settings
+from app.services.jobs import job_handler, enqueue_lead_analysis
+from app.services.lead_analysis_parser import LeadAnalysisOutput, ParsedLeadAnalysis, parse_lead_analysis
+from app.services.structured_output import StructuredOutputError
+from app.services.lead_analysis_batch import (
+    LeadAnalysisBatchFilter,
+    LeadAnalysisBatchProgress,
+    get_lead_analysis_batch,
+    start_lead_analysis_batch,
+)
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Union
 from datetime import datetime
 import httpx
 import json
-import re
 
 router = APIRouter(prefix="/lead-analysis", tags=["lead-analysis"])
 
@@ -37,8 +48,51 @@ class LeadAnalysisResponse(BaseModel):
     class Config:
         from_attributes = True
 
-async def analyze_lead_background(contact_id: int):
-    """Função de background para analisar lead"""
+async def create_opportunity_from_analysis(db: AsyncSession, contact: Contact, analysis: LeadAnalysis):
+    """Cria a oportunidade do lead com os dados da análise concluída (se ainda não existir).
+
+    Roda em um savepoint na transação que conclui a análise: uma falha aqui não
+    desfaz a análise.
+    """
+    from app.models.opportunity import Opportunity
+    from app.services.rollup import opportunity_state, track_opportunity
+    
+    try:
+        async with db.begin_nested():
+            result = await db.execute(
+                select(Opportunity.id).where(Opportunity.contact_id == contact.id).limit(1)
+            )
+            if result.scalar_one_or_none() is not None:
+                return
+            
+            opportunity_value = None
+            if analysis.analysis_metadata and analysis.analysis_metadata.get("potential_value") is not None:
+                try:
+                    opportunity_value = float(analysis.analysis_metadata["potential_value"])
+                except (TypeError, ValueError):
+                    pass
+            
+            opportunity = Opportunity(
+                name=f"{contact.company or contact.name} - Oportunidade",
+                contact_id=contact.id,
+                owner_id=contact.owner_id,
+                value=opportunity_value,
+                stage="qualificacao",
+                probability=analysis.opportunity_score or 50
+            )
+            db.add(opportunity)
+            await track_opportunity(db, None, opportunity_state(opportunity))
+    except Exception as e:
+        print(f"Erro ao criar oportunidade após análise do contato {contact.id}: {str(e)}")
+
+async def analyze_lead_background(contact_id: int, create_opportunity: bool = False, force: bool = False):
+    """Analisa o lead com a IA (executado pelo worker de jobs).
+
+    Falhas na chamada da IA marcam a análise como erro e são propagadas para
+    que o worker agende uma nova tentativa. Com create_opportunity=True a
+    oportunidade é criada na mesma transação que conclui a análise; com
+    force=True uma análise já concluída é refeita.
+    """
     from app.core.database import AsyncSessionLocal
     
     async with AsyncSessionLocal() as db_session:
@@ -54,8 +108,12 @@ async def analyze_lead_background(contact_id: int):
             result = await db_session.execute(select(LeadAnalysis).where(LeadAnalysis.contact_id == contact_id))
             existing_analysis = result.scalar_one_or_none()
             
-            if existing_analysis and existing_analysis.analysis_status == "completed":
-                return  # Já analisado
+            if existing_analysis and existing_analysis.analysis_status == "completed" and not force:
+                # Já analisado
+                if create_opportunity:
+                    await create_opportunity_from_analysis(db_session, contact, existing_analysis)
+                    await db_session.commit()
+                return
             
             # Criar ou atualizar análise
             if not existing_analysis:
@@ -128,7 +186,10 @@ INSTRUÇÕES IMPORTANTES:
 
 4. Forneça recomendações práticas e acionáveis
 
-RESPONDA APENAS EM TEXTO ESTRUTURADO (NÃO JSON), no seguinte formato:
+"""
+            final_instruction = "Seja EXTREMAMENTE detalhado e use informações REAIS quando possível. Se não encontrar informações específicas, indique claramente."
+            # Formato em texto: usado quando a saída estruturada está desligada ou falha
+            text_format = """RESPONDA APENAS EM TEXTO ESTRUTURADO (NÃO JSON), no seguinte formato:
 
 === INFORMAÇÕES DA EMPRESA ===
 [Nome da empresa, setor, tamanho, localização, faturamento anual estimado, número de funcionários]
@@ -162,134 +223,43 @@ RESPONDA APENAS EM TEXTO ESTRUTURADO (NÃO JSON), no seguinte formato:
 === FONTES DE PESQUISA ===
 [Lista de fontes utilizadas: sites, redes sociais, notícias, etc.]
 
-Seja EXTREMAMENTE detalhado e use informações REAIS quando possível. Se não encontrar informações específicas, indique claramente."""
+"""
 
             try:
-                # Chamar IA para análise
-                ai_response = await call_ai_api(analysis_prompt, max_tokens=4000, db=db_session, config=ai_config)
+                # Reanálise forçada não reaproveita a resposta anterior do cache
+                cache_namespace = None if force else "lead_analysis"
+                parsed = None
+                output_format = "json"
+                if settings.AI_STRUCTURED_OUTPUT:
+                    try:
+                        # Campos e descrições vão no schema de LeadAnalysisOutput
+                        output = await call_ai_structured(
+                            analysis_prompt + "Preencha cada campo do formato de resposta. " + final_instruction,
+                            LeadAnalysisOutput,
+                            max_tokens=4000,
+                            db=db_session,
+                            config=ai_config,
+                            cache_namespace=cache_namespace,
+                            cache_ttl=24 * 3600
+                        )
+                        parsed = ParsedLeadAnalysis.from_output(output)
+                    except StructuredOutputError as e:
+                        print(f"⚠️ Análise estruturada do lead {contact_id} falhou, usando texto: {e}")
                 
-                # Processar resposta estruturada (não JSON)
-                full_analysis = ai_response.strip()
+                if parsed is None:
+                    output_format = "text"
+                    ai_response = await call_ai_api(
+                        analysis_prompt + text_format + final_instruction,
+                        max_tokens=4000,
+                        db=db_session,
+                        config=ai_config,
+                        cache_namespace=cache_namespace,
+                        cache_ttl=24 * 3600
+                    )
+                    parsed = parse_lead_analysis(ai_response)
                 
-                # Remover markdown code blocks se houver
-                if full_analysis.startswith("```"):
-                    # Encontrar o fim do bloco de código
-                    lines = full_analysis.split('\n')
-                    start_idx = 0
-                    end_idx = len(lines)
-                    for i, line in enumerate(lines):
-                        if line.strip().startswith("```") and i > 0:
-                            if start_idx == 0:
-                                start_idx = i + 1
-                            else:
-                                end_idx = i
-                                break
-                    full_analysis = '\n'.join(lines[start_idx:end_idx]).strip()
-                
-                # Extrair seções da análise estruturada
-                sections = {
-                    "company_info": "",
-                    "digital_presence": "",
-                    "market_analysis": "",
-                    "financial_insights": "",
-                    "lead_profile": "",
-                    "business_potential": "",
-                    "recommendations": "",
-                    "risk_assessment": "",
-                    "sources": ""
-                }
-                
-                # Extrair score de oportunidade (ex: "Score de oportunidade: 75/100" ou "Score: 75")
-                opportunity_score = None
-                score_patterns = [
-                    r'Score de oportunidade[:\s]+(\d+)',
-                    r'Score[:\s]+(\d+)',
-                    r'opportunity_score[:\s]+(\d+)',
-                    r'pontuação[:\s]+(\d+)'
-                ]
-                for pattern in score_patterns:
-                    score_match = re.search(pattern, full_analysis, re.IGNORECASE)
-                    if score_match:
-                        opportunity_score = int(score_match.group(1))
-                        break
-                
-                # Extrair valor potencial (ex: "Valor potencial estimado: R$ 50000")
-                potential_value = None
-                value_patterns = [
-                    r'Valor potencial estimado[:\s]+R\$\s*([\d.,]+)',
-                    r'Valor estimado[:\s]+R\$\s*([\d.,]+)',
-                    r'potential_value[:\s]+R\$\s*([\d.,]+)',
-                    r'R\$\s*([\d.,]+)'
-                ]
-                for pattern in value_patterns:
-                    value_match = re.search(pattern, full_analysis, re.IGNORECASE)
-                    if value_match:
-                        value_str = value_match.group(1).replace('.', '').replace(',', '.')
-                        try:
-                            potential_value = float(value_str)
-                            break
-                        except:
-                            pass
-                
-                # Dividir análise em seções usando padrões de título
-                section_patterns = {
-                    "company_info": [
-                        r"=== INFORMAÇÕES DA EMPRESA ===\s*\n(.*?)(?=\n===|\n==|\Z)",
-                        r"INFORMAÇÕES DA EMPRESA[:\n]+(.*?)(?=\n[A-ZÁÊÔÇ]{3,}|==|\Z)",
-                        r"Empresa[:\n]+(.*?)(?=\n[A-ZÁÊÔÇ]{3,}|==|\Z)"
-                    ],
-                    "digital_presence": [
-                        r"=== PRESENÇA DIGITAL ===\s*\n(.*?)(?=\n===|\n==|\Z)",
-                        r"PRESENÇA DIGITAL[:\n]+(.*?)(?=\n[A-ZÁÊÔÇ]{3,}|==|\Z)",
-                        r"Digital[:\n]+(.*?)(?=\n[A-ZÁÊÔÇ]{3,}|==|\Z)"
-                    ],
-                    "market_analysis": [
-                        r"=== ANÁLISE DE MERCADO ===\s*\n(.*?)(?=\n===|\n==|\Z)",
-                        r"ANÁLISE DE MERCADO[:\n]+(.*?)(?=\n[A-ZÁÊÔÇ]{3,}|==|\Z)",
-                        r"Mercado[:\n]+(.*?)(?=\n[A-ZÁÊÔÇ]{3,}|==|\Z)"
-                    ],
-                    "financial_insights": [
-                        r"=== INSIGHTS FINANCEIROS ===\s*\n(.*?)(?=\n===|\n==|\Z)",
-                        r"INSIGHTS FINANCEIROS[:\n]+(.*?)(?=\n[A-ZÁÊÔÇ]{3,}|==|\Z)",
-                        r"Financeiro[:\n]+(.*?)(?=\n[A-ZÁÊÔÇ]{3,}|==|\Z)"
-                    ],
-                    "lead_profile": [
-                        r"=== PERFIL DO LEAD ===\s*\n(.*?)(?=\n===|\n==|\Z)",
-                        r"PERFIL DO LEAD[:\n]+(.*?)(?=\n[A-ZÁÊÔÇ]{3,}|==|\Z)",
-                        r"Perfil[:\n]+(.*?)(?=\n[A-ZÁÊÔÇ]{3,}|==|\Z)"
-                    ],
-                    "business_potential": [
-                        r"=== POTENCIAL DE NEGÓCIO ===\s*\n(.*?)(?=\n===|\n==|\Z)",
-                        r"POTENCIAL DE NEGÓCIO[:\n]+(.*?)(?=\n[A-ZÁÊÔÇ]{3,}|==|\Z)",
-                        r"Potencial[:\n]+(.*?)(?=\n[A-ZÁÊÔÇ]{3,}|==|\Z)"
-                    ],
-                    "recommendations": [
-                        r"=== RECOMENDAÇÕES ESTRATÉGICAS ===\s*\n(.*?)(?=\n===|\n==|\Z)",
-                        r"RECOMENDAÇÕES[:\n]+(.*?)(?=\n[A-ZÁÊÔÇ]{3,}|==|\Z)",
-                        r"Recomendações[:\n]+(.*?)(?=\n[A-ZÁÊÔÇ]{3,}|==|\Z)"
-                    ],
-                    "risk_assessment": [
-                        r"=== AVALIAÇÃO DE RISCOS ===\s*\n(.*?)(?=\n===|\n==|\Z)",
-                        r"AVALIAÇÃO DE RISCOS[:\n]+(.*?)(?=\n[A-ZÁÊÔÇ]{3,}|==|\Z)",
-                        r"Riscos[:\n]+(.*?)(?=\n[A-ZÁÊÔÇ]{3,}|==|\Z)"
-                    ],
-                    "sources": [
-                        r"=== FONTES DE PESQUISA ===\s*\n(.*?)(?=\n===|\n==|\Z)",
-                        r"FONTES[:\n]+(.*?)(?=\n[A-ZÁÊÔÇ]{3,}|==|\Z)",
-                        r"Fontes[:\n]+(.*?)(?=\n[A-ZÁÊÔÇ]{3,}|==|\Z)"
-                    ]
-                }
-                
-                for section_name, patterns in section_patterns.items():
-                    for pattern in patterns:
-                        match = re.search(pattern, full_analysis, re.DOTALL | re.IGNORECASE | re.MULTILINE)
-                        if match:
-                            sections[section_name] = match.group(1).strip()
-                            break
-                
-                # Se não encontrou seções estruturadas, usar a resposta completa como company_info
-                if not any(sections.values()):
-                    sections["company_info"] = full_analysis
+                full_analysis = parsed.text
+                sections = parsed.sections
                 
                 # Atualizar análise
                 analysis.company_info = sections["company_info"] or (sections["digital_presence"] if sections["digital_presence"] else full_analysis[:500])
@@ -297,14 +267,16 @@ Seja EXTREMAMENTE detalhado e use informações REAIS quando possível. Se não
                 analysis.financial_insights = sections["financial_insights"]
                 analysis.recommendations = sections["recommendations"]
                 analysis.risk_assessment = sections["risk_assessment"]
-                analysis.opportunity_score = opportunity_score
+                analysis.opportunity_score = parsed.opportunity_score
                 analysis.analysis_metadata = {
                     "digital_presence": sections["digital_presence"],
                     "lead_profile": sections["lead_profile"],
                     "business_potential": sections["business_potential"],
                     "sources": sections["sources"],
-                    "potential_value": potential_value,
+                    "potential_value": parsed.potential_value,
+                    "close_probability": parsed.close_probability,
                     "full_analysis": full_analysis,
+                    "output_format": output_format,
                     "ai_model": ai_config.model_name,
                     "provider": ai_config.provider
                 }
@@ -312,6 +284,9 @@ Seja EXTREMAMENTE detalhado e use informações REAIS quando possível. Se não
                 analysis.analysis_status = "completed"
                 analysis.analyzed_at = datetime.utcnow()
                 
+                if create_opportunity:
+                    await create_opportunity_from_analysis(db_session, contact, analysis)
+                
                 await db_session.commit()
                 
             except Exception as e:
@@ -319,14 +294,31 @@ Seja EXTREMAMENTE detalhado e use informações REAIS quando possível. Se não
                 analysis.error_message = str(e)
                 await db_session.commit()
                 print(f"Erro ao analisar lead {contact_id}: {str(e)}")
+                raise
         
         except Exception as e:
             print(f"Erro na análise de lead: {str(e)}")
+            raise
+
+async def _lead_analysis_concurrency_key() -> str:
+    """Jobs de análise são limitados por provider de IA ativo"""
+    from app.core.database import AsyncSessionLocal
+    
+    async with AsyncSessionLocal() as db_session:
+        config = await get_active_ai_config(db_session)
+    return config.provider if config else "default"
+
+@job_handler("lead_analysis", concurrency_key=_lead_analysis_concurrency_key)
+async def run_lead_analysis_job(payload: Dict[str, Any]):
+    await analyze_lead_background(
+        payload["contact_id"],
+        create_opportunity=payload.get("create_opportunity", False),
+        force=payload.get("force", False)
+    )
 
 @router.post("/analyze/{contact_id}")
 async def trigger_lead_analysis(
     contact_id: int,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -342,15 +334,53 @@ async def trigger_lead_analysis(
     if role_str != "admin" and contact.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Você não tem permissão para analisar este lead")
     
-    # Adicionar tarefa de background
-    background_tasks.add_task(analyze_lead_background, contact_id)
+    # Agendar na fila de jobs
+    job = await enqueue_lead_analysis(db, contact_id)
+    await db.commit()
+    
+    return {"message": "Análise iniciada em background", "contact_id": contact_id, "job_id": job.id, "job_status": job.status}
+
+@router.post("/batch", response_model=LeadAnalysisBatchProgress)
+async def trigger_lead_analysis_batch(
+    filters: LeadAnalysisBatchFilter,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Agenda a (re)análise de todos os contatos do filtro (apenas admin)
+
+    Por padrão só contatos sem análise ou com erro; analysis="all" refaz as concluídas.
+    """
+    if get_user_role_str(current_user) != "admin":
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    
+    try:
+        job = await start_lead_analysis_batch(db, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await db.commit()
     
-    return {"message": "Análise iniciada em background", "contact_id": contact_id}
+    return await get_lead_analysis_batch(db, job.payload["batch_id"])
+
+@router.get("/batch/{batch_id}", response_model=LeadAnalysisBatchProgress)
+async def get_lead_analysis_batch_progress(
+    batch_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Progresso de um lote de análises (apenas admin)"""
+    if get_user_role_str(current_user) != "admin":
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    
+    progress = await get_lead_analysis_batch(db, batch_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="Lote não encontrado")
+    
+    return progress
 
 @router.get("/{contact_id}", response_model=LeadAnalysisResponse)
 async def get_lead_analysis(
     contact_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Retorna análise de lead (apenas admin ou dono do contato)"""
@@ -387,11 +417,15 @@ async def get_lead_analysis(
         analyzed_at=analysis.analyzed_at
     )
 
-@router.get("/", response_model=list[LeadAnalysisResponse])
+LEAD_ANALYSIS_SORT = SortKey((LeadAnalysis.created_at, LeadAnalysis.id), descending=True)
+
+@router.get("/", response_model=Union[CursorPage[LeadAnalysisResponse], List[LeadAnalysisResponse]])
 async def list_lead_analyses(
     skip: int = 0,
     limit: int = 50,
-    db: AsyncSession = Depends(get_db),
+    pagination: str = "offset",
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Lista análises de leads (admin vê todas, vendedor vê apenas suas)"""
@@ -403,7 +437,12 @@ async def list_lead_analyses(
         # Vendedor vê apenas análises de seus contatos
         query = query.join(Contact).where(Contact.owner_id == current_user.id)
     
-    query = query.offset(skip).limit(limit).order_by(LeadAnalysis.created_at.desc())
+    if use_cursor(pagination, cursor):
+        page = await paginate(db, query, LEAD_ANALYSIS_SORT, cursor, limit)
+        page.items = [LeadAnalysisResponse.model_validate(a) for a in page.items]
+        return page
+    
+    query = apply_offset(query, LEAD_ANALYSIS_SORT, skip, limit)
     
     result = await db.execute(query)
     analyses = result.scalars().all()
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, desc
+from sqlalchemy import select, and_
 from app.core.database import get_db
+from app.core.read_replica import get_read_db
 from app.models.user import User
 from app.models.notification import Notification
 from app.api.dependencies import get_current_user, get_user_role_str
+from app.core.pagination import CursorPage, SortKey, apply_offset, paginate, use_cursor
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional, Union
 from datetime import datetime
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
@@ -33,12 +35,16 @@ class NotificationResponse(BaseModel):
     class Config:
         from_attributes = True
 
-@router.get("/", response_model=List[NotificationResponse])
+NOTIFICATION_SORT = SortKey((Notification.created_at, Notification.id), descending=True)
+
+@router.get("/", response_model=Union[CursorPage[NotificationResponse], List[NotificationResponse]])
 async def get_notifications(
     skip: int = 0,
     limit: int = 50,
     unread_only: bool = False,
-    db: AsyncSession = Depends(get_db),
+    pagination: str = "offset",
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Busca notificações do usuário atual"""
@@ -47,7 +53,12 @@ async def get_notifications(
     if unread_only:
         query = query.where(Notification.is_read == False)
 
-    query = query.order_by(desc(Notification.created_at)).offset(skip).limit(limit)
+    if use_cursor(pagination, cursor):
+        page = await paginate(db, query, NOTIFICATION_SORT, cursor, limit)
+        page.items = [NotificationResponse.model_validate(n) for n in page.items]
+        return page
+
+    query = apply_offset(query, NOTIFICATION_SORT, skip, limit)
 
     result = await db.execute(query)
     notifications = result.scalars().all()
@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List, Optional
+from typing import List, Optional, Union
 from app.core.database import get_db
+from app.core.read_replica import get_read_db
 from app.models.opportunity import Opportunity
 from app.models.user import User
 from app.api.dependencies import get_current_user, get_user_role_str
+from app.services.export import export_response, model_columns
+from app.core.pagination import CursorPage, SortKey, apply_offset, paginate, use_cursor
+from app.services.rollup import opportunity_state, track_opportunity
 from pydantic import BaseModel
 from datetime import datetime, date
 from decimal import Decimal
@@ -40,22 +44,48 @@ class OpportunityResponse(OpportunityBase):
     class Config:
         from_attributes = True
 
-@router.get("/", response_model=List[OpportunityResponse])
+OPPORTUNITY_SORT = SortKey((Opportunity.created_at, Opportunity.id))
+
+@router.get("/", response_model=Union[CursorPage[OpportunityResponse], List[OpportunityResponse]])
 async def list_opportunities(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    pagination: str = "offset",
+    cursor: Optional[str] = None
 ):
+    """Lista oportunidades (pagination=cursor retorna items + next_cursor/prev_cursor)"""
     query = select(Opportunity)
     if get_user_role_str(current_user) == "vendedor":
         query = query.where(Opportunity.owner_id == current_user.id)
     
-    query = query.offset(skip).limit(limit)
+    if use_cursor(pagination, cursor):
+        page = await paginate(db, query, OPPORTUNITY_SORT, cursor, limit)
+        page.items = [OpportunityResponse.model_validate(opp) for opp in page.items]
+        return page
+    
+    query = apply_offset(query, OPPORTUNITY_SORT, skip, limit)
     result = await db.execute(query)
     opportunities = result.scalars().all()
     return [OpportunityResponse.model_validate(opp) for opp in opportunities]
 
+@router.get("/export")
+async def export_opportunities(
+    format: str = "csv",
+    gzip: bool = False,
+    updated_since: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Exporta oportunidades em CSV/NDJSON via streaming (vendedor exporta apenas os seus)"""
+    columns = model_columns(Opportunity)
+    query = select(*columns).order_by(Opportunity.id)
+    if get_user_role_str(current_user) == "vendedor":
+        query = query.where(Opportunity.owner_id == current_user.id)
+    if updated_since:
+        query = query.where(Opportunity.updated_at >= updated_since)
+    return export_response(query, [column.key for column in columns], format, gzip, "opportunities")
+
 @router.post("/", response_model=OpportunityResponse)
 async def create_opportunity(
     opportunity_data: OpportunityCreate,
@@ -67,6 +97,7 @@ async def create_opportunity(
         owner_id=current_user.id
     )
     db.add(opportunity)
+    await track_opportunity(db, None, opportunity_state(opportunity))
     await db.commit()
     await db.refresh(opportunity)
     return OpportunityResponse.model_validate(opportunity)
@@ -106,9 +137,11 @@ async def update_opportunity(
     if not opportunity:
         raise HTTPException(status_code=404, detail="Oportunidade não encontrada")
     
+    before = opportunity_state(opportunity)
     for key, value in opportunity_data.model_dump(exclude_unset=True).items():
         setattr(opportunity, key, value)
     
+    await track_opportunity(db, before, opportunity_state(opportunity))
     await db.commit()
     await db.refresh(opportunity)
     return OpportunityResponse.model_validate(opportunity)
@@ -129,6 +162,7 @@ async def delete_opportunity(
     if not opportunity:
         raise HTTPException(status_code=404, detail="Oportunidade não encontrada")
     
+    await track_opportunity(db, opportunity_state(opportunity), None)
     await db.delete(opportunity)
     await db.commit()
     return {"message": "Oportunidade deletada"}
@@ -4,15 +4,16 @@ from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from datetime import datetime
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.core.database import get_db
 from app.models.user import User, UserRole
 from app.models.commission import QuoteRequest
 from app.models.project import Project
 from app.api.dependencies import get_current_user, get_user_role_str, is_user_role
-from app.api.ai import call_ai_api
-import json
+from app.api.ai import call_ai_api, call_ai_structured
+from app.core.config import settings
+from app.services.structured_output import StructuredOutputError, parse_structured_output
 import os
 import httpx
 
@@ -30,6 +31,33 @@ class StageInfo(BaseModel):
     start_date: Optional[str] = None
     description: Optional[str] = None
 
+# Saída estruturada da IA: docstring e descrições dos campos vão no JSON Schema
+class QuoteEstimate(BaseModel):
+    """Orçamento técnico do projeto"""
+    technical_specs: str = Field(description="Arquitetura, infraestrutura, segurança e performance")
+    technologies: List[str] = Field(default_factory=list, description="Tecnologias sugeridas")
+    stages: List[StageInfo] = Field(default_factory=list, description="Etapas do projeto com duração em dias")
+    estimated_hours: Optional[int] = Field(None, ge=0, description="Total de horas de desenvolvimento")
+    estimated_value: Optional[str] = Field(None, description="Valor ou faixa de valor, ex.: R$ 45.000,00 - R$ 55.000,00")
+
+# Exemplo de resposta para o prompt em texto (sem saída estruturada)
+QUOTE_JSON_EXAMPLE = """
+    FORMATO DA RESPOSTA (JSON):
+    {
+        "technical_specs": "Especificações técnicas detalhadas...",
+        "technologies": ["React", "Node.js", "PostgreSQL", "Docker"],
+        "stages": [
+            {"name": "Planejamento e Arquitetura", "duration_days": 5},
+            {"name": "Desenvolvimento Frontend", "duration_days": 15},
+            {"name": "Desenvolvimento Backend", "duration_days": 20},
+            {"name": "Testes e Ajustes", "duration_days": 5},
+            {"name": "Deploy e Documentação", "duration_days": 3}
+        ],
+        "estimated_hours": 320,
+        "estimated_value": "R$ 45.000,00 - R$ 55.000,00"
+    }
+    """
+
 class QuoteRequestUpdate(BaseModel):
     technical_details: Optional[str] = None
     technologies: Optional[str] = None
@@ -326,21 +354,15 @@ async def generate_quote_with_ai(
 
     1. ESPECIFICAÇÕES TÉCNICAS DETALHADAS:
        - Arquitetura recomendada
-       - Tecnologias sugeridas (lista separada por vírgulas)
+       - Tecnologias sugeridas
        - Requisitos de infraestrutura
        - Considerações de segurança e performance
 
     2. ETAPAS DO PROJETO:
        - Lista de etapas com duração estimada em dias
-       - Formato: "Etapa 1: Nome da Etapa - X dias, Etapa 2: ..."
        - Inclua: Planejamento, Desenvolvimento, Testes, Deploy
 
-    3. PRAZOS:
-       - Prazo total estimado
-       - Marcos importantes (milestones)
-       - Formato: "Etapa 1: 2 semanas, Etapa 2: 3 semanas, ..."
-
-    4. HORAS ESTIMADAS:
+    3. HORAS ESTIMADAS:
        - Total de horas de desenvolvimento
        - Breakdown por etapa (opcional)
 
@@ -350,49 +372,31 @@ async def generate_quote_with_ai(
     - Sugira tecnologias modernas e adequadas
     - Forneça estimativas conservadoras mas realistas
     - Responda em formato estruturado e claro
-
-    FORMATO DA RESPOSTA (JSON):
-    {{
-        "technical_specs": "Especificações técnicas detalhadas...",
-        "technologies": "React, Node.js, PostgreSQL, Docker",
-        "stages": "Etapa 1: Planejamento e Arquitetura - 5 dias, Etapa 2: Desenvolvimento Frontend - 15 dias, Etapa 3: Desenvolvimento Backend - 20 dias, Etapa 4: Testes e Ajustes - 5 dias, Etapa 5: Deploy e Documentação - 3 dias",
-        "deadlines": "Etapa 1: 1 semana, Etapa 2: 2 semanas, Etapa 3: 3 semanas, Etapa 4: 1 semana, Etapa 5: 3 dias",
-        "estimated_hours": 320,
-        "estimated_value": "R$ 45.000,00 - R$ 55.000,00"
-    }}
     """
     
     try:
-        # Chamar IA
-        ai_response = await call_ai_api(prompt, 2500, db)
+        # Chamar IA (JSON validado em QuoteEstimate; texto só se a saída estruturada falhar)
+        estimate = None
+        if settings.AI_STRUCTURED_OUTPUT:
+            try:
+                estimate = await call_ai_structured(prompt, QuoteEstimate, 2500, db)
+            except StructuredOutputError as e:
+                print(f"⚠️ Orçamento estruturado da solicitação {request_id} falhou, usando texto: {e}")
         
-        # Tentar parsear JSON da resposta
-        try:
-            # Limpar resposta da IA (pode ter markdown ou texto extra)
-            cleaned_response = ai_response.strip()
-            if cleaned_response.startswith("```json"):
-                cleaned_response = cleaned_response.replace("```json", "").replace("```", "").strip()
-            elif cleaned_response.startswith("```"):
-                cleaned_response = cleaned_response.replace("```", "").strip()
-            
-            quote_data = json.loads(cleaned_response)
-        except json.JSONDecodeError:
-            # Se não conseguir parsear JSON, extrair informações do texto
-            quote_data = {
-                "technical_specs": ai_response,
-                "technologies": "",
-                "stages": "",
-                "deadlines": "",
-                "estimated_hours": None,
-                "estimated_value": project.estimated_value or ""
-            }
+        if estimate is None:
+            ai_response = await call_ai_api(prompt + QUOTE_JSON_EXAMPLE, 2500, db)
+            try:
+                estimate = parse_structured_output(ai_response, QuoteEstimate)
+            except StructuredOutputError:
+                # Se não conseguir parsear JSON, usar o texto como especificação
+                estimate = QuoteEstimate(technical_specs=ai_response)
         
         # Atualizar quote request
-        quote_request.technical_specs = quote_data.get("technical_specs", "")
-        quote_request.technologies = quote_data.get("technologies", "").split(", ") if quote_data.get("technologies") else []
-        quote_request.stages = quote_data.get("stages", "")
-        quote_request.estimated_hours = quote_data.get("estimated_hours")
-        quote_request.estimated_value = quote_data.get("estimated_value", project.estimated_value or "")
+        quote_request.technical_specs = estimate.technical_specs
+        quote_request.technologies = estimate.technologies
+        quote_request.stages = [stage.model_dump(exclude_none=True) for stage in estimate.stages]
+        quote_request.estimated_hours = estimate.estimated_hours
+        quote_request.estimated_value = estimate.estimated_value or project.estimated_value or ""
         quote_request.ai_generated = True
         quote_request.status = "in_progress"
         quote_request.planning_owner_id = current_user.id
@@ -0,0 +1,68 @@
+"""
+Busca global de contatos e oportunidades (também usada pelas ações da IA)
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db
+from app.models.user import User
+from app.api.dependencies import get_current_user, get_user_role_str
+from app.services.search import search_contacts, search_opportunities
+from typing import Dict, Any
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+SEARCH_TYPES = ("contacts", "opportunities")
+MAX_SEARCH_LIMIT = 50
+
+@router.get("")
+async def search(
+    q: str,
+    types: str = "contacts,opportunities",
+    limit: int = 10,
+    fuzzy: bool = True,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Busca por relevância, sem diferenciar acentos (vendedor vê apenas seus registros)"""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Informe o termo de busca")
+    requested = [t.strip() for t in types.split(",") if t.strip()]
+    invalid = [t for t in requested if t not in SEARCH_TYPES]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Tipos inválidos: {', '.join(invalid)}")
+    
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    owner_id = current_user.id if get_user_role_str(current_user) == "vendedor" else None
+    response: Dict[str, Any] = {"query": q}
+    
+    if "contacts" in requested:
+        contacts = await search_contacts(db, q, owner_id=owner_id, limit=limit, fuzzy=fuzzy)
+        response["contacts"] = [
+            {
+                "id": c.id,
+                "name": c.name,
+                "email": c.email,
+                "phone": c.phone,
+                "company": c.company,
+                "status": c.status,
+                "score": round(score, 4)
+            }
+            for c, score in contacts
+        ]
+    
+    if "opportunities" in requested:
+        opportunities = await search_opportunities(db, q, owner_id=owner_id, limit=limit, fuzzy=fuzzy)
+        response["opportunities"] = [
+            {
+                "id": o.id,
+                "name": o.name,
+                "value": float(o.value) if o.value else None,
+                "stage": o.stage,
+                "probability": o.probability,
+                "contact_id": o.contact_id,
+                "score": round(score, 4)
+            }
+            for o, score in opportunities
+        ]
+    
+    return response
@@ -3,9 +3,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.models.user import User
 from app.api.dependencies import get_current_user
+from app.core.cache import cached_response
+from app.core.config import settings
+from app.services.template_engine import TemplateEngine
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
-import json
+from typing import Dict, Any, List
 from datetime import datetime
 
 router = APIRouter(prefix="/templates", tags=["templates"])
@@ -48,8 +50,19 @@ class TemplateResponse(BaseModel):
     generated_at: datetime
     variables_used: Dict[str, Any]
 
+class TemplateBatchRequest(BaseModel):
+    template_type: str
+    language: str = "pt"
+    items: List[Dict[str, Any]]  # variáveis de cada documento
+
+class TemplateBatchResponse(BaseModel):
+    template_type: str
+    language: str
+    generated_at: datetime
+    documents: List[TemplateResponse]
+
 # Templates base em português
-TEMPLATES = {
+TEMPLATES_PT = {
     "proposal": """
 # Proposta Comercial - {company_name}
 
@@ -185,6 +198,297 @@ Innexar Tecnologia Ltda                        {client_name}
 """
 }
 
+
+TEMPLATES_EN = {
+    "proposal": """
+# Business Proposal - {company_name}
+
+## Introduction
+
+Dear {contact_name},
+
+We are Innexar, specialized in custom software development. We are pleased to present this proposal for {project_description}.
+
+## Project Scope
+
+### Objectives
+{project_objectives}
+
+### Main Features
+{project_features}
+
+### Technologies
+{project_technologies}
+
+## Benefits
+
+### For your business
+{business_benefits}
+
+### Expected ROI
+{expected_roi}
+
+## Timeline
+
+### Phase 1: {phase1_name}
+- Duration: {phase1_duration}
+- Deliverables: {phase1_deliverables}
+
+### Phase 2: {phase2_name}
+- Duration: {phase2_duration}
+- Deliverables: {phase2_deliverables}
+
+### Phase 3: {phase3_name}
+- Duration: {phase3_duration}
+- Deliverables: {phase3_deliverables}
+
+## Investment
+
+### Total Value: R$ {total_value}
+### Payment Terms: {payment_terms}
+### Delivery Time: {delivery_time}
+
+## Next Steps
+
+1. Approval of this proposal
+2. Contract signature
+3. Project kickoff
+4. Development and deliveries
+
+Best regards,
+{seller_name}
+Innexar - Software Development
+""",
+    "email_followup": """
+Subject: Follow-up - Proposal {project_name}
+
+Hello {contact_name},
+
+I hope this message finds you well.
+
+I would like to know whether you have had the chance to review the proposal we sent for the {project_name} project.
+
+A few questions that may help with your decision:
+
+{decision_questions}
+
+We are available to answer any questions and discuss the next steps.
+
+Best regards,
+{seller_name}
+Innexar
+{contact_info}
+""",
+    "contract_summary": """
+# Service Agreement
+
+## Parties
+
+**Client:** {client_name}
+**Contractor:** Innexar Tecnologia Ltda
+
+## Purpose
+
+This agreement covers the provision of software development services as specified in the attached business proposal.
+
+## Value and Payment
+
+- Total Value: R$ {contract_value}
+- Payment Method: {payment_method}
+- Schedule: {payment_schedule}
+
+## Term
+
+- Start: {start_date}
+- End: {end_date}
+- Total Duration: {total_duration}
+
+## Responsibilities
+
+### Innexar
+{innexar_responsibilities}
+
+### Client
+{client_responsibilities}
+
+## Intellectual Property
+
+{intellectual_property_terms}
+
+## Confidentiality
+
+{confidentiality_terms}
+
+## Termination
+
+{termination_terms}
+
+## Jurisdiction
+
+{legal_jurisdiction}
+
+São Paulo, {contract_date}
+
+___________________________                ___________________________
+{seller_name}                                    {client_representative}
+Innexar Tecnologia Ltda                        {client_name}
+"""
+}
+
+TEMPLATES_ES = {
+    "proposal": """
+# Propuesta Comercial - {company_name}
+
+## Introducción
+
+Estimado(a) {contact_name},
+
+Somos Innexar, especializada en desarrollo de software a medida. Nos complace presentar esta propuesta para {project_description}.
+
+## Alcance del Proyecto
+
+### Objetivos
+{project_objectives}
+
+### Funcionalidades Principales
+{project_features}
+
+### Tecnologías
+{project_technologies}
+
+## Beneficios
+
+### Para su negocio
+{business_benefits}
+
+### ROI Esperado
+{expected_roi}
+
+## Cronograma
+
+### Fase 1: {phase1_name}
+- Duración: {phase1_duration}
+- Entregables: {phase1_deliverables}
+
+### Fase 2: {phase2_name}
+- Duración: {phase2_duration}
+- Entregables: {phase2_deliverables}
+
+### Fase 3: {phase3_name}
+- Duración: {phase3_duration}
+- Entregables: {phase3_deliverables}
+
+## Inversión
+
+### Valor Total: R$ {total_value}
+### Forma de Pago: {payment_terms}
+### Plazo de Entrega: {delivery_time}
+
+## Próximos Pasos
+
+1. Aprobación de esta propuesta
+2. Firma del contrato
+3. Kickoff del proyecto
+4. Desarrollo y entregas
+
+Atentamente,
+{seller_name}
+Innexar - Desarrollo de Software
+""",
+    "email_followup": """
+Asunto: Seguimiento - Propuesta {project_name}
+
+Hola {contact_name},
+
+Espero que se encuentre bien.
+
+Me gustaría saber si tuvo la oportunidad de analizar la propuesta que enviamos para el proyecto {project_name}.
+
+Algunas preguntas que pueden ayudar en su decisión:
+
+{decision_questions}
+
+Quedamos a disposición para aclarar cualquier duda y conversar sobre los próximos pasos.
+
+Atentamente,
+{seller_name}
+Innexar
+{contact_info}
+""",
+    "contract_summary": """
+# Contrato de Prestación de Servicios
+
+## Partes
+
+**Contratante:** {client_name}
+**Contratado:** Innexar Tecnologia Ltda
+
+## Objeto del Contrato
+
+El presente contrato tiene por objeto la prestación de servicios de desarrollo de software según lo especificado en la propuesta comercial adjunta.
+
+## Valor y Forma de Pago
+
+- Valor Total: R$ {contract_value}
+- Forma de Pago: {payment_method}
+- Cronograma: {payment_schedule}
+
+## Plazo de Ejecución
+
+- Inicio: {start_date}
+- Término: {end_date}
+- Plazo Total: {total_duration}
+
+## Responsabilidades
+
+### Innexar
+{innexar_responsibilities}
+
+### Cliente
+{client_responsibilities}
+
+## Propiedad Intelectual
+
+{intellectual_property_terms}
+
+## Confidencialidad
+
+{confidentiality_terms}
+
+## Rescisión
+
+{termination_terms}
+
+## Jurisdicción
+
+{legal_jurisdiction}
+
+São Paulo, {contract_date}
+
+___________________________                ___________________________
+{seller_name}                                    {client_representative}
+Innexar Tecnologia Ltda                        {client_name}
+"""
+}
+
+# Compilados uma vez na importação; idioma sem variante usa o português
+template_engine = TemplateEngine({
+    template_type: {"pt": source, "en": TEMPLATES_EN[template_type], "es": TEMPLATES_ES[template_type]}
+    for template_type, source in TEMPLATES_PT.items()
+})
+
+
+def _render(template_type: str, language: str, data: Dict[str, Any], generated_at: datetime) -> TemplateResponse:
+    rendered = template_engine.render(template_type, language, data)
+    return TemplateResponse(
+        template_type=template_type,
+        content=rendered.content,
+        language=rendered.language,
+        generated_at=generated_at,
+        variables_used=rendered.variables_used
+    )
+
+
 @router.post("/generate", response_model=TemplateResponse)
 async def generate_template(
     request: TemplateRequest,
@@ -192,36 +496,45 @@ async def generate_template(
     current_user: User = Depends(get_current_user)
 ):
     """Gera documento baseado em template"""
-    try:
-        if request.template_type not in TEMPLATES:
-            raise HTTPException(status_code=400, detail=f"Template {request.template_type} não encontrado")
-
-        template = TEMPLATES[request.template_type]
+    if request.template_type not in template_engine.types:
+        raise HTTPException(status_code=400, detail=f"Template {request.template_type} não encontrado")
 
-        # Substitui variáveis no template
-        content = template
-        variables_used = {}
+    try:
+        return _render(request.template_type, request.language, request.data, datetime.utcnow())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao gerar template: {str(e)}")
 
-        for key, value in request.data.items():
-            placeholder = f"{{{key}}}"
-            if placeholder in content:
-                content = content.replace(placeholder, str(value))
-                variables_used[key] = value
 
-        # Remove placeholders não preenchidos
-        import re
-        content = re.sub(r'\{[^}]+\}', '[PENDENTE]', content)
+@router.post("/generate/batch", response_model=TemplateBatchResponse)
+async def generate_templates_batch(
+    request: TemplateBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Gera vários documentos do mesmo template (ex.: propostas de uma campanha)"""
+    if request.template_type not in template_engine.types:
+        raise HTTPException(status_code=400, detail=f"Template {request.template_type} não encontrado")
+    if len(request.items) > settings.TEMPLATE_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo de {settings.TEMPLATE_BATCH_MAX_ITEMS} documentos por lote"
+        )
 
-        return TemplateResponse(
+    try:
+        generated_at = datetime.utcnow()
+        documents = [
+            _render(request.template_type, request.language, data, generated_at)
+            for data in request.items
+        ]
+        _, language = template_engine.resolve(request.template_type, request.language)
+        return TemplateBatchResponse(
             template_type=request.template_type,
-            content=content,
-            language=request.language,
-            generated_at=datetime.utcnow(),
-            variables_used=variables_used
+            language=language,
+            generated_at=generated_at,
+            documents=documents
         )
-
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao gerar template: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao gerar templates: {str(e)}")
 
 @router.get("/")
 async def list_templates(
@@ -232,6 +545,7 @@ async def list_templates(
     return get_template_types_data()
 
 @router.get("/types")
+@cached_response("template_types", ttl=3600, per_user=False)
 async def get_template_types(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
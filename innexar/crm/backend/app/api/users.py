@@ -6,12 +6,20 @@ from app.core.database import get_db
 from app.models.user import User, UserRole
 from app.schemas.user import UserResponse, UserCreate, UserUpdate
 from app.api.dependencies import get_current_user, get_user_role_str
+from app.core.user_cache import invalidate_user
 
 router = APIRouter()
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(current_user: User = Depends(get_current_user)):
-    return UserResponse.model_validate(current_user)
+async def get_me(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # current_user é o registro enxuto do cache; o perfil completo vem do banco
+    user = await db.get(User, current_user.id)
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    return UserResponse.model_validate(user)
 
 @router.get("/", response_model=List[UserResponse])
 async def list_users(
@@ -73,3 +81,65 @@ async def create_user(
     
     return UserResponse.model_validate(user)
 
+
+@router.put("/{user_id}", response_model=UserResponse)
+async def update_user(
+    user_id: int,
+    user_data: UserUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Apenas admin pode alterar usuários
+    role_str = get_user_role_str(current_user)
+    if role_str.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    
+    update_data = user_data.model_dump(exclude_unset=True)
+    
+    if "email" in update_data and update_data["email"] != user.email:
+        result = await db.execute(select(User).where(User.email == update_data["email"]))
+        if result.scalar_one_or_none():
+            raise HTTPException(status_code=400, detail="Email já cadastrado")
+    
+    if update_data.get("role") is not None:
+        role_value = update_data["role"]
+        update_data["role"] = role_value.value if isinstance(role_value, UserRole) else str(role_value).lower()
+    
+    for field, value in update_data.items():
+        if value is not None:
+            setattr(user, field, value)
+    
+    await db.commit()
+    await db.refresh(user)
+    await invalidate_user(user.id)
+    
+    return UserResponse.model_validate(user)
+
+@router.delete("/{user_id}", response_model=UserResponse)
+async def deactivate_user(
+    user_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Apenas admin pode desativar usuários
+    role_str = get_user_role_str(current_user)
+    if role_str.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    
+    if user_id == current_user.id:
+        raise HTTPException(status_code=400, detail="Não é possível desativar o próprio usuário")
+    
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    
+    user.is_active = False
+    await db.commit()
+    await db.refresh(user)
+    await invalidate_user(user.id)
+    
+    return UserResponse.model_validate(user)
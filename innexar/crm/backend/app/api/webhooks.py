@@ -1,20 +1,17 @@
 """
 API pública para receber formulários do site
 """
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Header, Depends
+from fastapi import APIRouter, HTTPException, Header, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.core.database import get_db, AsyncSessionLocal
+from app.core.database import get_db
 from app.models.contact import Contact
 from app.models.user import User
-from app.models.opportunity import Opportunity
-from app.models.lead_analysis import LeadAnalysis
-from app.api.lead_analysis import analyze_lead_background
+from app.services.jobs import enqueue_lead_analysis
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 from datetime import datetime
 import os
-import asyncio
 
 router = APIRouter(prefix="/webhooks", tags=["webhooks"])
 
@@ -76,7 +73,6 @@ def verify_webhook_token(authorization: Optional[str] = Header(None)):
 @router.post("/contact", response_model=WebhookResponse)
 async def webhook_create_contact(
     request: WebhookContactRequest,
-    background_tasks: BackgroundTasks,
     authorization: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db)
 ):
@@ -162,70 +158,14 @@ async def webhook_create_contact(
         )
         
         db.add(contact)
+        await db.flush()
+        
+        # Agendar análise automática na fila de jobs (mesma transação do contato);
+        # a oportunidade é criada pelo próprio job assim que a análise for concluída
+        await enqueue_lead_analysis(db, contact.id, create_opportunity=True)
         await db.commit()
         await db.refresh(contact)
         
-        # Iniciar análise automática em background
-        background_tasks.add_task(analyze_lead_background, contact.id)
-        
-        # Aguardar análise ser concluída (em background) e criar oportunidade automaticamente
-        # Isso será feito em uma tarefa separada após a análise
-        async def create_opportunity_after_analysis(contact_id: int):
-            """Cria oportunidade após análise ser concluída"""
-            import asyncio
-            from app.models.opportunity import Opportunity
-            
-            # Aguardar até 60 segundos pela análise
-            for attempt in range(12):  # 12 tentativas de 5 segundos = 60 segundos
-                await asyncio.sleep(5)
-                async with AsyncSessionLocal() as session:
-                    try:
-                        result = await session.execute(
-                            select(LeadAnalysis).where(LeadAnalysis.contact_id == contact_id)
-                        )
-                        analysis = result.scalar_one_or_none()
-                        
-                        if analysis and analysis.analysis_status == "completed":
-                            # Buscar contato
-                            result = await session.execute(select(Contact).where(Contact.id == contact_id))
-                            contact_obj = result.scalar_one_or_none()
-                            
-                            if contact_obj:
-                                # Verificar se oportunidade já existe
-                                result = await session.execute(
-                                    select(Opportunity).where(Opportunity.contact_id == contact_id)
-                                )
-                                existing_opp = result.scalar_one_or_none()
-                                
-                                if not existing_opp:
-                                    # Criar oportunidade com dados da análise
-                                    opportunity_value = None
-                                    if analysis.analysis_metadata and "potential_value" in analysis.analysis_metadata:
-                                        try:
-                                            opportunity_value = float(analysis.analysis_metadata["potential_value"])
-                                        except:
-                                            pass
-                                    
-                                    opportunity = Opportunity(
-                                        name=f"{contact_obj.company or contact_obj.name} - Oportunidade",
-                                        contact_id=contact_id,
-                                        owner_id=contact_obj.owner_id,
-                                        value=opportunity_value,
-                                        stage="qualificacao",
-                                        probability=analysis.opportunity_score or 50
-                                    )
-                                    
-                                    session.add(opportunity)
-                                    await session.commit()
-                            break
-                    except Exception as e:
-                        print(f"Erro ao criar oportunidade após análise (tentativa {attempt + 1}): {str(e)}")
-                        if attempt == 11:  # Última tentativa
-                            break
-        
-        # Iniciar tarefa para criar oportunidade após análise
-        background_tasks.add_task(create_opportunity_after_analysis, contact.id)
-        
         return WebhookResponse(
             success=True,
             message="Contato criado com sucesso. Análise iniciada e oportunidade será criada automaticamente após análise.",
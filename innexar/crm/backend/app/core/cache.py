@@ -0,0 +1,275 @@
+"""
+Cache de respostas em Redis para endpoints de leitura
+
+Uso:
+    @router.get("/")
+    @cached_response("goals", ttl=60, invalidated_by=(Goal, User))
+    async def list_goals(..., current_user: User = Depends(get_current_user)): ...
+
+A chave combina namespace, versão do namespace, role e id do usuário e os
+parâmetros da requisição. Escritas nos modelos listados em invalidated_by
+(detectadas no flush da sessão) incrementam a versão do namespace após o
+commit, o que invalida todas as chaves antigas de uma vez. Um lock curto
+(SET NX) evita que várias requisições recalculem a mesma chave ao mesmo
+tempo. Se o Redis estiver indisponível o endpoint é executado normalmente.
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Set
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.config import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover
+    aioredis = None
+
+KEY_PREFIX = "cache"
+LOCK_POLL_INTERVAL = 0.05
+
+_redis = None
+_invalidation_map: Dict[type, Set[str]] = {}
+_pending_tasks: Set[asyncio.Task] = set()
+
+
+class TTLCache:
+    """LRU em memória com expiração por entrada e limite de itens (e de tamanho, se max_bytes)"""
+
+    def __init__(self, maxsize: int, ttl: float, max_bytes: Optional[int] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value, size = entry
+        if expires_at < time.monotonic():
+            self.pop(key)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, size: int = 0):
+        self.pop(key)
+        self._data[key] = (time.monotonic() + (ttl or self.ttl), value, size)
+        self.total_bytes += size
+        while self._data and (
+            len(self._data) > self.maxsize
+            or (self.max_bytes is not None and self.total_bytes > self.max_bytes)
+        ):
+            _, (_, _, evicted_size) = self._data.popitem(last=False)
+            self.total_bytes -= evicted_size
+            self.evictions += 1
+
+    def pop(self, key: Hashable):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
+
+    def clear(self):
+        self._data.clear()
+        self.total_bytes = 0
+
+
+def get_redis():
+    """Cliente Redis compartilhado (None se cache desabilitado)"""
+    global _redis
+    if not settings.CACHE_ENABLED or aioredis is None:
+        return None
+    if _redis is None:
+        _redis = aioredis.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_timeout=settings.CACHE_REDIS_TIMEOUT,
+            socket_connect_timeout=settings.CACHE_REDIS_TIMEOUT
+        )
+    return _redis
+
+
+async def close_redis():
+    """Fecha o cliente Redis (shutdown da aplicação)"""
+    global _redis
+    if _redis is not None:
+        await _redis.close()
+        _redis = None
+
+
+def _version_key(namespace: str) -> str:
+    return f"{KEY_PREFIX}:version:{namespace}"
+
+
+def _user_scope(user: Any, per_user: bool) -> str:
+    if user is None:
+        return "anon"
+    role = getattr(user.role, "value", user.role) or "vendedor"
+    role = str(role).lower()
+    return f"{role}:{user.id}" if per_user else role
+
+
+def _params_hash(params: Dict[str, Any]) -> str:
+    encoded = json.dumps(jsonable_encoder(params), sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode()).hexdigest()[:16]
+
+
+async def get_or_set(
+    key: str,
+    loader: Callable[[], Awaitable[Any]],
+    ttl: Optional[int] = None
+) -> Any:
+    """Retorna o valor em cache ou executa loader e grava o resultado (JSON)"""
+    redis = get_redis()
+    if redis is None:
+        return await loader()
+
+    try:
+        cached = await redis.get(key)
+        if cached is not None:
+            return json.loads(cached)
+
+        lock_key = f"{key}:lock"
+        lock_ttl = settings.CACHE_LOCK_TIMEOUT
+        if not await redis.set(lock_key, "1", nx=True, ex=lock_ttl):
+            # Outra requisição já está calculando: aguarda o resultado dela
+            waited = 0.0
+            while waited < lock_ttl:
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+                waited += LOCK_POLL_INTERVAL
+                cached = await redis.get(key)
+                if cached is not None:
+                    return json.loads(cached)
+            return await loader()
+    except Exception as e:
+        print(f"⚠️ Cache indisponível ({key}): {e}")
+        return await loader()
+
+    try:
+        value = await loader()
+        await redis.set(
+            key,
+            json.dumps(jsonable_encoder(value)),
+            ex=ttl or settings.CACHE_DEFAULT_TTL
+        )
+        return value
+    finally:
+        try:
+            await redis.delete(lock_key)
+        except Exception:
+            pass
+
+
+async def get_cache_version(namespace: str) -> Optional[str]:
+    """Versão atual do namespace (None se o Redis estiver indisponível)"""
+    redis = get_redis()
+    if redis is None:
+        return None
+    try:
+        return await redis.get(_version_key(namespace)) or "0"
+    except Exception:
+        return None
+
+
+async def invalidate_cache(*namespaces: str):
+    """Invalida todas as chaves dos namespaces (incrementa a versão)"""
+    redis = get_redis()
+    if redis is None or not namespaces:
+        return
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            for namespace in namespaces:
+                pipe.incr(_version_key(namespace))
+            await pipe.execute()
+    except Exception as e:
+        print(f"⚠️ Erro ao invalidar cache {namespaces}: {e}")
+
+
+def register_invalidation(namespace: str, *models: type):
+    """Escritas em qualquer um dos modelos invalidam o namespace"""
+    for model in models:
+        _invalidation_map.setdefault(model, set()).add(namespace)
+
+
+def cached_response(
+    namespace: str,
+    ttl: Optional[int] = None,
+    per_user: bool = True,
+    invalidated_by: Iterable[type] = ()
+):
+    """
+    Decorator de cache para endpoints GET.
+
+    per_user=False compartilha a entrada entre usuários do mesmo role
+    (endpoints administrativos ou dados estáticos).
+    """
+    register_invalidation(namespace, *invalidated_by)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            redis = get_redis()
+            if redis is None:
+                return await func(*args, **kwargs)
+
+            user = kwargs.get("current_user")
+            params = {
+                name: value for name, value in kwargs.items()
+                if name != "current_user" and not isinstance(value, AsyncSession)
+            }
+            try:
+                version = await redis.get(_version_key(namespace)) or "0"
+            except Exception as e:
+                print(f"⚠️ Cache indisponível ({namespace}): {e}")
+                return await func(*args, **kwargs)
+
+            key = ":".join([
+                KEY_PREFIX, namespace, f"v{version}",
+                _user_scope(user, per_user), _params_hash(params)
+            ])
+            return await get_or_set(key, lambda: func(*args, **kwargs), ttl)
+        return wrapper
+    return decorator
+
+
+def _schedule_invalidation(namespaces: Set[str]):
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(invalidate_cache(*sorted(namespaces)))
+    _pending_tasks.add(task)
+    task.add_done_callback(_pending_tasks.discard)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_invalidations(session, flush_context):
+    if not _invalidation_map:
+        return
+    namespaces = session.info.setdefault("cache_invalidations", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        namespaces.update(_invalidation_map.get(type(obj), ()))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    namespaces = session.info.pop("cache_invalidations", None)
+    if namespaces:
+        _schedule_invalidation(namespaces)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session):
+    session.info.pop("cache_invalidations", None)
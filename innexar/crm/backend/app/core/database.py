@@ -1,18 +1,56 @@
+from typing import Any, Dict
+from uuid import uuid4
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import NullPool
 from app.core.config import settings
 
-# Garantir que a URL usa asyncpg
-database_url = settings.DATABASE_URL
-if not database_url.startswith("postgresql+asyncpg://"):
-    database_url = database_url.replace("postgresql://", "postgresql+asyncpg://")
-    database_url = database_url.replace("postgresql+psycopg2://", "postgresql+asyncpg://")
 
-engine = create_async_engine(
-    database_url,
-    echo=True,
-    future=True
-)
+def asyncpg_url(url: str) -> str:
+    """Garantir que a URL usa asyncpg"""
+    if not url.startswith("postgresql+asyncpg://"):
+        url = url.replace("postgresql://", "postgresql+asyncpg://")
+        url = url.replace("postgresql+psycopg2://", "postgresql+asyncpg://")
+    return url
+
+
+database_url = asyncpg_url(settings.DATABASE_URL)
+
+
+def engine_options() -> Dict[str, Any]:
+    """Parâmetros do create_async_engine a partir das configurações DB_*"""
+    options: Dict[str, Any] = {
+        "echo": settings.DB_ECHO,
+        "future": True,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if settings.DB_POOL_DISABLED:
+        options["poolclass"] = NullPool
+    else:
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+
+    if settings.DB_PGBOUNCER:
+        # Em transaction mode cada transação pode cair em outra conexão do
+        # servidor: prepared statements nomeados/cacheados quebrariam
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    else:
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
+
+engine = create_async_engine(database_url, **engine_options())
 
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -22,10 +60,47 @@ AsyncSessionLocal = async_sessionmaker(
 
 Base = declarative_base()
 
+# Métricas do pool (contadores desde o início do processo)
+_pool_counters = {"connects": 0, "checkouts": 0, "invalidations": 0, "max_checked_out": 0}
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    _pool_counters["connects"] += 1
+
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    _pool_counters["checkouts"] += 1
+    checked_out = engine.pool.checkedout() if hasattr(engine.pool, "checkedout") else 0
+    if checked_out > _pool_counters["max_checked_out"]:
+        _pool_counters["max_checked_out"] = checked_out
+
+
+@event.listens_for(engine.sync_engine, "invalidate")
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    _pool_counters["invalidations"] += 1
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Uso atual do pool de conexões e contadores acumulados"""
+    pool = engine.pool
+    stats: Dict[str, Any] = {"pool": pool.__class__.__name__, "pgbouncer": settings.DB_PGBOUNCER}
+    if hasattr(pool, "checkedout"):
+        stats.update(
+            size=pool.size(),
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+        )
+    stats.update(_pool_counters)
+    return stats
+
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         try:
             yield session
         finally:
             await session.close()
-
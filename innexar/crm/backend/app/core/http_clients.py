@@ -0,0 +1,66 @@
+"""
+Clientes HTTP compartilhados para os providers de IA
+
+Um httpx.AsyncClient por provider, com pool de conexões keep-alive e HTTP/2
+quando o provider suporta (e o pacote h2 está instalado). Os clientes são
+criados no startup e fechados no shutdown da aplicação; fora do app (scripts,
+workers) são criados sob demanda na primeira chamada.
+"""
+from typing import Dict
+import httpx
+from app.core.config import settings
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Providers que aceitam HTTP/2 (Ollama roda local/por túnel em HTTP/1.1)
+PROVIDER_HTTP2 = {
+    "grok": True,
+    "openai": True,
+    "anthropic": True,
+    "google": True,
+    "mistral": True,
+    "cohere": True,
+    "ollama": False,
+}
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _build_client(provider: str) -> httpx.AsyncClient:
+    read_timeout = settings.AI_HTTP_OLLAMA_TIMEOUT if provider == "ollama" else settings.AI_HTTP_TIMEOUT
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE and PROVIDER_HTTP2.get(provider, False),
+        timeout=httpx.Timeout(read_timeout, connect=settings.AI_HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=settings.AI_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.AI_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.AI_HTTP_KEEPALIVE_EXPIRY
+        )
+    )
+
+
+def get_http_client(provider: str) -> httpx.AsyncClient:
+    """Retorna o cliente do provider (não fechar: o ciclo de vida é da aplicação)"""
+    client = _clients.get(provider)
+    if client is None or client.is_closed:
+        client = _build_client(provider)
+        _clients[provider] = client
+    return client
+
+
+async def init_http_clients():
+    """Cria os clientes de todos os providers conhecidos (startup)"""
+    for provider in PROVIDER_HTTP2:
+        get_http_client(provider)
+
+
+async def close_http_clients():
+    """Fecha todos os clientes (shutdown)"""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
@@ -0,0 +1,42 @@
+"""
+Migrações do banco (Alembic) aplicadas no startup
+
+Substitui o Base.metadata.create_all: a API, o worker e os scripts chamam
+upgrade_database(), que aplica as revisões pendentes de alembic/versions.
+Bancos criados antes do Alembic (tabelas existentes, sem alembic_version)
+são marcados na baseline antes do upgrade. Um advisory lock evita que
+várias réplicas migrem ao mesmo tempo.
+"""
+from pathlib import Path
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from app.core.database import engine
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+BASELINE_REVISION = "0001_baseline"
+
+
+def alembic_config(connection: Connection = None) -> Config:
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    config.attributes["connection"] = connection
+    return config
+
+
+def _upgrade(connection: Connection):
+    config = alembic_config(connection)
+    tables = set(inspect(connection).get_table_names())
+    if "alembic_version" not in tables and "users" in tables:
+        print("✅ Banco existente sem histórico de migrações: marcando baseline")
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
+
+
+async def upgrade_database():
+    """Aplica as migrações pendentes (idempotente)"""
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT pg_advisory_xact_lock(hashtext('alembic_upgrade'))"))
+        await connection.run_sync(_upgrade)
+        await connection.commit()
@@ -0,0 +1,135 @@
+"""
+Paginação por cursor (keyset) para endpoints de listagem
+
+Uso:
+    page = await paginate(db, query, SortKey((Contact.created_at, Contact.id)), cursor, limit)
+
+O cursor é opaco (base64 de JSON) e guarda os valores da chave de ordenação
+do primeiro/último item da página. A próxima página é buscada com
+WHERE (chave) > (valores do cursor), sem OFFSET: o custo não cresce com a
+profundidade e inserções concorrentes não duplicam nem pulam itens. O modo
+offset (skip/limit) continua disponível para compatibilidade.
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from typing import Any, Generic, List, Optional, Sequence, Tuple, TypeVar
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+T = TypeVar("T")
+
+MAX_CURSOR_LIMIT = 1000
+
+
+class CursorPage(BaseModel, Generic[T]):
+    """Página no modo cursor"""
+    items: List[T]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+    limit: int
+
+
+@dataclass(frozen=True)
+class SortKey:
+    """Colunas (ou expressões) da ordenação; a última deve ser única (ex.: id)"""
+    columns: Tuple[Any, ...]
+    descending: bool = False
+
+    def order_by(self, descending: Optional[bool] = None) -> List[Any]:
+        descending = self.descending if descending is None else descending
+        return [column.desc() if descending else column.asc() for column in self.columns]
+
+
+def use_cursor(pagination: str, cursor: Optional[str]) -> bool:
+    """Indica se a requisição pediu o modo cursor (pagination=cursor ou cursor informado)"""
+    if pagination not in ("offset", "cursor"):
+        raise HTTPException(status_code=400, detail="pagination deve ser 'offset' ou 'cursor'")
+    return pagination == "cursor" or cursor is not None
+
+
+def encode_cursor(values: Sequence[Any], direction: str) -> str:
+    raw = json.dumps({"k": jsonable_encoder(list(values)), "d": direction}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _parse_value(value: Any, column: Any) -> Any:
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is time:
+        return time.fromisoformat(value)
+    return python_type(value)
+
+
+def decode_cursor(cursor: str, key: SortKey) -> Tuple[List[Any], str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, direction = data["k"], data["d"]
+        if direction not in ("next", "prev") or len(values) != len(key.columns):
+            raise ValueError(direction)
+        return [_parse_value(value, column) for value, column in zip(values, key.columns)], direction
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def apply_offset(query: Select, key: SortKey, skip: int, limit: Optional[int]) -> Select:
+    """Modo offset com ordenação estável (mesma chave do modo cursor)"""
+    query = query.order_by(*key.order_by()).offset(skip)
+    return query.limit(limit) if limit is not None else query
+
+
+async def paginate(
+    db: AsyncSession,
+    query: Select,
+    key: SortKey,
+    cursor: Optional[str],
+    limit: int
+) -> CursorPage:
+    """Executa query no modo cursor; items são os objetos da primeira entidade do SELECT"""
+    limit = max(1, min(limit, MAX_CURSOR_LIMIT))
+    values, direction = decode_cursor(cursor, key) if cursor else (None, "next")
+    backwards = direction == "prev"
+    # Voltando uma página, a ordenação é invertida e o resultado desinvertido
+    descending = key.descending != backwards
+
+    if values is not None:
+        position = tuple_(*key.columns)
+        bound = tuple_(*values)
+        query = query.where(position < bound if descending else position > bound)
+
+    query = query.add_columns(*key.columns).order_by(*key.order_by(descending)).limit(limit + 1)
+    rows = list((await db.execute(query)).all())
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+
+    width = len(key.columns)
+    items = [row[0] for row in rows]
+    keys = [tuple(row[-width:]) for row in rows]
+
+    next_cursor = prev_cursor = None
+    if keys:
+        if has_more or backwards:
+            next_cursor = encode_cursor(keys[-1], "next")
+        if values is not None and (has_more or not backwards):
+            prev_cursor = encode_cursor(keys[0], "prev")
+    elif values is not None and not backwards:
+        # Passou do fim: ainda é possível voltar a partir do cursor recebido
+        prev_cursor = encode_cursor(values, "prev")
+
+    return CursorPage(items=items, next_cursor=next_cursor, prev_cursor=prev_cursor, limit=limit)
@@ -0,0 +1,160 @@
+"""
+Roteamento de leituras para a réplica do Postgres
+
+Endpoints somente leitura (listagens, histórico do chat, análises de
+leads, exportações) usam get_read_db no lugar de get_db. Com
+DATABASE_REPLICA_URL configurada a sessão vem da réplica, exceto quando:
+
+- o atraso de replicação passa de DB_REPLICA_MAX_LAG (ou a réplica não
+  responde): verificado a cada DB_REPLICA_LAG_CHECK_INTERVAL segundos;
+- o mesmo cliente (token) fez uma escrita nos últimos
+  DB_REPLICA_STICKY_SECONDS (leitura após escrita). O registro é local a
+  cada processo; entre workers diferentes vale só o limite de atraso.
+
+Fluxos que escrevem ou leem o que acabaram de gravar continuam em get_db,
+assim como endpoints com @cached_response (os dashboards): o cache é
+preenchido logo após a invalidação, e uma leitura atrasada da réplica
+ficaria guardada sob a versão nova.
+"""
+import asyncio
+import time
+from typing import AsyncIterator, Dict, Optional
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, asyncpg_url, engine_options
+
+LAG_CHECK_TIMEOUT = 2.0  # segundos
+MAX_STICKY_CLIENTS = 10000
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Segundos de atraso da réplica (0 se está em dia ou se não é uma réplica)
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+replica_engine = (
+    create_async_engine(asyncpg_url(settings.DATABASE_REPLICA_URL), **engine_options())
+    if settings.DATABASE_REPLICA_URL else None
+)
+ReplicaSessionLocal = (
+    async_sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False)
+    if replica_engine is not None else None
+)
+
+
+class ReplicaLagMonitor:
+    """Atraso da réplica consultado no máximo uma vez por intervalo"""
+
+    def __init__(self):
+        self.lag: Optional[float] = None
+        self.healthy = False
+        self.checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _stale(self) -> bool:
+        return time.monotonic() - self.checked_at >= settings.DB_REPLICA_LAG_CHECK_INTERVAL
+
+    async def usable(self) -> bool:
+        if self._stale():
+            async with self._lock:
+                if self._stale():
+                    await self._check()
+        return self.healthy
+
+    async def _query_lag(self):
+        async with replica_engine.connect() as connection:
+            return await connection.scalar(text(LAG_SQL))
+
+    async def _check(self):
+        was_healthy = self.healthy
+        try:
+            lag = await asyncio.wait_for(self._query_lag(), LAG_CHECK_TIMEOUT)
+            self.lag = float(lag or 0)
+            self.healthy = self.lag <= settings.DB_REPLICA_MAX_LAG
+            if was_healthy and not self.healthy:
+                print(f"⚠️ Réplica atrasada ({self.lag:.1f}s), leituras no primário")
+        except Exception as e:
+            self.lag = None
+            self.healthy = False
+            if was_healthy or not self.checked_at:
+                print(f"⚠️ Réplica indisponível, leituras no primário: {e}")
+        if self.healthy and not was_healthy:
+            print(f"✅ Leituras na réplica (atraso {self.lag:.1f}s)")
+        self.checked_at = time.monotonic()
+
+    def mark_unhealthy(self):
+        """Tira a réplica de uso até a próxima verificação"""
+        self.healthy = False
+        self.checked_at = time.monotonic()
+
+
+lag_monitor = ReplicaLagMonitor()
+
+# Clientes que escreveram recentemente: chave -> monotonic() até quando ler do primário
+_recent_writers: Dict[int, float] = {}
+
+
+def _client_key(request: Request) -> Optional[int]:
+    authorization = request.headers.get("authorization")
+    return hash(authorization) if authorization else None
+
+
+def note_write(request: Request):
+    """Chamado após requisições que alteram dados (ver middleware em main.py)"""
+    key = _client_key(request)
+    if key is None or replica_engine is None:
+        return
+    now = time.monotonic()
+    if len(_recent_writers) >= MAX_STICKY_CLIENTS:
+        for expired in [k for k, until in _recent_writers.items() if until <= now]:
+            del _recent_writers[expired]
+        if len(_recent_writers) >= MAX_STICKY_CLIENTS:
+            _recent_writers.clear()
+    _recent_writers[key] = now + settings.DB_REPLICA_STICKY_SECONDS
+
+
+def _wrote_recently(request: Optional[Request]) -> bool:
+    if request is None:
+        return False
+    key = _client_key(request)
+    until = _recent_writers.get(key) if key is not None else None
+    return until is not None and until > time.monotonic()
+
+
+async def read_sessionmaker(request: Optional[Request] = None) -> async_sessionmaker:
+    """Fábrica de sessões para leitura: réplica se estiver em dia, senão primário"""
+    if ReplicaSessionLocal is None or _wrote_recently(request):
+        return AsyncSessionLocal
+    if not await lag_monitor.usable():
+        return AsyncSessionLocal
+    return ReplicaSessionLocal
+
+
+async def get_read_db(request: Request) -> AsyncIterator[AsyncSession]:
+    """Dependência para endpoints somente leitura (ver get_db para escritas)"""
+    session_factory = await read_sessionmaker(request)
+    async with session_factory() as session:
+        try:
+            yield session
+        except DBAPIError as e:
+            if session_factory is ReplicaSessionLocal and e.connection_invalidated:
+                lag_monitor.mark_unhealthy()
+            raise
+        finally:
+            await session.close()
+
+
+def replica_stats() -> Dict[str, object]:
+    return {
+        "configured": replica_engine is not None,
+        "healthy": lag_monitor.healthy,
+        "lag_seconds": lag_monitor.lag,
+        "sticky_clients": len(_recent_writers),
+    }
@@ -0,0 +1,94 @@
+"""
+Cache do usuário autenticado usado por get_current_user
+
+Guarda um registro enxuto (id, nome, email, role, ativo) por id de usuário
+em um LRU em memória com TTL e, opcionalmente, no Redis compartilhado entre
+workers (USER_CACHE_REDIS). Alterações de usuário devem chamar
+invalidate_user após o commit.
+"""
+import json
+from dataclasses import dataclass, asdict
+from typing import Optional
+from app.core.config import settings
+from app.core.cache import get_redis, TTLCache, KEY_PREFIX
+from app.models.user import User, UserRole
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Usuário autenticado sem vínculo com a sessão do banco"""
+    id: int
+    name: str
+    email: str
+    role: str
+    is_active: bool
+
+    @property
+    def role_enum(self) -> UserRole:
+        return UserRole(self.role)
+
+    @classmethod
+    def from_user(cls, user: User) -> "CachedUser":
+        role = user.role.value if hasattr(user.role, "value") else user.role
+        return cls(
+            id=user.id,
+            name=user.name,
+            email=user.email,
+            role=role,
+            is_active=bool(user.is_active)
+        )
+
+
+_local_cache = TTLCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
+
+
+def _redis_key(user_id: int) -> str:
+    return f"{KEY_PREFIX}:user:{user_id}"
+
+
+async def get_cached_user(user_id: int) -> Optional[CachedUser]:
+    """Busca o usuário no cache local e, se habilitado, no Redis"""
+    user = _local_cache.get(user_id)
+    if user is not None or not settings.USER_CACHE_REDIS:
+        return user
+
+    redis = get_redis()
+    if redis is None:
+        return None
+    try:
+        raw = await redis.get(_redis_key(user_id))
+    except Exception as e:
+        print(f"⚠️ Cache de usuário indisponível: {e}")
+        return None
+    if raw is None:
+        return None
+    user = CachedUser(**json.loads(raw))
+    _local_cache.set(user_id, user)
+    return user
+
+
+async def cache_user(user: CachedUser):
+    _local_cache.set(user.id, user)
+    if not settings.USER_CACHE_REDIS:
+        return
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        await redis.set(_redis_key(user.id), json.dumps(asdict(user)), ex=settings.USER_CACHE_REDIS_TTL)
+    except Exception as e:
+        print(f"⚠️ Erro ao gravar cache de usuário: {e}")
+
+
+async def invalidate_user(user_id: int):
+    """Remove o usuário do cache (chamar após atualizar ou desativar)"""
+    _local_cache.pop(user_id)
+    if not settings.USER_CACHE_REDIS:
+        return
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        await redis.delete(_redis_key(user_id))
+    except Exception as e:
+        print(f"⚠️ Erro ao invalidar cache de usuário: {e}")
@@ -1,13 +1,22 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.core.database import engine, Base
-from app.api import auth, users, contacts, opportunities, activities, dashboard, projects, external, commissions, quote_requests, notifications, ai, templates, goals, ai_actions, ai_config, ai_chat, lead_analysis, webhooks, ai_public
+from app.core.database import engine, AsyncSessionLocal, pool_stats
+from app.core.cache import close_redis
+from app.core.http_clients import init_http_clients, close_http_clients
+from app.services.rollup import ensure_rollups_populated
+from app.core.migrations import upgrade_database
+from app.core.read_replica import SAFE_METHODS, note_write, replica_stats
+from app.services.search import check_search_available
+from app.services.jobs import JobWorker
+from app.api import auth, users, contacts, opportunities, activities, dashboard, projects, external, commissions, quote_requests, notifications, ai, templates, goals, ai_actions, ai_config, ai_chat, lead_analysis, webhooks, ai_public, jobs, search
 
-# Criar tabelas
+# Aplicar migrações
 async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await upgrade_database()
+    async with engine.connect() as conn:
+        await check_search_available(conn)
 
 app = FastAPI(
     title="Innexar CRM API",
@@ -24,6 +33,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Leitura após escrita: o cliente que acabou de gravar lê do primário
+@app.middleware("http")
+async def track_writes(request: Request, call_next):
+    response = await call_next(request)
+    if request.method not in SAFE_METHODS and response.status_code < 400:
+        note_write(request)
+    return response
+
 # Rotas
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
@@ -45,10 +62,28 @@ app.include_router(webhooks.router, prefix="/api", tags=["webhooks"])
 app.include_router(ai_public.router, prefix="/api/ai/public", tags=["ai-public"])
 app.include_router(templates.router, prefix="/api", tags=["templates"])
 app.include_router(goals.router, prefix="/api", tags=["goals"])
+app.include_router(jobs.router, prefix="/api", tags=["jobs"])
+app.include_router(search.router, prefix="/api", tags=["search"])
 
 @app.on_event("startup")
 async def startup_event():
     await init_db()
+    await init_http_clients()
+    async with AsyncSessionLocal() as db:
+        await ensure_rollups_populated(db)
+    
+    # Worker de jobs embutido (desenvolvimento); em produção use python -m app.worker
+    if settings.JOB_WORKER_IN_APP:
+        app.state.job_worker = JobWorker()
+        app.state.job_worker_task = asyncio.create_task(app.state.job_worker.run())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if getattr(app.state, "job_worker", None):
+        app.state.job_worker.stop()
+        await app.state.job_worker_task
+    await close_http_clients()
+    await close_redis()
 
 @app.get("/")
 async def root():
@@ -58,3 +93,8 @@ async def root():
 async def health():
     return {"status": "ok"}
 
+@app.get("/health/db")
+async def health_db():
+    """Uso do pool de conexões do banco e estado da réplica neste processo"""
+    return {**pool_stats(), "replica": replica_stats()}
+
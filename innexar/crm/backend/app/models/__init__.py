@@ -9,6 +9,8 @@ from app.models.goal import Goal, GoalType, GoalPeriod, GoalStatus, GoalCategory
 from app.models.ai_config import AIConfig, AIModelProvider, AIModelStatus
 from app.models.ai_chat import AIChatMessage
 from app.models.lead_analysis import LeadAnalysis
+from app.models.pipeline_rollup import PipelineRollup, ActivityRollup
+from app.models.background_job import BackgroundJob, JobStatus
 
-__all__ = ["User", "Contact", "Opportunity", "Activity", "Project", "ProjectStatus", "ProjectType", "CommissionStructure", "Commission", "QuoteRequest", "Notification", "AIConfig", "AIModelProvider", "AIModelStatus", "AIChatMessage", "LeadAnalysis"]
+__all__ = ["User", "Contact", "Opportunity", "Activity", "Project", "ProjectStatus", "ProjectType", "CommissionStructure", "Commission", "QuoteRequest", "Notification", "AIConfig", "AIModelProvider", "AIModelStatus", "AIChatMessage", "LeadAnalysis", "PipelineRollup", "ActivityRollup", "BackgroundJob", "JobStatus"]
 
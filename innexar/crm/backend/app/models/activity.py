@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Date, Time
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Date, Time, Index, text
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 from datetime import datetime
@@ -17,6 +17,14 @@ class ActivityStatus(str, enum.Enum):
 
 class Activity(Base):
     __tablename__ = "activities"
+    __table_args__ = (
+        Index("ix_activities_owner_id_status", "owner_id", "status"),
+        # Agenda/atrasadas: só as pendentes interessam
+        Index(
+            "ix_activities_pending_owner_id_due_date", "owner_id", "due_date",
+            postgresql_where=text("status = 'pending'")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     type = Column(String, nullable=False)  # task, call, meeting, note
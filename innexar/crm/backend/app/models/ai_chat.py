@@ -1,7 +1,7 @@
 """
 Modelo para histórico de chat com IA
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 from datetime import datetime
@@ -9,6 +9,9 @@ from datetime import datetime
 class AIChatMessage(Base):
     """Mensagens do chat com IA"""
     __tablename__ = "ai_chat_messages"
+    __table_args__ = (
+        Index("ix_ai_chat_messages_user_id_created_at", "user_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -0,0 +1,41 @@
+"""
+Fila de jobs em background (persistida no Postgres)
+"""
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Index, text
+from app.core.database import Base
+from datetime import datetime
+import enum
+
+class JobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class BackgroundJob(Base):
+    """Job consumido pelo worker (python -m app.worker) via SELECT ... FOR UPDATE SKIP LOCKED"""
+    __tablename__ = "background_jobs"
+    __table_args__ = (
+        Index("ix_background_jobs_status_run_at", "status", "run_at"),
+        Index("ix_background_jobs_dedupe_key", "dedupe_key"),
+        # Um job ativo por chave (alvo do ON CONFLICT de app.services.jobs)
+        Index(
+            "ix_background_jobs_active_dedupe_key", "dedupe_key",
+            unique=True, postgresql_where=text("status IN ('pending', 'running')")
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_type = Column(String(50), nullable=False)  # ex.: lead_analysis
+    payload = Column(JSON, nullable=True)
+    dedupe_key = Column(String(100), nullable=True)  # no máximo um job ativo por chave (ex.: lead_analysis:42)
+    status = Column(String(20), default=JobStatus.PENDING.value, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=5, nullable=False)
+    run_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # próxima execução (backoff)
+    locked_at = Column(DateTime, nullable=True)
+    locked_by = Column(String(100), nullable=True)  # identificação do worker
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Boolean, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Boolean, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSONB
 from app.core.database import Base
@@ -41,6 +41,10 @@ class CommissionStructure(Base):
 class Commission(Base):
     """Histórico de comissões calculadas e pagas"""
     __tablename__ = "commissions"
+    __table_args__ = (
+        Index("ix_commissions_seller_id_payment_period", "seller_id", "payment_period"),
+        Index("ix_commissions_created_at_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     seller_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index, text
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 from datetime import datetime
 
 class Contact(Base):
     __tablename__ = "contacts"
+    __table_args__ = (
+        Index("ix_contacts_created_at_id", "created_at", "id"),
+        Index("ix_contacts_owner_id_created_at_id", "owner_id", "created_at", "id"),
+        Index("ix_contacts_email_lower", text("lower(email)")),  # busca por email exato (sem caixa)
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, index=True)
@@ -1,7 +1,7 @@
 """
 Modelo para análises de leads geradas pela IA
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON, Index, text
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 from datetime import datetime
@@ -9,6 +9,14 @@ from datetime import datetime
 class LeadAnalysis(Base):
     """Análise de lead gerada pela IA"""
     __tablename__ = "lead_analyses"
+    __table_args__ = (
+        # Fila de análises: as concluídas (maioria) ficam fora do índice
+        Index(
+            "ix_lead_analyses_pending_status", "analysis_status",
+            postgresql_where=text("analysis_status <> 'completed'")
+        ),
+        Index("ix_lead_analyses_created_at_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     contact_id = Column(Integer, ForeignKey("contacts.id"), nullable=False, unique=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 from datetime import datetime
@@ -6,6 +6,9 @@ from datetime import datetime
 class Notification(Base):
     """Sistema de notificações do CRM"""
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_recipient_id_is_read_created_at", "recipient_id", "is_read", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Date
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Date, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 from datetime import datetime
 
 class Opportunity(Base):
     __tablename__ = "opportunities"
+    __table_args__ = (
+        Index("ix_opportunities_owner_id_stage", "owner_id", "stage"),
+        Index("ix_opportunities_created_at_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, index=True)
@@ -0,0 +1,35 @@
+"""
+Tabelas de resumo (rollup) do pipeline por vendedor
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, UniqueConstraint
+from app.core.database import Base
+from datetime import datetime
+
+class PipelineRollup(Base):
+    """Resumo de oportunidades por dono e estágio, mantido incrementalmente"""
+    __tablename__ = "pipeline_rollups"
+    __table_args__ = (
+        UniqueConstraint("owner_id", "stage", name="uq_pipeline_rollups_owner_stage"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    stage = Column(String, nullable=False)
+    opportunity_count = Column(Integer, nullable=False, default=0)
+    total_value = Column(Numeric(14, 2), nullable=False, default=0)  # Soma de Opportunity.value
+    weighted_value = Column(Numeric(14, 2), nullable=False, default=0)  # Soma de value * probability / 100
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ActivityRollup(Base):
+    """Contagem de atividades por dono e status, mantida incrementalmente"""
+    __tablename__ = "activity_rollups"
+    __table_args__ = (
+        UniqueConstraint("owner_id", "status", name="uq_activity_rollups_owner_status"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String, nullable=False)
+    activity_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,85 @@
+"""
+Script para (re)analisar leads em lote pela fila de jobs
+
+O lote é processado pelo worker (python -m app.worker); o script cria o
+lote e acompanha o progresso. Interromper o script não interrompe o lote.
+
+Uso:
+    python -m app.scripts.analyze_leads [--status lead] [--source website]
+        [--created-from 2025-01-01] [--created-to 2025-06-30]
+        [--analysis missing|error|missing_or_error|all] [--no-follow]
+    python -m app.scripts.analyze_leads --batch-id <id>   # acompanha um lote existente
+"""
+import argparse
+import asyncio
+from app.core.database import AsyncSessionLocal, engine
+from app.core.migrations import upgrade_database
+from app.services.lead_analysis_batch import (
+    ANALYSIS_FILTERS,
+    LeadAnalysisBatchFilter,
+    get_lead_analysis_batch,
+    start_lead_analysis_batch,
+)
+
+POLL_INTERVAL = 5  # segundos
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Análise de leads em lote")
+    parser.add_argument("--status", help="Status do contato (lead, client, prospect)")
+    parser.add_argument("--source", help="Origem do lead")
+    parser.add_argument("--owner-id", type=int)
+    parser.add_argument("--created-from", help="Data inicial de criação (AAAA-MM-DD)")
+    parser.add_argument("--created-to", help="Data final de criação (AAAA-MM-DD)")
+    parser.add_argument("--analysis", choices=ANALYSIS_FILTERS, default="missing_or_error")
+    parser.add_argument("--batch-id", help="Acompanhar um lote já criado")
+    parser.add_argument("--no-follow", action="store_true", help="Só cria o lote, sem acompanhar")
+    return parser.parse_args()
+
+async def follow(batch_id: str):
+    while True:
+        async with AsyncSessionLocal() as db:
+            progress = await get_lead_analysis_batch(db, batch_id)
+        if progress is None:
+            print(f"⚠️ Lote {batch_id} não encontrado")
+            return
+        waiting = " (aguardando espaço na fila)" if progress.waiting_for_queue else ""
+        print(
+            f"Lote {batch_id}: {progress.status}{waiting} - {progress.scanned} contato(s) lido(s), "
+            f"{progress.enqueued} análise(s) agendada(s), último id {progress.last_contact_id}"
+        )
+        if progress.status == "failed":
+            print(f"⚠️ Lote falhou: {progress.last_error}")
+            return
+        if progress.completed_at:
+            print(f"✅ Lote {batch_id} concluído")
+            return
+        await asyncio.sleep(POLL_INTERVAL)
+
+async def main():
+    args = parse_args()
+    await upgrade_database()
+    
+    batch_id = args.batch_id
+    if not batch_id:
+        filters = LeadAnalysisBatchFilter(
+            status=args.status,
+            source=args.source,
+            owner_id=args.owner_id,
+            created_from=args.created_from,
+            created_to=args.created_to,
+            analysis=args.analysis
+        )
+        async with AsyncSessionLocal() as db:
+            job = await start_lead_analysis_batch(db, filters)
+            await db.commit()
+        batch_id = job.payload["batch_id"]
+        print(f"✅ Lote {batch_id} criado (job {job.id})")
+    
+    try:
+        if not args.no_follow:
+            await follow(batch_id)
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
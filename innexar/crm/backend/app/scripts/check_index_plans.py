@@ -0,0 +1,91 @@
+"""
+Script para conferir se os filtros mais usados usam os índices da
+revisão 0004_hot_path_indexes
+
+Roda EXPLAIN de cada consulta e mostra se o plano usa o índice esperado.
+Com --force-index o seq scan é desligado na transação: em tabelas pequenas
+o Postgres prefere varrer a tabela, e assim confere-se ao menos que o
+índice atende a consulta.
+
+Uso: python -m app.scripts.check_index_plans [--force-index]
+"""
+import argparse
+import asyncio
+import json
+import sys
+from sqlalchemy import text
+from app.core.database import engine
+from app.core.migrations import upgrade_database
+
+# (índice esperado, consulta com os mesmos filtros/ordenação da API)
+HOT_QUERIES = (
+    ("ix_contacts_created_at_id",
+     "SELECT id FROM contacts WHERE (created_at, id) < (now(), 2147483647) "
+     "ORDER BY created_at DESC, id DESC LIMIT 50"),
+    ("ix_contacts_owner_id_created_at_id",
+     "SELECT id FROM contacts WHERE owner_id = 1 ORDER BY created_at DESC, id DESC LIMIT 50"),
+    ("ix_opportunities_owner_id_stage",
+     "SELECT stage, count(*) FROM opportunities WHERE owner_id = 1 GROUP BY stage"),
+    ("ix_opportunities_created_at_id",
+     "SELECT id FROM opportunities ORDER BY created_at DESC, id DESC LIMIT 50"),
+    ("ix_activities_owner_id_status",
+     "SELECT count(*) FROM activities WHERE owner_id = 1 AND status = 'completed'"),
+    ("ix_activities_pending_owner_id_due_date",
+     "SELECT id FROM activities WHERE owner_id = 1 AND status = 'pending' AND due_date < current_date"),
+    ("ix_notifications_recipient_id_is_read_created_at",
+     "SELECT id FROM notifications WHERE recipient_id = 1 AND is_read = false "
+     "ORDER BY created_at DESC LIMIT 50"),
+    ("ix_ai_chat_messages_user_id_created_at",
+     "SELECT id FROM ai_chat_messages WHERE user_id = 1 ORDER BY created_at DESC LIMIT 50"),
+    ("ix_commissions_seller_id_payment_period",
+     "SELECT sum(commission_amount) FROM commissions WHERE seller_id = 1 AND payment_period = '2025-01'"),
+    ("ix_commissions_created_at_id",
+     "SELECT id FROM commissions ORDER BY created_at DESC, id DESC LIMIT 50"),
+    ("ix_lead_analyses_pending_status",
+     "SELECT id FROM lead_analyses WHERE analysis_status = 'error'"),
+    ("ix_lead_analyses_created_at_id",
+     "SELECT id FROM lead_analyses ORDER BY created_at DESC, id DESC LIMIT 50"),
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Confere o uso dos índices nos filtros mais usados")
+    parser.add_argument("--force-index", action="store_true", help="Desliga o seq scan durante o EXPLAIN")
+    return parser.parse_args()
+
+def plan_indexes(node: dict) -> set:
+    """Nomes dos índices usados em qualquer nó do plano"""
+    found = {node["Index Name"]} if "Index Name" in node else set()
+    for child in node.get("Plans", []):
+        found |= plan_indexes(child)
+    return found
+
+async def main():
+    args = parse_args()
+    await upgrade_database()
+
+    missing = []
+    async with engine.connect() as connection:
+        async with connection.begin():
+            if args.force_index:
+                await connection.execute(text("SET LOCAL enable_seqscan = off"))
+            for index, query in HOT_QUERIES:
+                result = await connection.execute(text(f"EXPLAIN (FORMAT JSON) {query}"))
+                plan = result.scalar_one()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                used = plan_indexes(plan[0]["Plan"])
+                if index in used:
+                    print(f"✅ {index}")
+                else:
+                    missing.append(index)
+                    print(f"⚠️ {index} não usado (plano: {', '.join(sorted(used)) or 'seq scan'})")
+    await engine.dispose()
+
+    if missing:
+        print(f"⚠️ {len(missing)} consulta(s) sem o índice esperado")
+        sys.exit(1)
+    print("✅ Todas as consultas usam o índice esperado")
+
+if __name__ == "__main__":
+    asyncio.run(main())
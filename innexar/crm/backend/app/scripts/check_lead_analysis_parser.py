@@ -0,0 +1,248 @@
+"""
+Script para conferir o parser de análises de leads (app.services.lead_analysis_parser)
+
+1. Amostras: respostas reais de providers em lead_analysis_samples/ (seções
+   "=== X ===", "## X", "TÍTULO:" sozinho e resposta dentro de ```); confere
+   seções, score, valor potencial e probabilidade extraídos.
+2. Fuzz: entradas aleatórias e adversariais (sequências longas de "=", "*",
+   "R$1.1.1...", ``` sem fechamento); nenhuma pode levantar exceção nem
+   passar de --max-ms.
+3. Benchmark: tempo do parser contra o caminho antigo (um re.search por
+   padrão sobre o texto inteiro, removido em app/api/lead_analysis.py),
+   para cada amostra no tamanho original e com ~50 KB (primeira seção
+   estendida, como em respostas muito detalhadas). Só informativo.
+
+Sai com código 1 se alguma verificação falhar.
+
+Uso: python -m app.scripts.check_lead_analysis_parser [--fuzz 5000] [--seed 0]
+        [--max-ms 50] [--no-benchmark]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from app.services.lead_analysis_parser import parse_lead_analysis
+
+SAMPLES_DIR = Path(__file__).resolve().parent / "lead_analysis_samples"
+
+# amostra -> (score, valor, probabilidade, {seção: (início, fim)}); seções fora do dicionário ficam vazias
+EXPECTED = {
+    "fenced.txt": (78, 120000.0, 35.0, {
+        "company_info": ("Nome: Padaria Pão Dourado Ltda", "cerca de 45"),
+        "digital_presence": ("- Site: https://paodourado.com.br", "LinkedIn: não encontrado"),
+        "market_analysis": ("Concorre com redes regionais", "presença nos bairros."),
+        "financial_insights": ("Capacidade de investimento moderada", "atualizado em 2022."),
+        "lead_profile": ("Cargo: sócio-diretor", "antes do fim do ano)"),
+        "business_potential": ("Score de oportunidade: 78/100", "Probabilidade de fechamento: 35%"),
+        "recommendations": ("1. Apresentar um e-commerce", "em até 7 dias."),
+        "risk_assessment": ("Orçamento pode ser redirecionado", "loja central."),
+        "sources": ("Site da empresa", "Google Maps."),
+    }),
+    "markdown.txt": (62, 1500000.0, 40.5, {
+        "company_info": ("**Nome:** Construtora Horizonte S.A.", "Belo Horizonte (MG)"),
+        "digital_presence": ("Site institucional desatualizado", "está fora do ar."),
+        "market_analysis": ("Mercado aquecido", "acompanhamento de obra."),
+        "lead_profile": ("Gerente de TI", "é da diretoria."),
+        "business_potential": ("**Score:** 62", "no primeiro semestre."),
+        "recommendations": ("Começar por um piloto", "expandir para o ERP."),
+        "risk_assessment": ("Ciclo de decisão longo", "diretoria financeira."),
+    }),
+    "labels.txt": (91, 80000.0, 70.0, {
+        "company_info": ("Clínica Sorriso Feliz", "no Recife."),
+        "digital_presence": ("Site com agendamento por WhatsApp", "Instagram ativo."),
+        "market_analysis": ("Setor odontológico em consolidação.\nObservação:", "com aplicativo próprio."),
+        "lead_profile": ("Diretora administrativa", "urgência alta."),
+        "business_potential": ("Pontuação - 91", "Probabilidade alta: 70%"),
+        "recommendations": ("Proposta em duas fases", "(MVP em 60 dias)."),
+        "risk_assessment": ("Dependência de integração", "prontuário atual."),
+    }),
+    "code_fenced.txt": (55, 250000.0, 20.0, {
+        "company_info": ("AgroVale Cooperativa", "Rio Verde (GO)."),
+        "business_potential": ("Score de oportunidade: 55", "Probabilidade de fechamento: 20%"),
+        "sources": ("Site da cooperativa", "relatório anual 2023."),
+    }),
+}
+
+FUZZ_TOKENS = (
+    "=", "==", "===", "*", "**", "#", "## ", ":", " ", "\t", "\n", "\n\n", "```", "```json\n",
+    "R$", "R$ ", "1", "1.", "1,", "000", "mil", "milhão", "k", "%", "-", "Score", "score: ",
+    "Probabilidade", "probabilidade de fechamento ", "pontuação", "Observação", "Ç", "ã",
+    "=== INFORMAÇÕES DA EMPRESA ===", "=== POTENCIAL DE NEGÓCIO ===", "=== X ===",
+    "## Potencial de Negócio", "RECOMENDAÇÕES:", "**Riscos:**", "1. Empresa", "texto livre",
+)
+
+ADVERSARIAL = (
+    "=" * 20000,
+    "*" * 20000,
+    "#" * 20000,
+    ":" * 20000,
+    "R$" + "1." * 10000,
+    "R$ " + "1,1." * 5000 + " milhões",
+    "```" + "\n=== POTENCIAL DE NEGÓCIO ===\nScore: 50" * 500,
+    "```json\n" + "{" * 20000,
+    "=== " + "a" * 20000 + " ===",
+    "**" + "a" * 20000 + ":**",
+    "## " + "x " * 10000,
+    "Probabilidade " + "9" * 20000 + "%",
+    "Probabilidade" + " de" * 7000 + " 50%",
+    "Score " + "-" * 20000 + " 10",
+    ("=== POTENCIAL DE NEGÓCIO ===\n" * 2000),
+    ("Mercado:\n" * 3000),
+    "=" * 10000 + "\n" + "=" * 10000,
+    "",
+    "```",
+)
+
+# Caminho antigo (antes do parser em uma passada), só para o benchmark
+LEGACY_SCORE_PATTERNS = (
+    r'Score de oportunidade[:\s]+(\d+)',
+    r'Score[:\s]+(\d+)',
+    r'opportunity_score[:\s]+(\d+)',
+    r'pontuação[:\s]+(\d+)'
+)
+LEGACY_VALUE_PATTERNS = (
+    r'Valor potencial estimado[:\s]+R\$\s*([\d.,]+)',
+    r'Valor estimado[:\s]+R\$\s*([\d.,]+)',
+    r'potential_value[:\s]+R\$\s*([\d.,]+)',
+    r'R\$\s*([\d.,]+)'
+)
+LEGACY_SECTION_TITLES = {
+    "company_info": ("INFORMAÇÕES DA EMPRESA", "INFORMAÇÕES DA EMPRESA", "Empresa"),
+    "digital_presence": ("PRESENÇA DIGITAL", "PRESENÇA DIGITAL", "Digital"),
+    "market_analysis": ("ANÁLISE DE MERCADO", "ANÁLISE DE MERCADO", "Mercado"),
+    "financial_insights": ("INSIGHTS FINANCEIROS", "INSIGHTS FINANCEIROS", "Financeiro"),
+    "lead_profile": ("PERFIL DO LEAD", "PERFIL DO LEAD", "Perfil"),
+    "business_potential": ("POTENCIAL DE NEGÓCIO", "POTENCIAL DE NEGÓCIO", "Potencial"),
+    "recommendations": ("RECOMENDAÇÕES ESTRATÉGICAS", "RECOMENDAÇÕES", "Recomendações"),
+    "risk_assessment": ("AVALIAÇÃO DE RISCOS", "AVALIAÇÃO DE RISCOS", "Riscos"),
+    "sources": ("FONTES DE PESQUISA", "FONTES", "Fontes"),
+}
+LEGACY_SECTION_PATTERNS = {
+    section: (
+        rf"=== {fenced} ===\s*\n(.*?)(?=\n===|\n==|\Z)",
+        rf"{upper}[:\n]+(.*?)(?=\n[A-ZÁÊÔÇ]{{3,}}|==|\Z)",
+        rf"{label}[:\n]+(.*?)(?=\n[A-ZÁÊÔÇ]{{3,}}|==|\Z)"
+    )
+    for section, (fenced, upper, label) in LEGACY_SECTION_TITLES.items()
+}
+
+
+def legacy_parse(response: str):
+    text = response.strip()
+    score = None
+    for pattern in LEGACY_SCORE_PATTERNS:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            score = int(match.group(1))
+            break
+    value = None
+    for pattern in LEGACY_VALUE_PATTERNS:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            try:
+                value = float(match.group(1).replace('.', '').replace(',', '.'))
+                break
+            except ValueError:
+                pass
+    sections = dict.fromkeys(LEGACY_SECTION_PATTERNS, "")
+    for section, patterns in LEGACY_SECTION_PATTERNS.items():
+        for pattern in patterns:
+            match = re.search(pattern, text, re.DOTALL | re.IGNORECASE | re.MULTILINE)
+            if match:
+                sections[section] = match.group(1).strip()
+                break
+    return sections, score, value
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Confere o parser de análises de leads")
+    parser.add_argument("--fuzz", type=int, default=5000, help="Entradas aleatórias no fuzz")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-ms", type=float, default=50.0, help="Tempo máximo por entrada no fuzz")
+    parser.add_argument("--no-benchmark", action="store_true")
+    return parser.parse_args()
+
+def check_samples() -> list:
+    errors = []
+    for name, (score, value, probability, sections) in EXPECTED.items():
+        parsed = parse_lead_analysis((SAMPLES_DIR / name).read_text(encoding="utf-8"))
+        fields = (
+            ("opportunity_score", parsed.opportunity_score, score),
+            ("potential_value", parsed.potential_value, value),
+            ("close_probability", parsed.close_probability, probability),
+        )
+        for field, got, expected in fields:
+            if got != expected:
+                errors.append(f"{name}: {field} = {got!r}, esperado {expected!r}")
+        for key, content in parsed.sections.items():
+            if key not in sections:
+                if content:
+                    errors.append(f"{name}: seção {key} deveria estar vazia: {content[:60]!r}")
+                continue
+            start, end = sections[key]
+            if not (content.startswith(start) and content.endswith(end)):
+                errors.append(f"{name}: seção {key} = {content[:60]!r}...{content[-40:]!r}")
+    return errors
+
+def fuzz_inputs(count: int, rng: random.Random):
+    yield from ADVERSARIAL
+    for _ in range(count):
+        yield "".join(rng.choice(FUZZ_TOKENS) for _ in range(rng.randint(1, 400)))
+
+def check_fuzz(count: int, seed: int, max_ms: float) -> list:
+    errors = []
+    slowest = 0.0
+    for index, text in enumerate(fuzz_inputs(count, random.Random(seed))):
+        started = time.perf_counter()
+        try:
+            parse_lead_analysis(text)
+        except Exception as e:
+            errors.append(f"fuzz #{index}: {e.__class__.__name__}: {e} (entrada {text[:60]!r})")
+            continue
+        elapsed = (time.perf_counter() - started) * 1000
+        slowest = max(slowest, elapsed)
+        if elapsed > max_ms:
+            errors.append(f"fuzz #{index}: {elapsed:.1f} ms (entrada {text[:60]!r})")
+    print(f"Fuzz: {len(ADVERSARIAL) + count} entradas, mais lenta {slowest:.2f} ms")
+    return errors
+
+def extend_first_section(text: str, size: int = 50_000) -> str:
+    """Repete uma linha de conteúdo logo após o primeiro título até o texto ter ~size caracteres"""
+    lines = text.split("\n")
+    first = next(i for i, line in enumerate(lines) if line.strip()[:1] in ("=", "#", "*") and not line.startswith("```"))
+    filler = "A empresa mantém operação estável e atende clientes em diferentes regiões do estado."
+    lines[first + 1:first + 1] = [filler] * max((size - len(text)) // (len(filler) + 1), 0)
+    return "\n".join(lines)
+
+def timed(parse, text: str, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        parse(text)
+    return (time.perf_counter() - started) * 1000 / rounds
+
+def benchmark(rounds: int = 50):
+    print("Benchmark (ms por resposta): amostra, tamanho, parser, antigo")
+    for path in sorted(SAMPLES_DIR.glob("*.txt")):
+        sample = path.read_text(encoding="utf-8")
+        for text in (sample, extend_first_section(sample)):
+            new, old = timed(parse_lead_analysis, text, rounds), timed(legacy_parse, text, rounds)
+            print(f"  {path.name:<16} {len(text):>7} {new:8.3f} {old:8.3f} ({old / new:.1f}x)")
+
+def main():
+    args = parse_args()
+    errors = check_samples()
+    if not errors:
+        print(f"✅ {len(EXPECTED)} amostras conferidas")
+    errors += check_fuzz(args.fuzz, args.seed, args.max_ms)
+    if not args.no_benchmark:
+        benchmark()
+
+    if errors:
+        for error in errors:
+            print(f"⚠️ {error}")
+        sys.exit(1)
+    print("✅ Parser de análises conferido")
+
+if __name__ == "__main__":
+    main()
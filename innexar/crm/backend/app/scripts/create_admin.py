@@ -1,13 +1,13 @@
 import asyncio
 import sys
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import AsyncSessionLocal, engine, Base
+from app.core.database import AsyncSessionLocal
+from app.core.migrations import upgrade_database
 from app.models.user import User, UserRole
 from app.core.auth import get_password_hash
 
 async def create_admin():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await upgrade_database()
     
     async with AsyncSessionLocal() as db:
         # Verificar se já existe admin
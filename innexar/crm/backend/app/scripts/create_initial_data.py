@@ -3,7 +3,7 @@ Script para criar dados iniciais e atualizar estrutura do banco
 """
 import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from app.core.database import Base
+from app.core.migrations import upgrade_database
 from app.models.user import User, UserRole
 from app.models.contact import Contact
 from app.models.opportunity import Opportunity
@@ -16,8 +16,7 @@ async def init_db():
     """Inicializa banco de dados e cria tabelas"""
     engine = create_async_engine(settings.DATABASE_URL, echo=False)
     
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await upgrade_database()
     
     async_session = async_sessionmaker(engine, expire_on_commit=False)
     
@@ -0,0 +1,21 @@
+"""
+Script para reconstruir as tabelas de rollup do pipeline
+
+Uso: python -m app.scripts.rebuild_rollups
+"""
+import asyncio
+from app.core.database import AsyncSessionLocal, engine
+from app.core.migrations import upgrade_database
+from app.services.rollup import rebuild_rollups
+
+async def main():
+    await upgrade_database()
+    
+    async with AsyncSessionLocal() as db:
+        await rebuild_rollups(db)
+    
+    await engine.dispose()
+    print("✅ Rollups do pipeline reconstruídos com sucesso!")
+
+if __name__ == "__main__":
+    asyncio.run(main())
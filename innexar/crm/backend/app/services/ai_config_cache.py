@@ -0,0 +1,99 @@
+"""
+Cache da configuração de IA ativa (get_active_ai_config) e da lista de
+configurações candidatas do roteador de IA
+
+A configuração resolvida fica em memória no processo como uma cópia
+desvinculada da sessão. Cada alteração em ai_configs incrementa a versão
+"ai_config" (local e no Redis, compartilhada entre API e worker); o cache é
+recarregado quando a versão muda. Sem Redis, AI_CONFIG_CACHE_TTL limita o
+tempo máximo de uma configuração desatualizada em outros processos.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.cache import get_cache_version, invalidate_cache, register_invalidation
+from app.models.ai_config import AIConfig
+
+NAMESPACE = "ai_config"
+
+# Commits que tocam ai_configs também incrementam a versão compartilhada
+register_invalidation(NAMESPACE, AIConfig)
+
+
+def _snapshot(config: Any) -> Any:
+    """Cópia transiente (sem sessão) para ser compartilhada entre requisições"""
+    if config is None:
+        return None
+    if isinstance(config, list):
+        return [_snapshot(item) for item in config]
+    return AIConfig(**{attr.key: getattr(config, attr.key) for attr in AIConfig.__mapper__.column_attrs})
+
+
+class ActiveAIConfigCache:
+    def __init__(self):
+        self._config: Optional[AIConfig] = None
+        self._loaded = False
+        self._local_version = 0
+        self._loaded_local_version = -1
+        self._loaded_shared_version: Optional[str] = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _is_fresh(self) -> bool:
+        if not self._loaded or self._loaded_local_version != self._local_version:
+            return False
+        now = time.monotonic()
+        if now - self._loaded_at > settings.AI_CONFIG_CACHE_TTL:
+            return False
+        if now - self._checked_at < settings.AI_CONFIG_CACHE_CHECK_INTERVAL:
+            return True
+        shared = await get_cache_version(NAMESPACE)
+        if shared is not None and shared != self._loaded_shared_version:
+            return False
+        self._checked_at = now
+        return True
+
+    async def get(
+        self,
+        db: AsyncSession,
+        loader: Callable[[AsyncSession], Awaitable[Any]]
+    ) -> Any:
+        if await self._is_fresh():
+            return self._config
+
+        async with self._lock:
+            # Outra requisição pode ter recarregado enquanto esperávamos
+            if await self._is_fresh():
+                return self._config
+            local_version = self._local_version
+            shared = await get_cache_version(NAMESPACE)
+            config = _snapshot(await loader(db))
+            if local_version == self._local_version:
+                now = time.monotonic()
+                self._config = config
+                self._loaded = True
+                self._loaded_local_version = local_version
+                self._loaded_shared_version = shared
+                self._loaded_at = now
+                self._checked_at = now
+            return config
+
+    def invalidate_local(self):
+        self._local_version += 1
+
+    async def invalidate(self):
+        self.invalidate_local()
+        await invalidate_cache(NAMESPACE)
+
+
+active_ai_config_cache = ActiveAIConfigCache()
+active_ai_configs_cache = ActiveAIConfigCache()
+
+
+async def invalidate_active_ai_config():
+    """Descarta as configurações em cache (chamar após alterar ai_configs)"""
+    active_ai_configs_cache.invalidate_local()
+    await active_ai_config_cache.invalidate()
@@ -0,0 +1,295 @@
+"""
+Roteamento das chamadas de IA entre as configurações ativas
+
+call_ai_api (sem config explícita) passa a usar todas as configurações
+ativas: a ordem segue a padrão/prioridade (AI_ROUTER_STRATEGY=priority) ou
+sorteio ponderado por config["weight"] dentro de cada prioridade
+(AI_ROUTER_STRATEGY=weighted). Timeouts, erros de conexão, 5xx e 429 fazem
+failover para o próximo provider; outros erros são devolvidos na hora.
+
+Cada configuração tem um circuit breaker: após AI_ROUTER_FAILURE_THRESHOLD
+falhas seguidas o circuito abre, a configuração é gravada com
+status="error" e last_error, e só volta a receber uma requisição de teste
+após AI_ROUTER_CIRCUIT_COOLDOWN segundos. Se o teste funcionar o status
+volta para "active". Endpoints sensíveis à latência podem usar requisições
+hedged: se o provider não responder em AI_ROUTER_HEDGE_DELAY segundos, o
+próximo é acionado em paralelo e vale a primeira resposta.
+"""
+import asyncio
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+import httpx
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.ai_config import AIConfig, AIModelStatus
+from app.services.ai_config_cache import active_ai_configs_cache, invalidate_active_ai_config
+
+ProviderCall = Callable[[AIConfig], Awaitable[str]]
+
+
+class AIProviderError(HTTPException):
+    """Falha do provider de IA (para o cliente continua sendo um erro 500)"""
+
+    def __init__(self, detail: str, upstream_status: Optional[int] = None, retryable: Optional[bool] = None):
+        super().__init__(status_code=500, detail=detail)
+        self.upstream_status = upstream_status
+        if retryable is None:
+            retryable = upstream_status is not None and (upstream_status >= 500 or upstream_status == 429)
+        self.retryable = retryable
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Erros que justificam tentar outro provider"""
+    if isinstance(error, AIProviderError):
+        return error.retryable
+    return isinstance(error, httpx.TransportError)
+
+
+def _error_message(error: BaseException) -> str:
+    message = getattr(error, "detail", None) or str(error) or error.__class__.__name__
+    return str(message)[:500]
+
+
+def _timestamp(value: Optional[datetime]) -> float:
+    if value is None:
+        return 0.0
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+async def _load_ai_candidates(db: AsyncSession) -> List[AIConfig]:
+    """Configurações ativas (inclusive com circuito aberto), padrão primeiro"""
+    result = await db.execute(
+        select(AIConfig).where(
+            AIConfig.is_active == True,
+            AIConfig.status.in_([AIModelStatus.ACTIVE.value, AIModelStatus.ERROR.value])
+        ).order_by(AIConfig.is_default.desc(), AIConfig.priority.desc(), AIConfig.id)
+    )
+    return list(result.scalars().all())
+
+
+async def get_ai_candidates(db: AsyncSession) -> List[AIConfig]:
+    """Configurações candidatas ao roteamento (em cache no processo)"""
+    return await active_ai_configs_cache.get(db, _load_ai_candidates)
+
+
+@dataclass
+class _Circuit:
+    failures: int = 0
+    opened_at: Optional[float] = None  # time.time() da abertura; None = fechado
+    changed_at: float = 0.0  # última transição conhecida (local ou do banco)
+    probing: bool = False
+
+
+class AIRouter:
+    """Failover, balanceamento e circuit breaker entre configurações de IA"""
+
+    def __init__(self):
+        self._circuits: Dict[int, _Circuit] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.calls: Dict[int, int] = defaultdict(int)
+        self.failures: Dict[int, int] = defaultdict(int)
+        self.failovers = 0
+        self.hedges = 0
+
+    def _circuit(self, config: AIConfig) -> _Circuit:
+        circuit = self._circuits.setdefault(config.id, _Circuit())
+        # Status gravado por outro processo (ou pelo teste do admin) mais novo que o local
+        updated = _timestamp(config.updated_at)
+        if updated > circuit.changed_at:
+            if config.status == AIModelStatus.ERROR.value and circuit.opened_at is None:
+                circuit.opened_at = updated
+                circuit.failures = settings.AI_ROUTER_FAILURE_THRESHOLD
+            elif config.status == AIModelStatus.ACTIVE.value and circuit.opened_at is not None:
+                circuit.opened_at = None
+                circuit.failures = 0
+            circuit.changed_at = updated
+        return circuit
+
+    def _allows(self, config: AIConfig) -> bool:
+        circuit = self._circuit(config)
+        if circuit.opened_at is None:
+            return True
+        if time.time() - circuit.opened_at < settings.AI_ROUTER_CIRCUIT_COOLDOWN:
+            return False
+        # Meio aberto: apenas uma requisição de teste por vez
+        return not circuit.probing
+
+    def _order(self, candidates: List[AIConfig]) -> List[AIConfig]:
+        if settings.AI_ROUTER_STRATEGY != "weighted":
+            return list(candidates)
+
+        def weighted_key(config: AIConfig) -> float:
+            weight = float((config.config or {}).get("weight", 1) or 0)
+            return random.random() ** (1 / weight) if weight > 0 else 0.0
+
+        tiers: Dict[int, List[AIConfig]] = defaultdict(list)
+        for config in candidates:
+            tiers[config.priority or 0].append(config)
+        ordered = []
+        for priority in sorted(tiers, reverse=True):
+            ordered.extend(sorted(tiers[priority], key=weighted_key, reverse=True))
+        return ordered
+
+    async def call(
+        self,
+        candidates: List[AIConfig],
+        call: ProviderCall,
+        hedge_delay: Optional[float] = None
+    ) -> str:
+        """Executa call no melhor provider disponível, com failover (e hedge, se informado)"""
+        ordered = self._order(candidates)
+        # Com todos os circuitos abertos, tentar mesmo assim é melhor que falhar direto
+        available = [config for config in ordered if self._allows(config)] or ordered
+        available = available[:max(settings.AI_ROUTER_MAX_ATTEMPTS, 1)]
+
+        if hedge_delay is not None and len(available) > 1:
+            return await self._call_hedged(available, call, hedge_delay)
+
+        last_error: Optional[BaseException] = None
+        for index, config in enumerate(available):
+            if index:
+                self.failovers += 1
+            try:
+                return await self._attempt(config, call)
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                print(f"⚠️ Provider {config.name} ({config.provider}) falhou: {_error_message(e)}")
+                last_error = e
+        raise last_error
+
+    async def _call_hedged(self, candidates: List[AIConfig], call: ProviderCall, delay: float) -> str:
+        remaining = list(candidates)
+        pending: Dict[asyncio.Task, AIConfig] = {}
+        last_error: Optional[BaseException] = None
+
+        def launch():
+            config = remaining.pop(0)
+            pending[asyncio.create_task(self._attempt(config, call))] = config
+
+        launch()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    set(pending),
+                    timeout=delay if remaining else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Provider lento: dispara o próximo em paralelo
+                    self.hedges += 1
+                    launch()
+                    continue
+                for task in done:
+                    config = pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+                    if not is_retryable(error):
+                        raise error
+                    print(f"⚠️ Provider {config.name} ({config.provider}) falhou: {_error_message(error)}")
+                    last_error = error
+                    if remaining:
+                        self.failovers += 1
+                        launch()
+            raise last_error
+        finally:
+            for task in pending:
+                if task.done() and not task.cancelled():
+                    task.exception()
+                else:
+                    task.cancel()
+
+    async def _attempt(self, config: AIConfig, call: ProviderCall) -> str:
+        circuit = self._circuit(config)
+        probing = circuit.opened_at is not None
+        if probing:
+            circuit.probing = True
+        self.calls[config.id] += 1
+        try:
+            response = await call(config)
+        except Exception as e:
+            if is_retryable(e):
+                self._record_failure(config, circuit, e)
+            raise
+        finally:
+            if probing:
+                circuit.probing = False
+        self._record_success(config, circuit)
+        return response
+
+    def _record_failure(self, config: AIConfig, circuit: _Circuit, error: BaseException):
+        self.failures[config.id] += 1
+        circuit.failures += 1
+        now = time.time()
+        if circuit.opened_at is not None:
+            # Teste do circuito meio aberto falhou: volta a esperar o cooldown
+            circuit.opened_at = now
+        elif circuit.failures >= settings.AI_ROUTER_FAILURE_THRESHOLD:
+            circuit.opened_at = now
+            circuit.changed_at = now
+            print(f"⚠️ Circuito aberto para {config.name} ({config.provider}) após {circuit.failures} falhas")
+            self._persist_status(config.id, AIModelStatus.ERROR.value, _error_message(error))
+
+    def _record_success(self, config: AIConfig, circuit: _Circuit):
+        circuit.failures = 0
+        if circuit.opened_at is not None:
+            circuit.opened_at = None
+            circuit.changed_at = time.time()
+            print(f"✅ Circuito fechado para {config.name} ({config.provider})")
+            self._persist_status(config.id, AIModelStatus.ACTIVE.value, None)
+
+    def _persist_status(self, config_id: int, status: str, error: Optional[str]):
+        """Grava status/last_error em background (não atrasa a resposta)"""
+        task = asyncio.get_running_loop().create_task(self._save_status(config_id, status, error))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _save_status(self, config_id: int, status: str, error: Optional[str]):
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(AIConfig)
+                    .where(AIConfig.id == config_id)
+                    .values(status=status, last_error=error, updated_at=datetime.utcnow())
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+            # UPDATE direto não passa pelos eventos de flush da sessão
+            await invalidate_active_ai_config()
+        except Exception as e:
+            print(f"⚠️ Erro ao gravar status da configuração de IA {config_id}: {e}")
+
+    def stats(self) -> Dict[str, object]:
+        now = time.time()
+        circuits = {}
+        for config_id, circuit in self._circuits.items():
+            if circuit.opened_at is None:
+                state = "closed"
+            elif now - circuit.opened_at < settings.AI_ROUTER_CIRCUIT_COOLDOWN:
+                state = "open"
+            else:
+                state = "half_open"
+            circuits[config_id] = {
+                "state": state,
+                "consecutive_failures": circuit.failures,
+                "calls": self.calls[config_id],
+                "failures": self.failures[config_id]
+            }
+        return {
+            "enabled": settings.AI_ROUTER_ENABLED,
+            "strategy": settings.AI_ROUTER_STRATEGY,
+            "failovers": self.failovers,
+            "hedges": self.hedges,
+            "circuits": circuits
+        }
+
+
+ai_router = AIRouter()
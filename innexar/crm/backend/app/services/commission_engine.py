@@ -0,0 +1,282 @@
+"""
+Cálculo de comissões (individual e em lote por período de pagamento)
+
+compile_structure converte uma CommissionStructure uma única vez em listas
+ordenadas de Decimal (faixas e bônus); a faixa de cada deal é encontrada
+com bisect em vez de varrer e converter o JSONB a cada cálculo.
+
+run_commission_batch fecha um payment_period ("2025-01"): busca todas as
+oportunidades ganhas no mês que ainda não têm comissão, calcula cada uma e
+grava as Commission com um único INSERT. Regras do lote:
+
+- deal de cliente novo (primeira oportunidade ganha do contato) usa a
+  faixa; deal de cliente recorrente usa recurring_commission_rate;
+- a cada new_client_threshold clientes novos do vendedor no período, o
+  deal que completa o grupo recebe new_client_bonus; a contagem começa
+  pelos clientes das comissões não canceladas que já existem no período
+  (rodadas anteriores ou /calculate), para uma nova rodada não zerá-la;
+- performance_bonus segue o maior threshold atingido pelo deal;
+- weekly_base não entra nas linhas por deal (é pago por semana, não por
+  negócio); no cálculo avulso continua somado como antes.
+"""
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from app.core.cache import invalidate_cache
+from app.models.commission import Commission, CommissionStructure
+from app.models.opportunity import Opportunity
+from app.services.goal_progress import WON_STAGE, opportunity_closed_at
+
+ZERO = Decimal("0")
+INFINITY = Decimal("Infinity")
+CENT = Decimal("0.01")
+
+
+def _decimal(value: Any, default: Decimal = ZERO) -> Decimal:
+    return Decimal(str(value)) if value is not None else default
+
+
+@dataclass(frozen=True)
+class CompiledStructure:
+    """Estrutura de comissão pronta para cálculo (faixas ordenadas pelo mínimo)"""
+    id: int
+    name: str
+    weekly_base: Decimal
+    tier_mins: Tuple[Decimal, ...]
+    tier_maxs: Tuple[Decimal, ...]
+    tier_rates: Tuple[Decimal, ...]
+    bonus_thresholds: Tuple[Decimal, ...]
+    bonus_amounts: Tuple[Decimal, ...]
+    recurring_rate: Decimal
+    new_client_bonus: Decimal
+    new_client_threshold: int
+
+    def tier_rate(self, deal_value: Decimal) -> Decimal:
+        index = bisect_right(self.tier_mins, deal_value) - 1
+        if index >= 0 and deal_value <= self.tier_maxs[index]:
+            return self.tier_rates[index]
+        return ZERO
+
+    def performance_bonus(self, deal_value: Decimal) -> Decimal:
+        index = bisect_right(self.bonus_thresholds, deal_value) - 1
+        return self.bonus_amounts[index] if index >= 0 else ZERO
+
+    def calculate(self, deal_value: Any) -> Dict[str, Decimal]:
+        """Cálculo avulso de um deal (inclui a base semanal)"""
+        deal = _decimal(deal_value)
+        rate = self.tier_rate(deal)
+        commission_amount = deal * rate
+        performance_bonus = self.performance_bonus(deal)
+        return {
+            "weekly_base": self.weekly_base,
+            "commission_rate": rate,
+            "commission_amount": commission_amount,
+            "performance_bonus": performance_bonus,
+            "total_amount": self.weekly_base + commission_amount + performance_bonus
+        }
+
+
+def compile_structure(structure: CommissionStructure) -> CompiledStructure:
+    tiers = sorted(
+        (
+            (_decimal(tier["min"]), _decimal(tier.get("max"), INFINITY), _decimal(tier["rate"]))
+            for tier in structure.tiered_commissions or []
+        ),
+        key=lambda tier: tier[0]
+    )
+    bonuses = sorted(
+        (_decimal(bonus["threshold"]), _decimal(bonus["bonus"]))
+        for bonus in structure.performance_bonuses or []
+    )
+    return CompiledStructure(
+        id=structure.id,
+        name=structure.name,
+        weekly_base=_decimal(structure.weekly_base),
+        tier_mins=tuple(tier[0] for tier in tiers),
+        tier_maxs=tuple(tier[1] for tier in tiers),
+        tier_rates=tuple(tier[2] for tier in tiers),
+        bonus_thresholds=tuple(bonus[0] for bonus in bonuses),
+        bonus_amounts=tuple(bonus[1] for bonus in bonuses),
+        recurring_rate=_decimal(structure.recurring_commission_rate),
+        new_client_bonus=_decimal(structure.new_client_bonus),
+        new_client_threshold=structure.new_client_threshold or 0
+    )
+
+
+async def get_structure(db: AsyncSession, structure_id: Optional[int] = None) -> Optional[CommissionStructure]:
+    """Estrutura informada ou, sem id, a primeira estrutura ativa"""
+    query = select(CommissionStructure)
+    if structure_id:
+        query = query.where(CommissionStructure.id == structure_id)
+    else:
+        query = query.where(CommissionStructure.is_active == True).order_by(CommissionStructure.id).limit(1)
+    result = await db.execute(query)
+    return result.scalar_one_or_none()
+
+
+def period_bounds(payment_period: str) -> Tuple[datetime, datetime]:
+    """'2025-01' -> (2025-01-01 00:00, 2025-02-01 00:00)"""
+    try:
+        start = datetime.strptime(payment_period, "%Y-%m")
+    except ValueError:
+        raise ValueError("payment_period deve estar no formato AAAA-MM")
+    end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start, datetime(end.year, end.month, end.day)
+
+
+class SellerCommissionSummary(BaseModel):
+    seller_id: int
+    deals: int = 0
+    new_clients: int = 0
+    deal_value: Decimal = ZERO
+    total_amount: Decimal = ZERO
+
+
+class CommissionBatchReport(BaseModel):
+    payment_period: str
+    structure_id: int
+    dry_run: bool
+    opportunities: int = 0
+    created: int = 0
+    total_amount: Decimal = ZERO
+    sellers: List[SellerCommissionSummary] = []
+
+
+@dataclass
+class _SellerState:
+    summary: SellerCommissionSummary
+    new_clients: int = 0
+    seen_contacts: set = field(default_factory=set)
+
+
+async def run_commission_batch(
+    db: AsyncSession,
+    payment_period: str,
+    structure: CommissionStructure,
+    dry_run: bool = False
+) -> CommissionBatchReport:
+    """Calcula e grava (a menos de dry_run) as comissões do período; faz o commit"""
+    start, end = period_bounds(payment_period)
+    compiled = compile_structure(structure)
+    closed_at = opportunity_closed_at()
+
+    # Um fechamento por período de cada vez: a checagem de "já tem comissão" depende disso
+    await db.execute(
+        text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+        {"key": f"commission_batch:{payment_period}"}
+    )
+
+    # Contatos que já tinham deal ganho antes do período são clientes recorrentes
+    previous = aliased(Opportunity)
+    returning = (
+        select(previous.id)
+        .where(
+            previous.contact_id == Opportunity.contact_id,
+            previous.stage == WON_STAGE,
+            opportunity_closed_at(previous) < start
+        )
+        .exists()
+    )
+    already_paid = (
+        select(Commission.id)
+        .where(Commission.opportunity_id == Opportunity.id, Commission.status != "cancelled")
+        .exists()
+    )
+    result = await db.execute(
+        select(
+            Opportunity.id,
+            Opportunity.owner_id,
+            Opportunity.contact_id,
+            Opportunity.value,
+            returning.label("returning_client")
+        )
+        .where(
+            Opportunity.stage == WON_STAGE,
+            closed_at >= start,
+            closed_at < end,
+            ~already_paid
+        )
+        .order_by(Opportunity.owner_id, closed_at, Opportunity.id)
+    )
+
+    report = CommissionBatchReport(payment_period=payment_period, structure_id=compiled.id, dry_run=dry_run)
+    sellers: Dict[int, _SellerState] = {}
+
+    # Clientes já comissionados no período contam para o bônus de clientes novos
+    paid = await db.execute(
+        select(Commission.seller_id, Opportunity.contact_id, returning.label("returning_client"))
+        .join(Opportunity, Opportunity.id == Commission.opportunity_id)
+        .where(Commission.payment_period == payment_period, Commission.status != "cancelled")
+        .distinct()
+    )
+    for seller_id, contact_id, returning_client in paid.all():
+        state = sellers.get(seller_id)
+        if state is None:
+            state = sellers[seller_id] = _SellerState(SellerCommissionSummary(seller_id=seller_id))
+        if not returning_client and contact_id not in state.seen_contacts:
+            state.new_clients += 1
+        state.seen_contacts.add(contact_id)
+
+    rows = []
+    now = datetime.utcnow()
+    for opportunity_id, seller_id, contact_id, value, returning_client in result.all():
+        state = sellers.get(seller_id)
+        if state is None:
+            state = sellers[seller_id] = _SellerState(SellerCommissionSummary(seller_id=seller_id))
+        deal = _decimal(value)
+        new_client = not returning_client and contact_id not in state.seen_contacts
+        state.seen_contacts.add(contact_id)
+
+        rate = compiled.tier_rate(deal) if new_client or not compiled.recurring_rate else compiled.recurring_rate
+        commission_amount = (deal * rate).quantize(CENT)
+        performance_bonus = compiled.performance_bonus(deal)
+        new_client_bonus = ZERO
+        if new_client:
+            state.new_clients += 1
+            threshold = compiled.new_client_threshold
+            if threshold and state.new_clients % threshold == 0:
+                new_client_bonus = compiled.new_client_bonus
+        total = commission_amount + performance_bonus + new_client_bonus
+
+        rows.append({
+            "seller_id": seller_id,
+            "structure_id": compiled.id,
+            "opportunity_id": opportunity_id,
+            "deal_value": deal,
+            "commission_rate": rate,
+            "commission_amount": commission_amount,
+            "weekly_base": ZERO,
+            "performance_bonus": performance_bonus,
+            "new_client_bonus": new_client_bonus,
+            "total_amount": total,
+            "status": "pending",
+            "payment_period": payment_period,
+            "notes": f"Fechamento {payment_period}" + (" (cliente recorrente)" if not new_client else ""),
+            "created_at": now,
+            "updated_at": now
+        })
+        summary = state.summary
+        summary.deals += 1
+        summary.deal_value += deal
+        summary.total_amount += total
+        summary.new_clients = state.new_clients
+        report.total_amount += total
+
+    report.opportunities = len(rows)
+    report.sellers = [state.summary for state in sellers.values() if state.summary.deals]
+    if dry_run or not rows:
+        await db.rollback()
+        return report
+
+    await db.execute(insert(Commission), rows)
+    await db.commit()
+    report.created = len(rows)
+    # INSERT direto não passa pelos eventos de flush da sessão
+    await invalidate_cache("commissions")
+    return report
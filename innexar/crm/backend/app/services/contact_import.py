@@ -0,0 +1,221 @@
+"""
+Importação de contatos em massa (CSV ou NDJSON)
+
+As linhas são validadas em Python e carregadas com COPY (asyncpg
+copy_records_to_table) em uma tabela temporária. A deduplicação por email
+(sem diferenciar maiúsculas) é feita no banco em um único INSERT ... SELECT
+contra a tabela de contatos; os ids são reservados na própria tabela
+temporária, o que permite montar o relatório por linha sem uma consulta por
+contato. contacts.email não tem índice único (a base pode ter duplicados
+antigos), por isso a deduplicação usa NOT EXISTS em vez de ON CONFLICT, e
+importações simultâneas são serializadas com um advisory lock.
+"""
+import csv
+import io
+import json
+import re
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+from pydantic import BaseModel
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import invalidate_cache
+from app.core.config import settings
+from app.services.jobs import enqueue_lead_analyses
+
+# Campos aceitos no arquivo (cabeçalho do CSV ou chaves do NDJSON)
+IMPORT_FIELDS = (
+    "name", "email", "phone", "company", "status", "notes", "project_type",
+    "budget_range", "timeline", "website", "linkedin", "position", "industry",
+    "company_size", "source",
+)
+STAGING_TABLE = "contact_import_staging"
+STAGING_COLUMNS = ("row_number", "email_key") + IMPORT_FIELDS
+
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+class ContactImportRowResult(BaseModel):
+    row: int
+    status: str  # created, duplicate, duplicate_in_file, invalid
+    contact_id: Optional[int] = None
+    email: Optional[str] = None
+    error: Optional[str] = None
+
+
+class ContactImportReport(BaseModel):
+    total: int = 0
+    created: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    analyses_enqueued: int = 0
+    rows: List[ContactImportRowResult] = []
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    name = (filename or "").lower()
+    content_type = (content_type or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type or "jsonl" in content_type:
+        return "ndjson"
+    return "csv"
+
+
+def _iter_records(fileobj: BinaryIO, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """Gera (número da linha de dados, dict ou mensagem de erro)"""
+    stream = io.TextIOWrapper(fileobj, encoding="utf-8-sig", errors="replace", newline="")
+    if fmt == "ndjson":
+        row_number = 0
+        for line in stream:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield row_number, f"JSON inválido: {e.msg}"
+                continue
+            yield row_number, record if isinstance(record, dict) else "A linha deve ser um objeto JSON"
+        return
+
+    reader = csv.DictReader(stream)
+    if reader.fieldnames:
+        reader.fieldnames = [(field or "").strip().lower() for field in reader.fieldnames]
+    for row_number, record in enumerate(reader, start=1):
+        yield row_number, record
+
+
+def _clean(record: Dict[str, Any]) -> Tuple[Optional[Dict[str, Optional[str]]], Optional[str]]:
+    """Normaliza e valida uma linha; retorna (valores, erro)"""
+    values = {}
+    for field in IMPORT_FIELDS:
+        value = record.get(field)
+        value = str(value).strip() if value is not None else ""
+        values[field] = value or None
+    if not values["name"]:
+        return None, "Nome é obrigatório"
+    if values["email"] and not _EMAIL.match(values["email"]):
+        return None, "Email inválido"
+    values["status"] = (values["status"] or "lead").lower()
+    return values, None
+
+
+async def _copy_to_staging(db: AsyncSession, records: List[tuple]):
+    connection = await db.connection()
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        STAGING_TABLE, records=records, columns=list(STAGING_COLUMNS)
+    )
+
+
+async def import_contacts(
+    db: AsyncSession,
+    fileobj: BinaryIO,
+    fmt: str,
+    owner_id: int,
+    analyze_leads: bool = True
+) -> ContactImportReport:
+    """Importa contatos do arquivo e faz o commit; retorna o relatório por linha"""
+    report = ContactImportReport()
+    results: Dict[int, ContactImportRowResult] = {}
+    seen_emails: Dict[str, int] = {}
+    batch_size = settings.CONTACT_IMPORT_BATCH_SIZE
+
+    # Um import por vez: a deduplicação depende de ver os contatos já gravados
+    await db.execute(text("SELECT pg_advisory_xact_lock(hashtext('contact_import'))"))
+    await db.execute(text(
+        f"CREATE TEMP TABLE {STAGING_TABLE} ("
+        " row_number integer PRIMARY KEY,"
+        " contact_id integer NOT NULL DEFAULT nextval(pg_get_serial_sequence('contacts', 'id')::regclass),"
+        " email_key text,"
+        + ",".join(f" {field} text" for field in IMPORT_FIELDS)
+        + ") ON COMMIT DROP"
+    ))
+
+    batch: List[tuple] = []
+    for row_number, record in _iter_records(fileobj, fmt):
+        report.total += 1
+        if report.total > settings.CONTACT_IMPORT_MAX_ROWS:
+            await db.rollback()
+            raise ValueError(f"Limite de {settings.CONTACT_IMPORT_MAX_ROWS} linhas por importação excedido")
+
+        values, error = _clean(record) if isinstance(record, dict) else (None, record)
+        if error:
+            results[row_number] = ContactImportRowResult(row=row_number, status="invalid", error=error)
+            continue
+
+        email_key = values["email"].lower() if values["email"] else None
+        if email_key:
+            first_row = seen_emails.setdefault(email_key, row_number)
+            if first_row != row_number:
+                results[row_number] = ContactImportRowResult(
+                    row=row_number,
+                    status="duplicate_in_file",
+                    email=values["email"],
+                    error=f"Email repetido no arquivo (linha {first_row})"
+                )
+                continue
+
+        batch.append((row_number, email_key) + tuple(values[field] for field in IMPORT_FIELDS))
+        if len(batch) >= batch_size:
+            await _copy_to_staging(db, batch)
+            batch = []
+    if batch:
+        await _copy_to_staging(db, batch)
+
+    # Insere apenas emails que ainda não existem; o SELECT externo enxerga o
+    # estado anterior ao INSERT e identifica o contato existente de cada duplicado
+    now = datetime.utcnow()
+    columns = ", ".join(IMPORT_FIELDS)
+    staged = ", ".join(f"s.{field}" for field in IMPORT_FIELDS)
+    result = await db.execute(
+        text(f"""
+            WITH inserted AS (
+                INSERT INTO contacts (id, {columns}, owner_id, created_at, updated_at)
+                SELECT s.contact_id, {staged}, :owner_id, :now, :now
+                FROM {STAGING_TABLE} s
+                WHERE s.email_key IS NULL
+                   OR NOT EXISTS (SELECT 1 FROM contacts c WHERE lower(c.email) = s.email_key)
+                ORDER BY s.row_number
+                RETURNING id, status
+            )
+            SELECT s.row_number, s.email, i.id AS created_id, i.status,
+                   (SELECT min(c.id) FROM contacts c WHERE lower(c.email) = s.email_key) AS existing_id
+            FROM {STAGING_TABLE} s
+            LEFT JOIN inserted i ON i.id = s.contact_id
+        """),
+        {"owner_id": owner_id, "now": now}
+    )
+
+    lead_ids = []
+    for row in result.mappings():
+        if row["created_id"] is not None:
+            results[row["row_number"]] = ContactImportRowResult(
+                row=row["row_number"], status="created", contact_id=row["created_id"], email=row["email"]
+            )
+            if row["status"] == "lead":
+                lead_ids.append(row["created_id"])
+        else:
+            results[row["row_number"]] = ContactImportRowResult(
+                row=row["row_number"],
+                status="duplicate",
+                contact_id=row["existing_id"],
+                email=row["email"],
+                error="Contato com este email já existe"
+            )
+
+    if analyze_leads and lead_ids:
+        report.analyses_enqueued = await enqueue_lead_analyses(db, lead_ids, batch_size)
+
+    await db.commit()
+    # INSERT direto não passa pelos eventos de flush da sessão
+    await invalidate_cache("dashboard")
+
+    report.rows = [results[row_number] for row_number in sorted(results)]
+    for row in report.rows:
+        if row.status == "created":
+            report.created += 1
+        elif row.status == "invalid":
+            report.invalid += 1
+        else:
+            report.duplicates += 1
+    return report
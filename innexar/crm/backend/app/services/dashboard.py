@@ -0,0 +1,175 @@
+"""
+Engine de agregação dos dashboards
+
+Monta uma única consulta que devolve totais, contagem por estágio,
+atividades pendentes, atividades recentes e top oportunidades, em vez de
+disparar uma consulta por métrica. Por padrão os totais vêm das tabelas de
+rollup (O(donos x estágios) linhas); use_rollups=False agrega direto das
+tabelas de origem.
+"""
+from sqlalchemy import select, func, true, literal_column
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.types import JSON
+from typing import Optional, List, Dict, Any
+from decimal import Decimal
+from app.models.contact import Contact
+from app.models.opportunity import Opportunity
+from app.models.activity import Activity
+from app.models.pipeline_rollup import PipelineRollup, ActivityRollup
+
+OPPORTUNITY_STAGES = ["qualificacao", "proposta", "negociacao", "fechado", "perdido"]
+
+
+def _owner_filter(column, owner_id: Optional[int]):
+    """Filtro por dono (None = todos os registros)"""
+    return column == owner_id if owner_id is not None else true()
+
+
+def _json_rows(query, *order_by):
+    """Agrega as linhas de uma consulta em um array JSON preservando a ordem"""
+    rows = query.subquery()
+    ordering = [getattr(rows.c, name).desc().nulls_last() for name in order_by]
+    aggregated = func.json_agg(aggregate_order_by(rows.table_valued(), *ordering))
+    return (
+        select(func.coalesce(aggregated, literal_column("'[]'::json"), type_=JSON))
+        .scalar_subquery()
+    )
+
+
+class DashboardQueryBuilder:
+    """Construtor da consulta agregada de dashboard (uma ida ao banco)"""
+
+    def __init__(
+        self,
+        owner_id: Optional[int] = None,
+        include_owner: bool = False,
+        stages: Optional[List[str]] = None,
+        recent_activities_limit: int = 10,
+        top_opportunities_limit: int = 5,
+        use_rollups: bool = True
+    ):
+        self.owner_id = owner_id
+        self.include_owner = include_owner
+        self.stages = stages or OPPORTUNITY_STAGES
+        self.recent_activities_limit = recent_activities_limit
+        self.top_opportunities_limit = top_opportunities_limit
+        self.use_rollups = use_rollups
+
+    def _opportunity_stats(self):
+        if self.use_rollups:
+            return self._rollup_opportunity_stats()
+        stage_counts = [
+            func.count(Opportunity.id).filter(Opportunity.stage == stage).label(f"stage_{stage}")
+            for stage in self.stages
+        ]
+        value = func.coalesce(Opportunity.value, 0)
+        return select(
+            func.count(Opportunity.id).label("total_opportunities"),
+            func.coalesce(func.sum(value), 0).label("total_value"),
+            func.coalesce(
+                func.sum(func.round(value * func.coalesce(Opportunity.probability, 0) / 100, 2)), 0
+            ).label("weighted_value"),
+            *stage_counts
+        ).where(_owner_filter(Opportunity.owner_id, self.owner_id)).subquery("opportunity_stats")
+
+    def _rollup_opportunity_stats(self):
+        stage_counts = [
+            func.coalesce(
+                func.sum(PipelineRollup.opportunity_count).filter(PipelineRollup.stage == stage), 0
+            ).label(f"stage_{stage}")
+            for stage in self.stages
+        ]
+        return select(
+            func.coalesce(func.sum(PipelineRollup.opportunity_count), 0).label("total_opportunities"),
+            func.coalesce(func.sum(PipelineRollup.total_value), 0).label("total_value"),
+            func.coalesce(func.sum(PipelineRollup.weighted_value), 0).label("weighted_value"),
+            *stage_counts
+        ).where(_owner_filter(PipelineRollup.owner_id, self.owner_id)).subquery("opportunity_stats")
+
+    def _pending_activities(self):
+        if self.use_rollups:
+            return (
+                select(func.coalesce(func.sum(ActivityRollup.activity_count), 0))
+                .where(
+                    _owner_filter(ActivityRollup.owner_id, self.owner_id),
+                    ActivityRollup.status == "pending"
+                )
+                .scalar_subquery()
+            )
+        return (
+            select(func.count(Activity.id))
+            .where(
+                _owner_filter(Activity.owner_id, self.owner_id),
+                Activity.status == "pending"
+            )
+            .scalar_subquery()
+        )
+
+    def _recent_activities(self):
+        columns = [Activity.id, Activity.type, Activity.subject, Activity.status]
+        if self.include_owner:
+            columns.append(Activity.owner_id)
+        columns += [Activity.due_date, Activity.created_at]
+        query = (
+            select(*columns)
+            .where(_owner_filter(Activity.owner_id, self.owner_id))
+            .order_by(Activity.created_at.desc())
+            .limit(self.recent_activities_limit)
+        )
+        return _json_rows(query, "created_at")
+
+    def _top_opportunities(self):
+        columns = [
+            Opportunity.id,
+            Opportunity.name,
+            func.coalesce(Opportunity.value, 0).label("value"),
+            Opportunity.stage,
+            Opportunity.probability
+        ]
+        if self.include_owner:
+            columns.append(Opportunity.owner_id)
+        query = (
+            select(*columns)
+            .where(_owner_filter(Opportunity.owner_id, self.owner_id))
+            .order_by(Opportunity.value.desc().nulls_last())
+            .limit(self.top_opportunities_limit)
+        )
+        return _json_rows(query, "value")
+
+    def build(self):
+        """Retorna o SELECT único com todas as métricas do dashboard"""
+        opportunity_stats = self._opportunity_stats()
+        contacts_count = (
+            select(func.count(Contact.id))
+            .where(_owner_filter(Contact.owner_id, self.owner_id))
+            .scalar_subquery()
+        )
+        return select(
+            opportunity_stats,
+            contacts_count.label("total_contacts"),
+            self._pending_activities().label("pending_activities"),
+            self._recent_activities().label("recent_activities"),
+            self._top_opportunities().label("top_opportunities")
+        )
+
+    async def fetch(self, db: AsyncSession) -> Dict[str, Any]:
+        """Executa a consulta e devolve os dados no formato do DashboardResponse"""
+        row = (await db.execute(self.build())).mappings().one()
+        return {
+            "stats": {
+                "total_contacts": row["total_contacts"] or 0,
+                "total_opportunities": row["total_opportunities"] or 0,
+                "total_value": Decimal(row["total_value"] or 0),
+                "weighted_value": Decimal(row["weighted_value"] or 0),
+                "pending_activities": row["pending_activities"] or 0,
+                "opportunities_by_stage": {
+                    stage: row[f"stage_{stage}"] or 0 for stage in self.stages
+                }
+            },
+            "recent_activities": row["recent_activities"] or [],
+            "top_opportunities": [
+                {**o, "value": float(o["value"]) if o["value"] else 0}
+                for o in (row["top_opportunities"] or [])
+            ]
+        }
@@ -0,0 +1,111 @@
+"""
+Exportação em streaming (CSV ou NDJSON, opcionalmente gzip)
+
+A consulta roda em um cursor do servidor (yield_per) em uma sessão própria
+e cada lote é serializado e enviado ao cliente assim que chega: a memória
+fica constante independente do número de linhas exportadas.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any, AsyncIterator, List, Sequence
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from app.core.config import settings
+from app.core.read_replica import read_sessionmaker
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+FLUSH_BYTES = 64 * 1024
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _csv_encoder(columns: Sequence[str]):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def encode(rows: List[Sequence[Any]], header: bool = False) -> str:
+        if header:
+            writer.writerow(columns)
+        writer.writerows([_plain(value) for value in row] for row in rows)
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+    return encode
+
+
+def _ndjson_encoder(columns: Sequence[str]):
+    def encode(rows: List[Sequence[Any]], header: bool = False) -> str:
+        return "".join(
+            json.dumps({column: _plain(value) for column, value in zip(columns, row)}, ensure_ascii=False) + "\n"
+            for row in rows
+        )
+    return encode
+
+
+async def _stream_rows(query: Select, columns: Sequence[str], fmt: str, compress: bool) -> AsyncIterator[bytes]:
+    encode = _csv_encoder(columns) if fmt == "csv" else _ndjson_encoder(columns)
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31: formato gzip
+    pending: List[bytes] = []
+    pending_size = 0
+
+    def output(data: bytes) -> bytes:
+        return compressor.compress(data) if compressor else data
+
+    header = encode([], header=True).encode()
+    if header:
+        pending.append(output(header))
+
+    # Sessão própria (na réplica, se disponível): o stream continua depois que o endpoint retorna
+    session_factory = await read_sessionmaker()
+    async with session_factory() as db:
+        result = await db.stream(query.execution_options(yield_per=settings.EXPORT_YIELD_PER))
+        async for rows in result.partitions():
+            chunk = output(encode(rows).encode())
+            pending.append(chunk)
+            pending_size += len(chunk)
+            if pending_size >= FLUSH_BYTES:
+                yield b"".join(pending)
+                pending, pending_size = [], 0
+
+    if compressor:
+        pending.append(compressor.flush())
+    if pending:
+        yield b"".join(pending)
+
+
+def export_response(query: Select, columns: Sequence[str], fmt: str, compress: bool, name: str) -> StreamingResponse:
+    """StreamingResponse com o resultado de query (uma coluna por item de columns)"""
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Formato deve ser 'csv' ou 'ndjson'")
+    media_type, extension = EXPORT_FORMATS[fmt]
+    filename = f"{name}-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{extension}"
+    if compress:
+        media_type, filename = "application/gzip", f"{filename}.gz"
+    return StreamingResponse(
+        _stream_rows(query, columns, fmt, compress),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+def model_columns(model: type, exclude: Sequence[str] = ()) -> List[Any]:
+    """Colunas da tabela do modelo, na ordem de declaração"""
+    return [column for column in model.__table__.columns if column.key not in exclude]
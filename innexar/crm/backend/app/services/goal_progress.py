@@ -0,0 +1,199 @@
+"""
+Progresso automático das metas a partir dos dados do CRM
+
+O valor atual de cada meta ativa é derivado da categoria, no período
+[start_date, end_date] e do responsável (metas sem assignee_id contam a
+equipe toda):
+
+- revenue: soma do valor das oportunidades ganhas (stage "fechado")
+- deals: número de oportunidades ganhas
+- conversion_rate: ganhas / (ganhas + perdidas), em %
+- activities: atividades concluídas
+- new_clients: contatos distintos com projeto (não cancelado) criado no período
+- custom: continua manual (POST /goals/{id}/progress)
+
+A data de fechamento de uma oportunidade é expected_close_date (ou
+updated_at, se vazia); a de uma atividade é due_date (ou updated_at).
+
+recompute_goal_progress atualiza todas as metas de uma vez com um UPDATE
+por categoria (subconsulta correlacionada) e um UPDATE final de
+progresso/status. Mudanças em oportunidades, atividades e projetos agendam
+um job "goal_progress" só para o dono alterado (com debounce); um job
+agendado reavalia todas as metas a cada GOAL_PROGRESS_INTERVAL segundos.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Set
+from sqlalchemy import DateTime, and_, case, cast, distinct, event, func, inspect, literal, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.cache import invalidate_cache
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.activity import Activity
+from app.models.goal import Goal, GoalCategory, GoalStatus
+from app.models.opportunity import Opportunity
+from app.models.project import Project, ProjectStatus
+from app.services.jobs import enqueue_job, job_handler
+
+WON_STAGE = "fechado"
+LOST_STAGE = "perdido"
+SCHEDULED_DEDUPE_KEY = "goal_progress:all"
+
+# Alterações nestes modelos afetam o progresso das metas do dono
+TRACKED_MODELS = (Opportunity, Activity, Project)
+
+_pending_tasks: Set[asyncio.Task] = set()
+
+
+def opportunity_closed_at(model=Opportunity):
+    """Data de fechamento da oportunidade: expected_close_date ou, se vazia, updated_at"""
+    return func.coalesce(cast(model.expected_close_date, DateTime), model.updated_at)
+
+
+def _in_period(column):
+    return and_(column >= Goal.start_date, column <= Goal.end_date)
+
+
+def _scoped(owner_column):
+    return or_(Goal.assignee_id.is_(None), owner_column == Goal.assignee_id)
+
+
+def _category_values() -> Dict[GoalCategory, Any]:
+    """Subconsulta (correlacionada com goals) do valor atual de cada categoria"""
+    closed_at = opportunity_closed_at()
+    won = and_(Opportunity.stage == WON_STAGE, _in_period(closed_at), _scoped(Opportunity.owner_id))
+    closed = and_(
+        Opportunity.stage.in_([WON_STAGE, LOST_STAGE]),
+        _in_period(closed_at),
+        _scoped(Opportunity.owner_id)
+    )
+    won_count = func.count(Opportunity.id).filter(Opportunity.stage == WON_STAGE)
+    done_at = func.coalesce(cast(Activity.due_date, DateTime), Activity.updated_at)
+
+    queries = {
+        GoalCategory.REVENUE: select(func.coalesce(func.sum(Opportunity.value), 0)).where(won),
+        GoalCategory.DEALS: select(func.count(Opportunity.id)).where(won),
+        GoalCategory.CONVERSION_RATE: select(
+            func.coalesce(100.0 * won_count / func.nullif(func.count(Opportunity.id), 0), 0)
+        ).where(closed),
+        GoalCategory.ACTIVITIES: select(func.count(Activity.id)).where(
+            Activity.status == "completed", _in_period(done_at), _scoped(Activity.owner_id)
+        ),
+        GoalCategory.NEW_CLIENTS: select(func.count(distinct(Project.contact_id))).where(
+            Project.status != ProjectStatus.CANCELADO, _in_period(Project.created_at), _scoped(Project.owner_id)
+        ),
+    }
+    return {category: query.correlate(Goal).scalar_subquery() for category, query in queries.items()}
+
+
+async def recompute_goal_progress(db: AsyncSession, owner_ids: Optional[Iterable[int]] = None) -> int:
+    """Recalcula metas ativas (todas ou só as dos donos informados + as de equipe) e faz o commit
+
+    Retorna o número de metas atualizadas.
+    """
+    scope = [Goal.status == GoalStatus.ACTIVE]
+    if owner_ids is not None:
+        owner_ids = sorted(set(owner_ids))
+        if not owner_ids:
+            return 0
+        scope.append(or_(Goal.assignee_id.is_(None), Goal.assignee_id.in_(owner_ids)))
+
+    now = datetime.utcnow()
+    for category, value in _category_values().items():
+        await db.execute(
+            update(Goal)
+            .where(Goal.category == category, *scope)
+            .values(current_value=value)
+            .execution_options(synchronize_session=False)
+        )
+
+    progress = func.least(100.0, func.coalesce(Goal.current_value * 100.0 / func.nullif(Goal.target_value, 0), 0))
+    reached = Goal.current_value >= Goal.target_value
+    result = await db.execute(
+        update(Goal)
+        .where(Goal.category != GoalCategory.CUSTOM, *scope)
+        .values(
+            progress_percentage=progress,
+            status=case((reached, literal(GoalStatus.COMPLETED, Goal.status.type)), else_=Goal.status),
+            completed_at=case((reached, func.coalesce(Goal.completed_at, now)), else_=Goal.completed_at),
+            updated_at=now
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    # UPDATE direto não passa pelos eventos de flush da sessão
+    await invalidate_cache("goals")
+    return result.rowcount
+
+
+async def enqueue_goal_progress(owner_ids: Iterable[int]):
+    """Agenda o recálculo das metas dos donos informados (um job pendente por dono)"""
+    run_at = datetime.utcnow() + timedelta(seconds=settings.GOAL_PROGRESS_DEBOUNCE)
+    try:
+        async with AsyncSessionLocal() as db:
+            for owner_id in sorted(set(owner_ids)):
+                # Um job já em execução pode não ver esta alteração: só reaproveita pendentes
+                await enqueue_job(
+                    db, "goal_progress", {"owner_ids": [owner_id]},
+                    dedupe_key=f"goal_progress:{owner_id}", run_at=run_at, dedupe_running=False
+                )
+            await db.commit()
+    except Exception as e:
+        print(f"⚠️ Erro ao agendar recálculo de metas: {e}")
+
+
+async def ensure_goal_progress_schedule(db: AsyncSession):
+    """Garante que o job periódico de recálculo exista (chamado no startup do worker)"""
+    if settings.GOAL_PROGRESS_INTERVAL <= 0:
+        return
+    await enqueue_job(db, "goal_progress", {"scheduled": True}, dedupe_key=SCHEDULED_DEDUPE_KEY)
+    await db.commit()
+
+
+@job_handler("goal_progress")
+async def run_goal_progress_job(payload: Dict[str, Any]):
+    async with AsyncSessionLocal() as db:
+        if payload.get("scheduled") and settings.GOAL_PROGRESS_INTERVAL > 0:
+            # Agenda o próximo antes: uma falha aqui não interrompe a recorrência
+            await enqueue_job(
+                db, "goal_progress", {"scheduled": True},
+                dedupe_key=SCHEDULED_DEDUPE_KEY,
+                run_at=datetime.utcnow() + timedelta(seconds=settings.GOAL_PROGRESS_INTERVAL),
+                dedupe_running=False
+            )
+            await db.commit()
+        await recompute_goal_progress(db, payload.get("owner_ids"))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_goal_owners(session, flush_context):
+    if not settings.GOAL_PROGRESS_AUTO:
+        return
+    owners = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, TRACKED_MODELS):
+            # Inclui o dono anterior quando o registro muda de responsável
+            history = inspect(obj).attrs.owner_id.history
+            owners.update(owner for owner in (obj.owner_id, *history.deleted) if owner is not None)
+    if owners:
+        session.info.setdefault("goal_progress_owners", set()).update(owners)
+
+
+@event.listens_for(Session, "after_commit")
+def _schedule_after_commit(session):
+    owners = session.info.pop("goal_progress_owners", None)
+    if not owners:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(enqueue_goal_progress(owners))
+    _pending_tasks.add(task)
+    task.add_done_callback(_pending_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_goal_owners(session):
+    session.info.pop("goal_progress_owners", None)
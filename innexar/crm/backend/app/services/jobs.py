@@ -0,0 +1,447 @@
+"""
+Fila durável de jobs em background sobre o Postgres
+
+enqueue_job grava o job na mesma transação da escrita que o originou (o job
+só existe se o commit acontecer). O worker (python -m app.worker) reserva
+jobs com SELECT ... FOR UPDATE SKIP LOCKED, executa o handler registrado
+para o tipo, aplica retry com backoff exponencial e limita a concorrência
+por chave (ex.: provider de IA), para que um pico de leads não sature o
+provider nem o event loop da API.
+
+O limite por chave é aplicado na reserva: o worker só reserva jobs de um
+tipo quando a chave dele tem vaga, então todo job reservado começa a rodar
+na hora (nenhum fica "running" esperando vaga). Durante a execução o lock
+é renovado a cada JOB_LOCK_TIMEOUT / 3; se mesmo assim o job for devolvido
+para a fila, o worker antigo não sobrescreve o resultado de quem o pegou
+(touch e finish exigem locked_by do próprio worker).
+
+Cada dedupe_key tem no máximo um job ativo (pendente ou em execução),
+garantido por um índice único parcial; enqueue_job e enqueue_lead_analyses
+gravam com INSERT ... ON CONFLICT DO NOTHING. Pedir de novo um job que já
+está em execução sem reaproveitá-lo (dedupe_running=False) adianta o run_at
+da própria linha: ao terminar, o worker devolve o job para a fila naquele
+horário em vez de concluí-lo.
+"""
+import asyncio
+import os
+import random
+import socket
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set
+from sqlalchemy import case, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.background_job import BackgroundJob, JobStatus
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+ConcurrencyKey = Callable[[], Awaitable[str]]
+
+# Mesmo WHERE do índice ix_background_jobs_active_dedupe_key (ON CONFLICT precisa dele)
+ACTIVE_DEDUPE_WHERE = text("status IN ('pending', 'running')")
+ENQUEUE_ATTEMPTS = 3
+
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+JOB_CONCURRENCY_KEYS: Dict[str, ConcurrencyKey] = {}
+
+
+def job_handler(job_type: str, concurrency_key: Optional[ConcurrencyKey] = None):
+    """Registra a função que executa jobs do tipo informado
+
+    concurrency_key devolve a chave de concorrência do tipo (ex.: provider de
+    IA ativo); sem ela a chave é o próprio tipo.
+    """
+    def decorator(func: JobHandler) -> JobHandler:
+        JOB_HANDLERS[job_type] = func
+        if concurrency_key:
+            JOB_CONCURRENCY_KEYS[job_type] = concurrency_key
+        return func
+    return decorator
+
+
+async def enqueue_job(
+    db: AsyncSession,
+    job_type: str,
+    payload: Optional[Dict[str, Any]] = None,
+    dedupe_key: Optional[str] = None,
+    max_attempts: Optional[int] = None,
+    run_at: Optional[datetime] = None,
+    dedupe_running: bool = True
+) -> BackgroundJob:
+    """Adiciona um job na sessão (o commit fica a cargo de quem chama)
+
+    Com dedupe_key, o job ativo com a mesma chave é reaproveitado em vez de
+    criar outro. Se ele já está em execução e dedupe_running=False (a
+    execução atual pode não ver a alteração que originou o pedido), o job
+    volta para a fila ao terminar, no run_at pedido; o payload é o dele.
+    """
+    values = {
+        "job_type": job_type,
+        "payload": payload or {},
+        "dedupe_key": dedupe_key,
+        "status": JobStatus.PENDING.value,
+        "max_attempts": max_attempts or settings.JOB_MAX_ATTEMPTS,
+        "run_at": run_at or datetime.utcnow()
+    }
+    if not dedupe_key:
+        job = BackgroundJob(**values)
+        db.add(job)
+        await db.flush()
+        return job
+
+    stmt = (
+        insert(BackgroundJob)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=[BackgroundJob.dedupe_key], index_where=ACTIVE_DEDUPE_WHERE)
+        .returning(BackgroundJob)
+    )
+    for _ in range(ENQUEUE_ATTEMPTS):
+        job = (await db.scalars(stmt)).one_or_none()
+        if job is not None:
+            return job
+        result = await db.execute(
+            select(BackgroundJob)
+            .where(BackgroundJob.dedupe_key == dedupe_key, ACTIVE_DEDUPE_WHERE)
+            .execution_options(populate_existing=True)
+        )
+        existing = result.scalar_one_or_none()
+        if existing is None:
+            continue  # o job ativo terminou entre o INSERT e o SELECT
+        if existing.status == JobStatus.PENDING.value or dedupe_running:
+            return existing
+        rerun = await db.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == existing.id, BackgroundJob.status == JobStatus.RUNNING.value)
+            .values(run_at=func.greatest(values["run_at"], BackgroundJob.run_at + timedelta(microseconds=1)))
+            .execution_options(synchronize_session=False)
+        )
+        if rerun.rowcount:
+            return existing
+    raise RuntimeError(f"Não foi possível agendar o job {dedupe_key}")
+
+
+async def enqueue_lead_analysis(db: AsyncSession, contact_id: int, create_opportunity: bool = False) -> BackgroundJob:
+    """Agenda a análise de IA de um lead (create_opportunity cria o deal ao concluir)"""
+    payload = {"contact_id": contact_id}
+    if create_opportunity:
+        payload["create_opportunity"] = True
+    job = await enqueue_job(
+        db,
+        "lead_analysis",
+        payload,
+        dedupe_key=f"lead_analysis:{contact_id}"
+    )
+    if create_opportunity and job.status == JobStatus.PENDING.value and not (job.payload or {}).get("create_opportunity"):
+        job.payload = {**(job.payload or {}), "create_opportunity": True}
+    return job
+
+
+async def enqueue_lead_analyses(
+    db: AsyncSession,
+    contact_ids: Sequence[int],
+    batch_size: int = 1000,
+    force: bool = False
+) -> int:
+    """Agenda análises de vários leads com um INSERT por lote (importações em massa)
+
+    Leads que já têm análise pendente ou em execução são ignorados (ON
+    CONFLICT no índice de dedupe); force refaz análises já concluídas.
+    Retorna o número de jobs criados.
+    """
+    extra = {"force": True} if force else {}
+    created = 0
+    now = datetime.utcnow()
+    for start in range(0, len(contact_ids), batch_size):
+        keys = {f"lead_analysis:{contact_id}": contact_id for contact_id in contact_ids[start:start + batch_size]}
+        rows = [
+            {
+                "job_type": "lead_analysis",
+                "payload": {"contact_id": contact_id, **extra},
+                "dedupe_key": key,
+                "status": JobStatus.PENDING.value,
+                "max_attempts": settings.JOB_MAX_ATTEMPTS,
+                "run_at": now
+            }
+            for key, contact_id in keys.items()
+        ]
+        if rows:
+            result = await db.execute(
+                insert(BackgroundJob)
+                .values(rows)
+                .on_conflict_do_nothing(index_elements=[BackgroundJob.dedupe_key], index_where=ACTIVE_DEDUPE_WHERE)
+                .returning(BackgroundJob.id)
+            )
+            created += len(result.all())
+    return created
+
+
+def retry_delay(attempts: int) -> float:
+    """Backoff exponencial com jitter (segundos) para a tentativa informada"""
+    delay = min(settings.JOB_RETRY_BASE_DELAY * (2 ** max(attempts - 1, 0)), settings.JOB_RETRY_MAX_DELAY)
+    return delay + random.uniform(0, delay * 0.1)
+
+
+def _parse_concurrency_limits(value: str) -> Dict[str, int]:
+    """'ollama=1,openai=8' -> {'ollama': 1, 'openai': 8}"""
+    limits = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            key, limit = item.split("=", 1)
+            limits[key.strip()] = int(limit)
+    return limits
+
+
+async def job_concurrency_limit(job_type: str) -> int:
+    """Jobs do tipo que um worker roda ao mesmo tempo (limite da chave atual)"""
+    key_func = JOB_CONCURRENCY_KEYS.get(job_type)
+    try:
+        key = await key_func() if key_func else job_type
+    except Exception:
+        key = job_type
+    limits = _parse_concurrency_limits(settings.JOB_CONCURRENCY_LIMITS)
+    return limits.get(key, settings.JOB_CONCURRENCY_DEFAULT)
+
+
+class JobWorker:
+    """Consome a fila de jobs até stop() ser chamado"""
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None
+    ):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = concurrency or settings.JOB_WORKER_CONCURRENCY
+        self.poll_interval = poll_interval or settings.JOB_POLL_INTERVAL
+        self.key_limits = _parse_concurrency_limits(settings.JOB_CONCURRENCY_LIMITS)
+        self._running_by_key: Dict[str, int] = {}
+        self._claim_round = 0
+        self._tasks: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    def _key_room(self, key: str) -> int:
+        limit = self.key_limits.get(key, settings.JOB_CONCURRENCY_DEFAULT)
+        return limit - self._running_by_key.get(key, 0)
+
+    async def _types_by_key(self) -> Dict[str, List[str]]:
+        """Tipos de job registrados agrupados pela chave de concorrência atual"""
+        groups: Dict[str, List[str]] = {}
+        for job_type in JOB_HANDLERS:
+            key_func = JOB_CONCURRENCY_KEYS.get(job_type)
+            try:
+                key = await key_func() if key_func else job_type
+            except Exception:
+                key = job_type
+            groups.setdefault(key, []).append(job_type)
+        return groups
+
+    def _start(self, job: Dict[str, Any], key: Optional[str]):
+        job["concurrency_key"] = key
+        if key is not None:
+            self._running_by_key[key] = self._running_by_key.get(key, 0) + 1
+        task = asyncio.create_task(self._execute(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _claim_and_start(self, free: int) -> int:
+        """Reserva e inicia até free jobs, só dos tipos cuja chave tem vaga"""
+        # Tipos sem handler são reservados para serem marcados como falha
+        started = 0
+        for job in await self._claim_jobs(free, exclude_types=list(JOB_HANDLERS)):
+            self._start(job, None)
+            started += 1
+
+        groups = list((await self._types_by_key()).items())
+        # Rodízio do grupo inicial para um tipo não monopolizar as vagas livres
+        self._claim_round = (self._claim_round + 1) % max(len(groups), 1)
+        for key, job_types in groups[self._claim_round:] + groups[:self._claim_round]:
+            limit = min(free - started, self._key_room(key))
+            if limit <= 0:
+                continue
+            for job in await self._claim_jobs(limit, job_types=job_types):
+                self._start(job, key)
+                started += 1
+        return started
+
+    async def run(self):
+        print(f"✅ Worker {self.worker_id} iniciado (concorrência {self.concurrency})")
+        last_recovery = 0.0
+        loop = asyncio.get_running_loop()
+        while not self._stopping.is_set():
+            try:
+                if loop.time() - last_recovery > settings.JOB_LOCK_TIMEOUT / 2:
+                    await self._recover_stale_jobs()
+                    last_recovery = loop.time()
+
+                free = self.concurrency - len(self._tasks)
+                started = await self._claim_and_start(free) if free > 0 else 0
+            except Exception as e:
+                print(f"⚠️ Erro no loop do worker: {e}")
+                started = 0
+
+            if not started:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        print(f"Worker {self.worker_id} finalizado")
+
+    async def _claim_jobs(
+        self,
+        limit: int,
+        job_types: Optional[List[str]] = None,
+        exclude_types: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        now = datetime.utcnow()
+        candidates = select(BackgroundJob.id).where(
+            BackgroundJob.status == JobStatus.PENDING.value,
+            BackgroundJob.run_at <= now
+        )
+        if job_types is not None:
+            candidates = candidates.where(BackgroundJob.job_type.in_(job_types))
+        if exclude_types:
+            candidates = candidates.where(BackgroundJob.job_type.notin_(exclude_types))
+        candidates = (
+            candidates
+            .order_by(BackgroundJob.run_at, BackgroundJob.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(BackgroundJob)
+            .where(BackgroundJob.id.in_(candidates))
+            .values(
+                status=JobStatus.RUNNING.value,
+                attempts=BackgroundJob.attempts + 1,
+                locked_at=now,
+                locked_by=self.worker_id,
+                updated_at=now
+            )
+            .returning(
+                BackgroundJob.id,
+                BackgroundJob.job_type,
+                BackgroundJob.payload,
+                BackgroundJob.attempts,
+                BackgroundJob.max_attempts,
+                BackgroundJob.run_at
+            )
+            .execution_options(synchronize_session=False)
+        )
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(stmt)).mappings().all()
+            await db.commit()
+        return [dict(row) for row in rows]
+
+    async def _recover_stale_jobs(self):
+        """Devolve para a fila jobs de workers que morreram no meio da execução"""
+        stale_before = datetime.utcnow() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(BackgroundJob)
+                .where(
+                    BackgroundJob.status == JobStatus.RUNNING.value,
+                    BackgroundJob.locked_at < stale_before
+                )
+                .values(status=JobStatus.PENDING.value, locked_at=None, locked_by=None)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            if result.rowcount:
+                print(f"⚠️ {result.rowcount} job(s) travado(s) devolvido(s) para a fila")
+
+    async def _execute(self, job: Dict[str, Any]):
+        job_type = job["job_type"]
+        handler = JOB_HANDLERS.get(job_type)
+        if handler is None:
+            await self._finish(job, error=f"Tipo de job desconhecido: {job_type}", retry=False)
+            return
+
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+        try:
+            await handler(job["payload"] or {})
+        except Exception as e:
+            print(f"Erro no job {job['id']} ({job_type}), tentativa {job['attempts']}: {e}")
+            await self._finish(job, error=str(e) or e.__class__.__name__, retry=True)
+        else:
+            await self._finish(job)
+        finally:
+            heartbeat.cancel()
+            key = job["concurrency_key"]
+            if key is not None:
+                self._running_by_key[key] -= 1
+
+    async def _heartbeat(self, job_id: int):
+        """Renova o lock enquanto o handler roda"""
+        while True:
+            await asyncio.sleep(settings.JOB_LOCK_TIMEOUT / 3)
+            try:
+                if not await self._touch(job_id):
+                    print(f"⚠️ Job {job_id} perdeu o lock (devolvido para a fila por outro worker)")
+                    return
+            except Exception as e:
+                print(f"⚠️ Erro ao renovar o lock do job {job_id}: {e}")
+
+    def _owned(self, job_id: int):
+        return (
+            BackgroundJob.id == job_id,
+            BackgroundJob.status == JobStatus.RUNNING.value,
+            BackgroundJob.locked_by == self.worker_id
+        )
+
+    async def _touch(self, job_id: int) -> bool:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(BackgroundJob)
+                .where(*self._owned(job_id))
+                .values(locked_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        return bool(result.rowcount)
+
+    async def _finish(self, job: Dict[str, Any], error: Optional[str] = None, retry: bool = False):
+        now = datetime.utcnow()
+        if error is None:
+            values = {"status": JobStatus.COMPLETED.value, "completed_at": now, "last_error": None}
+        elif retry and job["attempts"] < job["max_attempts"]:
+            values = {
+                "status": JobStatus.PENDING.value,
+                "run_at": now + timedelta(seconds=retry_delay(job["attempts"])),
+                "last_error": error
+            }
+        else:
+            values = {"status": JobStatus.FAILED.value, "completed_at": now, "last_error": error}
+
+        # run_at adiantado durante a execução (enqueue_job com dedupe_running=False):
+        # o job volta para a fila naquele horário, com as tentativas zeradas
+        rerun = BackgroundJob.run_at > job["run_at"]
+        values = {
+            "status": case((rerun, JobStatus.PENDING.value), else_=values["status"]),
+            "run_at": case((rerun, BackgroundJob.run_at), else_=values.get("run_at", BackgroundJob.run_at)),
+            "attempts": case((rerun, 0), else_=BackgroundJob.attempts),
+            "completed_at": case((rerun, None), else_=values.get("completed_at")),
+            "last_error": values["last_error"],
+            "locked_at": None,
+            "locked_by": None,
+            "updated_at": now
+        }
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(BackgroundJob)
+                .where(*self._owned(job["id"]))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        if not result.rowcount:
+            print(f"⚠️ Job {job['id']} não pertence mais a este worker; resultado descartado")
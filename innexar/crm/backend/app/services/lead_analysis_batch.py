@@ -0,0 +1,207 @@
+"""
+(Re)análise de leads em lote
+
+Um lote é um job "lead_analysis_batch" que percorre os contatos do filtro
+em blocos (ordem de id) e agenda um job "lead_analysis" por contato com um
+INSERT por bloco. A execução das análises continua com o worker, limitada
+por provider de IA (JOB_CONCURRENCY_LIMITS); o lote só controla o ritmo:
+
+- não deixa mais análises pendentes na fila do que o provider consegue
+  escoar: LEAD_ANALYSIS_BATCH_PENDING_PER_SLOT por vaga do provider ativo
+  (ollama=1 -> 50), até LEAD_ANALYSIS_BATCH_MAX_PENDING; o resto da fila
+  não fica parado atrás do lote. Com a fila cheia o job agenda a
+  continuação para daqui a LEAD_ANALYSIS_BATCH_RECHECK segundos;
+- o cursor (último id) e os contadores são gravados no payload do job a
+  cada bloco, na mesma transação dos INSERTs: se o worker cair, o job é
+  retomado do último bloco gravado.
+
+Acompanhamento: GET /api/lead-analysis/batch/{batch_id} ou
+python -m app.scripts.analyze_leads.
+"""
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+from pydantic import BaseModel
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.background_job import BackgroundJob, JobStatus
+from app.models.contact import Contact
+from app.models.lead_analysis import LeadAnalysis
+from app.services.jobs import enqueue_job, enqueue_lead_analyses, job_concurrency_limit, job_handler
+
+ANALYSIS_FILTERS = ("missing", "error", "missing_or_error", "all")
+
+
+class LeadAnalysisBatchFilter(BaseModel):
+    status: Optional[str] = None  # status do contato (lead, client, prospect)
+    source: Optional[str] = None
+    owner_id: Optional[int] = None
+    created_from: Optional[date] = None  # criação a partir deste dia
+    created_to: Optional[date] = None  # até este dia (inclusive)
+    analysis: str = "missing_or_error"  # missing, error, missing_or_error, all (refaz as concluídas)
+
+
+class LeadAnalysisBatchProgress(BaseModel):
+    batch_id: str
+    job_id: int
+    status: str  # status do job atual do lote
+    filters: LeadAnalysisBatchFilter
+    last_contact_id: int = 0
+    scanned: int = 0
+    enqueued: int = 0
+    waiting_for_queue: bool = False
+    last_error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+
+def _batch_key(batch_id: str) -> str:
+    return f"lead_analysis_batch:{batch_id}"
+
+
+def contact_ids_query(filters: LeadAnalysisBatchFilter, after_id: int, limit: int):
+    """Próximo bloco de ids de contatos do filtro, a partir de after_id"""
+    query = (
+        select(Contact.id)
+        .outerjoin(LeadAnalysis, LeadAnalysis.contact_id == Contact.id)
+        .where(Contact.id > after_id)
+        .order_by(Contact.id)
+        .limit(limit)
+    )
+    if filters.status:
+        query = query.where(Contact.status == filters.status)
+    if filters.source:
+        query = query.where(Contact.source == filters.source)
+    if filters.owner_id:
+        query = query.where(Contact.owner_id == filters.owner_id)
+    if filters.created_from:
+        query = query.where(Contact.created_at >= filters.created_from)
+    if filters.created_to:
+        query = query.where(Contact.created_at < filters.created_to + timedelta(days=1))
+
+    missing = LeadAnalysis.id.is_(None)
+    errored = LeadAnalysis.analysis_status == "error"
+    if filters.analysis == "missing":
+        query = query.where(missing)
+    elif filters.analysis == "error":
+        query = query.where(errored)
+    elif filters.analysis == "missing_or_error":
+        query = query.where(or_(missing, errored))
+    return query
+
+
+async def start_lead_analysis_batch(db: AsyncSession, filters: LeadAnalysisBatchFilter) -> BackgroundJob:
+    """Cria o job do lote (o commit fica a cargo de quem chama)"""
+    if filters.analysis not in ANALYSIS_FILTERS:
+        raise ValueError(f"analysis deve ser um de: {', '.join(ANALYSIS_FILTERS)}")
+    batch_id = uuid4().hex[:12]
+    return await enqueue_job(
+        db,
+        "lead_analysis_batch",
+        {
+            "batch_id": batch_id,
+            "filters": filters.model_dump(mode="json"),
+            "last_contact_id": 0,
+            "scanned": 0,
+            "enqueued": 0,
+            "started_at": datetime.utcnow().isoformat()
+        },
+        dedupe_key=_batch_key(batch_id)
+    )
+
+
+async def _max_pending() -> int:
+    """Teto de análises pendentes proporcional às vagas do provider ativo"""
+    slots = await job_concurrency_limit("lead_analysis")
+    return min(settings.LEAD_ANALYSIS_BATCH_MAX_PENDING, max(slots, 1) * settings.LEAD_ANALYSIS_BATCH_PENDING_PER_SLOT)
+
+
+async def _pending_analyses(db: AsyncSession) -> int:
+    result = await db.execute(
+        select(func.count(BackgroundJob.id)).where(
+            BackgroundJob.job_type == "lead_analysis",
+            BackgroundJob.status == JobStatus.PENDING.value
+        )
+    )
+    return result.scalar_one()
+
+
+async def _save_progress(db: AsyncSession, payload: Dict[str, Any]):
+    await db.execute(
+        update(BackgroundJob)
+        .where(
+            BackgroundJob.dedupe_key == _batch_key(payload["batch_id"]),
+            BackgroundJob.status == JobStatus.RUNNING.value
+        )
+        .values(payload=payload, locked_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+@job_handler("lead_analysis_batch")
+async def run_lead_analysis_batch(payload: Dict[str, Any]):
+    filters = LeadAnalysisBatchFilter(**payload["filters"])
+    payload = {**payload, "waiting_for_queue": False}
+    chunk_size = settings.LEAD_ANALYSIS_BATCH_CHUNK
+
+    async with AsyncSessionLocal() as db:
+        while True:
+            room = await _max_pending() - await _pending_analyses(db)
+            if room <= 0:
+                # Fila cheia: continua mais tarde em um novo job com o mesmo cursor
+                payload["waiting_for_queue"] = True
+                await _save_progress(db, payload)
+                await enqueue_job(
+                    db, "lead_analysis_batch", payload,
+                    dedupe_key=_batch_key(payload["batch_id"]),
+                    run_at=datetime.utcnow() + timedelta(seconds=settings.LEAD_ANALYSIS_BATCH_RECHECK),
+                    dedupe_running=False
+                )
+                await db.commit()
+                return
+
+            result = await db.execute(
+                contact_ids_query(filters, payload["last_contact_id"], min(chunk_size, room))
+            )
+            contact_ids: List[int] = list(result.scalars().all())
+            if not contact_ids:
+                payload["completed_at"] = datetime.utcnow().isoformat()
+                await _save_progress(db, payload)
+                await db.commit()
+                print(f"✅ Lote {payload['batch_id']}: {payload['enqueued']} análise(s) agendada(s)")
+                return
+
+            payload["enqueued"] += await enqueue_lead_analyses(db, contact_ids, force=filters.analysis == "all")
+            payload["scanned"] += len(contact_ids)
+            payload["last_contact_id"] = contact_ids[-1]
+            await _save_progress(db, payload)
+            await db.commit()
+
+
+async def get_lead_analysis_batch(db: AsyncSession, batch_id: str) -> Optional[LeadAnalysisBatchProgress]:
+    """Progresso do lote (job mais recente com a chave do lote)"""
+    result = await db.execute(
+        select(BackgroundJob)
+        .where(BackgroundJob.dedupe_key == _batch_key(batch_id))
+        .order_by(BackgroundJob.id.desc())
+        .limit(1)
+    )
+    job = result.scalar_one_or_none()
+    if job is None:
+        return None
+    payload = job.payload or {}
+    return LeadAnalysisBatchProgress(
+        batch_id=batch_id,
+        job_id=job.id,
+        status=job.status,
+        filters=LeadAnalysisBatchFilter(**payload.get("filters", {})),
+        last_contact_id=payload.get("last_contact_id", 0),
+        scanned=payload.get("scanned", 0),
+        enqueued=payload.get("enqueued", 0),
+        waiting_for_queue=payload.get("waiting_for_queue", False),
+        last_error=job.last_error,
+        started_at=payload.get("started_at"),
+        completed_at=payload.get("completed_at")
+    )
@@ -0,0 +1,221 @@
+"""
+Leitura da resposta da análise de leads
+
+Com AI_STRUCTURED_OUTPUT a IA responde no schema de LeadAnalysisOutput
+(JSON validado, ver call_ai_structured) e ParsedLeadAnalysis.from_output
+converte o resultado. Sem ele (ou se a resposta não validar) a IA responde
+em texto com seções "=== TÍTULO ===" (ver o prompt em
+app/api/lead_analysis.py). parse_lead_analysis percorre as linhas uma única
+vez; só as que podem ser título (começam com "=" ou "#", ou terminam em
+":") passam pelo padrão pré-compilado, que reconhece "=== TÍTULO ===",
+"## TÍTULO" e "TÍTULO:" sozinho na linha (usados por alguns modelos), e o
+conteúdo é cortado entre um título e o próximo. Um "=== X ===" desconhecido
+encerra a seção anterior; os outros formatos desconhecidos (subtítulos,
+"Observação:") fazem parte do conteúdo.
+
+Score, valor potencial e probabilidade de fechamento são procurados só na
+seção de potencial de negócio (ou no texto todo, se ela não existir).
+
+Amostras reais, fuzz e benchmark contra o caminho antigo:
+python -m app.scripts.check_lead_analysis_parser.
+"""
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Optional
+from pydantic import BaseModel, Field
+
+SECTION_KEYS = (
+    "company_info",
+    "digital_presence",
+    "market_analysis",
+    "financial_insights",
+    "lead_profile",
+    "business_potential",
+    "recommendations",
+    "risk_assessment",
+    "sources",
+)
+
+# Título de cada seção no formato em texto
+SECTION_HEADINGS = {
+    "company_info": "INFORMAÇÕES DA EMPRESA",
+    "digital_presence": "PRESENÇA DIGITAL",
+    "market_analysis": "ANÁLISE DE MERCADO",
+    "financial_insights": "INSIGHTS FINANCEIROS",
+    "lead_profile": "PERFIL DO LEAD",
+    "business_potential": "POTENCIAL DE NEGÓCIO",
+    "recommendations": "RECOMENDAÇÕES ESTRATÉGICAS",
+    "risk_assessment": "AVALIAÇÃO DE RISCOS",
+    "sources": "FONTES DE PESQUISA",
+}
+
+# Título normalizado (sem acento, minúsculo) -> seção
+SECTION_TITLES = {
+    "informacoes da empresa": "company_info",
+    "empresa": "company_info",
+    "presenca digital": "digital_presence",
+    "digital": "digital_presence",
+    "analise de mercado": "market_analysis",
+    "mercado": "market_analysis",
+    "insights financeiros": "financial_insights",
+    "financeiro": "financial_insights",
+    "perfil do lead": "lead_profile",
+    "perfil": "lead_profile",
+    "potencial de negocio": "business_potential",
+    "potencial": "business_potential",
+    "recomendacoes estrategicas": "recommendations",
+    "recomendacoes": "recommendations",
+    "avaliacao de riscos": "risk_assessment",
+    "riscos": "risk_assessment",
+    "fontes de pesquisa": "sources",
+    "fontes": "sources",
+}
+
+# Linha de título: "=== X ===", "## X" ou "X:" sozinho na linha (opcionalmente em **negrito**)
+HEADER = re.compile(
+    r"^[ \t]*(?:"
+    r"={2,}[ \t]*(?P<fenced>[^=\n]+?)[ \t]*={2,}"
+    r"|\#{1,4}[ \t]+(?P<markdown>[^\n]+?)"
+    r"|\*{0,2}(?P<label>[^\W\d_][^\n:*]{0,40}?)\*{0,2}[ \t]*:\*{0,2}"
+    r")[ \t]*$"
+)
+HEADER_ENDINGS = (":", ":*", ":**")
+CODE_FENCE = re.compile(r"^```[^\n]*\n(.*?)(?:\n```[ \t]*)?$", re.DOTALL)
+
+SCORE = re.compile(r"(?:score de oportunidade|opportunity_score|score|pontua[çc][ãa]o)[\s:*\-]+(\d{1,3})", re.IGNORECASE)
+VALUE = re.compile(
+    r"R\$[ \t]*(\d[\d.,]*)(?:[ \t]*(mil|k|milh[õo]es|milh[ãa]o|mi)\b)?",
+    re.IGNORECASE
+)
+PROBABILITY = re.compile(r"probabilidade[^\d\n]{0,40}(\d{1,3}(?:[.,]\d+)?)[ \t]*%", re.IGNORECASE)
+THOUSANDS = re.compile(r"^\d{1,3}(?:[.,]\d{3})+$")
+NUMBERING = re.compile(r"^\d+[.)]?\s*")
+
+VALUE_MULTIPLIERS = {"mil": 1e3, "k": 1e3, "mi": 1e6, "milhao": 1e6, "milhoes": 1e6}
+
+
+@lru_cache(maxsize=1024)
+def normalize_title(title: str) -> str:
+    """'1. INFORMAÇÕES DA EMPRESA' -> 'informacoes da empresa'"""
+    text = unicodedata.normalize("NFKD", NUMBERING.sub("", title.strip(" *:#=\t")).casefold())
+    return " ".join("".join(c for c in text if not unicodedata.combining(c)).split())
+
+
+def parse_amount(number: str, suffix: Optional[str] = None) -> Optional[float]:
+    """'50.000,00' / '50,000.00' / '1,5' + 'milhão' -> float"""
+    number = number.rstrip(".,")
+    if not number:
+        return None
+    if THOUSANDS.match(number):
+        number = number.replace(".", "").replace(",", "")
+    elif "," in number and "." in number:
+        # O último separador é o decimal
+        if number.rfind(",") > number.rfind("."):
+            number = number.replace(".", "").replace(",", ".")
+        else:
+            number = number.replace(",", "")
+    else:
+        number = number.replace(",", ".")
+    try:
+        value = float(number)
+    except ValueError:
+        return None
+    if suffix:
+        value *= VALUE_MULTIPLIERS.get(normalize_title(suffix), 1)
+    return value
+
+
+def strip_code_fence(text: str) -> str:
+    """Remove um bloco ``` que envolva a resposta inteira"""
+    text = text.strip()
+    match = CODE_FENCE.match(text)
+    return match.group(1).strip() if match else text
+
+
+# Saída estruturada da IA: docstring e descrições dos campos vão no JSON Schema
+class LeadAnalysisOutput(BaseModel):
+    """Análise do lead para o time comercial"""
+    company_info: str = Field(description="Nome, setor, tamanho, localização, faturamento anual estimado e número de funcionários")
+    digital_presence: str = Field("", description="Site, LinkedIn e outras redes sociais encontradas (URLs)")
+    market_analysis: str = Field("", description="Posicionamento, concorrentes, diferenciais e tendências do setor")
+    financial_insights: str = Field("", description="Faturamento, capacidade de investimento e histórico de investimentos em tecnologia")
+    lead_profile: str = Field("", description="Cargo, nível de decisão, urgência e necessidade identificada")
+    business_potential: str = Field("", description="Resumo do potencial de negócio e prazo estimado para fechamento")
+    recommendations: str = Field("", description="Abordagem recomendada, timing e próximos passos")
+    risk_assessment: str = Field("", description="Riscos e fatores que podem impedir o fechamento")
+    sources: str = Field("", description="Fontes utilizadas na pesquisa")
+    opportunity_score: Optional[int] = Field(None, ge=0, le=100, description="Score de oportunidade de 0 a 100")
+    potential_value: Optional[float] = Field(None, ge=0, description="Valor potencial estimado em reais")
+    close_probability: Optional[float] = Field(None, ge=0, le=100, description="Probabilidade de fechamento em %")
+
+
+@dataclass
+class ParsedLeadAnalysis:
+    text: str
+    sections: Dict[str, str] = field(default_factory=lambda: dict.fromkeys(SECTION_KEYS, ""))
+    opportunity_score: Optional[int] = None
+    potential_value: Optional[float] = None
+    close_probability: Optional[float] = None
+
+    @classmethod
+    def from_output(cls, output: LeadAnalysisOutput) -> "ParsedLeadAnalysis":
+        """Converte a resposta estruturada; text fica no mesmo formato da resposta em texto"""
+        sections = {key: getattr(output, key).strip() for key in SECTION_KEYS}
+        text = "\n\n".join(
+            f"=== {SECTION_HEADINGS[key]} ===\n{content}" for key, content in sections.items() if content
+        )
+        return cls(
+            text=text,
+            sections=sections,
+            opportunity_score=output.opportunity_score,
+            potential_value=output.potential_value,
+            close_probability=output.close_probability
+        )
+
+
+def _search(pattern: re.Pattern, section: str, text: str) -> Optional[re.Match]:
+    """Procura primeiro na seção e, se não achar, no texto todo"""
+    return (section and pattern.search(section)) or pattern.search(text)
+
+
+def parse_lead_analysis(response: str) -> ParsedLeadAnalysis:
+    text = strip_code_fence(response)
+    parsed = ParsedLeadAnalysis(text=text)
+
+    current: Optional[str] = None
+    start = position = 0
+    for line in text.split("\n"):
+        line_start, position = position, position + len(line) + 1
+        stripped = line.strip()
+        if not stripped or (stripped[0] not in "=#" and not stripped.endswith(HEADER_ENDINGS)):
+            continue
+        match = HEADER.match(line)
+        if match is None:
+            continue
+        fenced = match.group("fenced")
+        section = SECTION_TITLES.get(normalize_title(fenced or match.group("markdown") or match.group("label")))
+        if section is None and fenced is None:
+            continue
+        if current and not parsed.sections[current]:
+            parsed.sections[current] = text[start:line_start].strip()
+        current, start = section, line_start + len(line)
+    if current and not parsed.sections[current]:
+        parsed.sections[current] = text[start:].strip()
+
+    # Sem nenhuma seção reconhecida, a resposta inteira vira company_info
+    if not any(parsed.sections.values()):
+        parsed.sections["company_info"] = text
+
+    potential = parsed.sections["business_potential"]
+    score = _search(SCORE, potential, text)
+    if score:
+        parsed.opportunity_score = min(int(score.group(1)), 100)
+    value = _search(VALUE, potential, text)
+    if value:
+        parsed.potential_value = parse_amount(value.group(1), value.group(2))
+    probability = _search(PROBABILITY, potential, text)
+    if probability:
+        parsed.close_probability = min(float(probability.group(1).replace(",", ".")), 100.0)
+    return parsed
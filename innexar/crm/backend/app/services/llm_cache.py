@@ -0,0 +1,134 @@
+"""
+Cache de respostas dos modelos de IA usado por call_ai_api
+
+A chave é (provider, modelo, prompt normalizado, max_tokens): prompts que
+diferem apenas em espaços/quebras de linha compartilham a resposta. O cache
+é opt-in por endpoint (parâmetro cache_namespace de call_ai_api), tem TTL,
+limite de itens e de bytes em memória e, opcionalmente, uma camada no
+Redis compartilhada entre workers (LLM_CACHE_REDIS). Chamadas idênticas
+simultâneas aguardam a mesma requisição ao provider.
+"""
+import asyncio
+import hashlib
+import re
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Optional
+from app.core.config import settings
+from app.core.cache import get_redis, TTLCache, KEY_PREFIX
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Colapsa espaços em branco para que variações de formatação gerem a mesma chave"""
+    return _WHITESPACE.sub(" ", prompt).strip()
+
+
+def llm_cache_key(provider: str, model: str, prompt: str, max_tokens: int) -> str:
+    digest = hashlib.sha256(normalize_prompt(prompt).encode()).hexdigest()
+    return f"{provider}:{model}:{max_tokens}:{digest}"
+
+
+class LLMResponseCache:
+    """Cache em memória (+ Redis opcional) com métricas de hit/miss por namespace"""
+
+    def __init__(self):
+        self._local = TTLCache(
+            settings.LLM_CACHE_MAX_ENTRIES,
+            settings.LLM_CACHE_TTL,
+            max_bytes=settings.LLM_CACHE_MAX_BYTES
+        )
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits: Dict[str, int] = defaultdict(int)
+        self.misses: Dict[str, int] = defaultdict(int)
+
+    async def _get(self, key: str) -> Optional[str]:
+        value = self._local.get(key)
+        if value is not None or not settings.LLM_CACHE_REDIS:
+            return value
+        redis = get_redis()
+        if redis is None:
+            return None
+        try:
+            value = await redis.get(f"{KEY_PREFIX}:llm:{key}")
+        except Exception as e:
+            print(f"⚠️ Cache de IA indisponível: {e}")
+            return None
+        if value is not None:
+            self._local.set(key, value, size=len(value.encode()))
+        return value
+
+    async def _set(self, key: str, value: str, ttl: int):
+        self._local.set(key, value, ttl=ttl, size=len(value.encode()))
+        if not settings.LLM_CACHE_REDIS:
+            return
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.set(f"{KEY_PREFIX}:llm:{key}", value, ex=ttl)
+        except Exception as e:
+            print(f"⚠️ Erro ao gravar cache de IA: {e}")
+
+    async def get_or_call(
+        self,
+        namespace: str,
+        key: str,
+        call: Callable[[], Awaitable[str]],
+        ttl: Optional[int] = None
+    ) -> str:
+        """Retorna a resposta em cache ou chama o provider e guarda o resultado"""
+        cached = await self._get(key)
+        if cached is not None:
+            self.hits[namespace] += 1
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits[namespace] += 1
+            return await asyncio.shield(inflight)
+
+        self.misses[namespace] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Evita "exception was never retrieved" quando ninguém aguardava
+            future.exception()
+            raise
+        else:
+            future.set_result(response)
+            if response:
+                await self._set(key, response, ttl or settings.LLM_CACHE_TTL)
+            return response
+        finally:
+            self._inflight.pop(key, None)
+
+    def clear(self):
+        self._local.clear()
+
+    def stats(self) -> Dict[str, object]:
+        namespaces = sorted(set(self.hits) | set(self.misses))
+        by_namespace = {}
+        for namespace in namespaces:
+            hits, misses = self.hits[namespace], self.misses[namespace]
+            by_namespace[namespace] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0
+            }
+        return {
+            "enabled": settings.LLM_CACHE_ENABLED,
+            "entries": len(self._local),
+            "bytes": self._local.total_bytes,
+            "evictions": self._local.evictions,
+            "namespaces": by_namespace
+        }
+
+
+llm_cache = LLMResponseCache()
@@ -0,0 +1,162 @@
+"""
+Manutenção incremental das tabelas de rollup do pipeline
+
+Os caminhos de criação/atualização/remoção de oportunidades e atividades
+capturam o estado antes e depois da mudança e aplicam apenas a diferença
+via upsert, na mesma transação da escrita. rebuild_rollups recalcula tudo
+a partir das tabelas de origem.
+"""
+from sqlalchemy import select, func, delete, literal
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import NamedTuple, Optional
+from decimal import Decimal
+from datetime import datetime
+from app.models.opportunity import Opportunity
+from app.models.activity import Activity
+from app.models.pipeline_rollup import PipelineRollup, ActivityRollup
+
+
+class OpportunityState(NamedTuple):
+    owner_id: int
+    stage: str
+    value: Decimal
+    weighted_value: Decimal
+
+
+class ActivityState(NamedTuple):
+    owner_id: int
+    status: str
+
+
+def opportunity_state(opportunity: Optional[Opportunity]) -> Optional[OpportunityState]:
+    """Captura os campos da oportunidade que alimentam o rollup"""
+    if opportunity is None:
+        return None
+    value = Decimal(str(opportunity.value)) if opportunity.value is not None else Decimal("0")
+    probability = opportunity.probability or 0
+    return OpportunityState(
+        owner_id=opportunity.owner_id,
+        stage=opportunity.stage or "qualificacao",
+        value=value,
+        weighted_value=(value * probability / 100).quantize(Decimal("0.01"))
+    )
+
+
+def activity_state(activity: Optional[Activity]) -> Optional[ActivityState]:
+    """Captura os campos da atividade que alimentam o rollup"""
+    if activity is None:
+        return None
+    return ActivityState(owner_id=activity.owner_id, status=activity.status or "pending")
+
+
+async def _apply_pipeline_delta(db: AsyncSession, state: OpportunityState, sign: int):
+    stmt = insert(PipelineRollup).values(
+        owner_id=state.owner_id,
+        stage=state.stage,
+        opportunity_count=sign,
+        total_value=state.value * sign,
+        weighted_value=state.weighted_value * sign,
+        updated_at=datetime.utcnow()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PipelineRollup.owner_id, PipelineRollup.stage],
+        set_={
+            "opportunity_count": PipelineRollup.opportunity_count + stmt.excluded.opportunity_count,
+            "total_value": PipelineRollup.total_value + stmt.excluded.total_value,
+            "weighted_value": PipelineRollup.weighted_value + stmt.excluded.weighted_value,
+            "updated_at": stmt.excluded.updated_at
+        }
+    )
+    await db.execute(stmt)
+
+
+async def _apply_activity_delta(db: AsyncSession, state: ActivityState, sign: int):
+    stmt = insert(ActivityRollup).values(
+        owner_id=state.owner_id,
+        status=state.status,
+        activity_count=sign,
+        updated_at=datetime.utcnow()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ActivityRollup.owner_id, ActivityRollup.status],
+        set_={
+            "activity_count": ActivityRollup.activity_count + stmt.excluded.activity_count,
+            "updated_at": stmt.excluded.updated_at
+        }
+    )
+    await db.execute(stmt)
+
+
+async def track_opportunity(
+    db: AsyncSession,
+    before: Optional[OpportunityState],
+    after: Optional[OpportunityState]
+):
+    """Aplica no rollup a mudança de uma oportunidade (before=None cria, after=None remove)"""
+    if before == after:
+        return
+    if before is not None:
+        await _apply_pipeline_delta(db, before, -1)
+    if after is not None:
+        await _apply_pipeline_delta(db, after, 1)
+
+
+async def track_activity(
+    db: AsyncSession,
+    before: Optional[ActivityState],
+    after: Optional[ActivityState]
+):
+    """Aplica no rollup a mudança de uma atividade (before=None cria, after=None remove)"""
+    if before == after:
+        return
+    if before is not None:
+        await _apply_activity_delta(db, before, -1)
+    if after is not None:
+        await _apply_activity_delta(db, after, 1)
+
+
+async def rebuild_rollups(db: AsyncSession):
+    """Recalcula todas as tabelas de rollup a partir de opportunities e activities"""
+    await db.execute(delete(PipelineRollup))
+    await db.execute(delete(ActivityRollup))
+
+    value = func.coalesce(Opportunity.value, 0)
+    stage = func.coalesce(Opportunity.stage, "qualificacao")
+    await db.execute(
+        insert(PipelineRollup).from_select(
+            ["owner_id", "stage", "opportunity_count", "total_value", "weighted_value", "updated_at"],
+            select(
+                Opportunity.owner_id,
+                stage,
+                func.count(Opportunity.id),
+                func.sum(value),
+                func.sum(func.round(value * func.coalesce(Opportunity.probability, 0) / 100, 2)),
+                literal(datetime.utcnow())
+            ).group_by(Opportunity.owner_id, stage)
+        )
+    )
+
+    status = func.coalesce(Activity.status, "pending")
+    await db.execute(
+        insert(ActivityRollup).from_select(
+            ["owner_id", "status", "activity_count", "updated_at"],
+            select(
+                Activity.owner_id,
+                status,
+                func.count(Activity.id),
+                literal(datetime.utcnow())
+            ).group_by(Activity.owner_id, status)
+        )
+    )
+    await db.commit()
+
+
+async def ensure_rollups_populated(db: AsyncSession):
+    """Reconstrói os rollups se a tabela estiver vazia mas houver dados (ex.: primeiro deploy)"""
+    has_rollups = await db.scalar(select(PipelineRollup.id).limit(1))
+    if has_rollups is not None:
+        return
+    has_data = await db.scalar(select(Opportunity.id).limit(1)) or await db.scalar(select(Activity.id).limit(1))
+    if has_data is not None:
+        await rebuild_rollups(db)
@@ -0,0 +1,138 @@
+"""
+Busca de contatos e oportunidades (full-text + trigram, sem acentos)
+
+O texto pesquisável de cada tabela é uma expressão normalizada (minúsculas,
+sem acentos via unaccent) indexada duas vezes: GIN com to_tsvector('simple')
+para prefixos de palavras ("joa silv" -> João da Silva) e GIN com pg_trgm
+para erros de digitação e trechos no meio de palavras. O resultado é
+ordenado por ts_rank_cd + word_similarity, com bônus para email exato.
+
+As extensões, a função imutável e os índices são criados pela migração
+0005_search_indexes; check_search_available confirma no startup que eles
+existem. Sem as extensões a busca volta para ILIKE.
+"""
+import re
+from typing import Any, List, Optional, Sequence, Tuple
+from sqlalchemy import bindparam, case, func, literal_column, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncConnection
+from app.models.contact import Contact
+from app.models.opportunity import Opportunity
+
+# Expressões idênticas às dos índices da migração 0005 (o planner só usa o índice se coincidirem)
+CONTACT_SEARCH_TEXT = (
+    "immutable_unaccent(lower(coalesce(contacts.name, '') || ' ' || "
+    "coalesce(contacts.email, '') || ' ' || coalesce(contacts.company, '')))"
+)
+OPPORTUNITY_SEARCH_TEXT = "immutable_unaccent(lower(coalesce(opportunities.name, '')))"
+
+MIN_TRIGRAM_LENGTH = 3
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+_search_available: Optional[bool] = None
+
+
+async def check_search_available(conn: AsyncConnection):
+    """Verifica se a função de busca (e portanto as extensões) existe no banco"""
+    global _search_available
+    result = await conn.execute(text(
+        "SELECT 1 FROM pg_proc WHERE proname = 'immutable_unaccent' "
+        "AND EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')"
+    ))
+    _search_available = result.first() is not None
+    if not _search_available:
+        print("⚠️ Busca full-text indisponível (pg_trgm/unaccent), usando ILIKE")
+
+
+def _prefix_tsquery(term: str) -> Optional[str]:
+    """'João Sil' -> 'joão:* & sil:*' (acentos removidos no banco)"""
+    words = _WORD.findall(term.lower())
+    return " & ".join(f"{word}:*" for word in words) if words else None
+
+
+async def _ranked_search(
+    db: AsyncSession,
+    model: type,
+    search_text: str,
+    term: str,
+    owner_id: Optional[int],
+    limit: int,
+    fuzzy: bool,
+    exact_column: Optional[Any] = None
+) -> List[Tuple[Any, float]]:
+    term = term.strip()
+    tsquery = _prefix_tsquery(term)
+    if not tsquery:
+        return []
+
+    document = literal_column(search_text)
+    vector = literal_column(f"to_tsvector('simple', {search_text})")
+    query_tsq = func.to_tsquery(literal_column("'simple'::regconfig"), func.immutable_unaccent(bindparam("tsquery", tsquery)))
+    normalized = func.immutable_unaccent(func.lower(bindparam("term", term)))
+
+    conditions = [vector.op("@@")(query_tsq)]
+    if fuzzy and len(term) >= MIN_TRIGRAM_LENGTH:
+        # <% : word_similarity acima do limite (pg_trgm.word_similarity_threshold)
+        conditions.append(normalized.op("<%")(document))
+    if exact_column is not None and "@" in term:
+        # O parser 'simple' indexa emails como um único token; lower(email) tem índice próprio
+        conditions.append(func.lower(exact_column) == func.lower(bindparam("term", term)))
+
+    score = func.ts_rank_cd(vector, query_tsq) + func.word_similarity(normalized, document)
+    if exact_column is not None:
+        score = score + case((func.lower(exact_column) == func.lower(bindparam("term", term)), 10), else_=0)
+    score = score.label("score")
+
+    query = select(model, score).where(or_(*conditions))
+    if owner_id is not None:
+        query = query.where(model.owner_id == owner_id)
+    query = query.order_by(score.desc(), model.id).limit(limit)
+
+    result = await db.execute(query)
+    return [(row[0], float(row[1])) for row in result.all()]
+
+
+async def _ilike_search(
+    db: AsyncSession,
+    model: type,
+    columns: Sequence[Any],
+    term: str,
+    owner_id: Optional[int],
+    limit: int
+) -> List[Tuple[Any, float]]:
+    query = select(model).where(or_(*[column.ilike(f"%{term}%") for column in columns]))
+    if owner_id is not None:
+        query = query.where(model.owner_id == owner_id)
+    result = await db.execute(query.order_by(model.id).limit(limit))
+    return [(item, 0.0) for item in result.scalars().all()]
+
+
+async def search_contacts(
+    db: AsyncSession,
+    term: str,
+    owner_id: Optional[int] = None,
+    limit: int = 10,
+    fuzzy: bool = True
+) -> List[Tuple[Contact, float]]:
+    """Contatos por nome/email/empresa, do mais relevante para o menos
+
+    fuzzy=False exige que todas as palavras casem (prefixo), sem similaridade
+    por trigramas; use quando um falso positivo é pior que nenhum resultado.
+    """
+    if _search_available is False:
+        return await _ilike_search(db, Contact, (Contact.name, Contact.email, Contact.company), term, owner_id, limit)
+    return await _ranked_search(
+        db, Contact, CONTACT_SEARCH_TEXT, term, owner_id, limit, fuzzy, exact_column=Contact.email
+    )
+
+
+async def search_opportunities(
+    db: AsyncSession,
+    term: str,
+    owner_id: Optional[int] = None,
+    limit: int = 10,
+    fuzzy: bool = True
+) -> List[Tuple[Opportunity, float]]:
+    """Oportunidades por nome, do mais relevante para o menos"""
+    if _search_available is False:
+        return await _ilike_search(db, Opportunity, (Opportunity.name,), term, owner_id, limit)
+    return await _ranked_search(db, Opportunity, OPPORTUNITY_SEARCH_TEXT, term, owner_id, limit, fuzzy)
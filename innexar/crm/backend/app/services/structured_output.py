@@ -0,0 +1,81 @@
+"""
+Saída estruturada (JSON) dos modelos de IA
+
+call_ai_structured (app/api/ai.py) pede a resposta no JSON Schema de um
+modelo Pydantic usando o recurso nativo de cada provider:
+
+- openai / grok: response_format json_schema
+- anthropic: tool use obrigatório com o schema como input_schema
+- ollama: format com o schema
+- mistral: response_format json_object (schema no prompt)
+- google / cohere: só o schema no prompt
+
+A resposta é validada com o modelo. Se não validar (ou o provider recusar o
+modo estruturado) é levantado StructuredOutputError, e quem chamou decide
+se usa o caminho antigo em texto (AI_STRUCTURED_OUTPUT desliga o modo).
+"""
+import json
+import re
+from functools import lru_cache
+from typing import Any, Dict, Type, TypeVar
+from pydantic import BaseModel, ValidationError
+
+# Providers que recebem o schema na própria requisição (sem repetir no prompt)
+NATIVE_SCHEMA_PROVIDERS = frozenset({"openai", "grok", "anthropic", "ollama"})
+
+CODE_FENCE = re.compile(r"^```[a-zA-Z]*\s*\n?(.*?)\n?```\s*$", re.DOTALL)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class StructuredOutputError(ValueError):
+    """Resposta da IA que não segue o schema pedido (text guarda o que veio)"""
+
+    def __init__(self, message: str, text: str = ""):
+        super().__init__(message)
+        self.text = text
+
+
+@lru_cache(maxsize=None)
+def _schema_json(model: Type[BaseModel]) -> str:
+    return json.dumps(model.model_json_schema(), ensure_ascii=False, sort_keys=True)
+
+
+def output_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """JSON Schema do modelo (gerado uma vez por classe)"""
+    return json.loads(_schema_json(model))
+
+
+def schema_name(schema: Dict[str, Any]) -> str:
+    return re.sub(r"[^a-zA-Z0-9_-]", "_", schema.get("title") or "output")[:64]
+
+
+def schema_instruction(schema: Dict[str, Any]) -> str:
+    """Texto adicionado ao prompt quando o provider não aceita o schema na requisição"""
+    return (
+        "\n\nResponda SOMENTE com um objeto JSON válido, sem markdown nem texto extra, "
+        f"seguindo este JSON Schema:\n{json.dumps(schema, ensure_ascii=False)}"
+    )
+
+
+def parse_structured_output(text: str, model: Type[ModelT]) -> ModelT:
+    """Valida a resposta no modelo; aceita o JSON dentro de ``` ou cercado de texto"""
+    candidate = text.strip()
+    fence = CODE_FENCE.match(candidate)
+    if fence:
+        candidate = fence.group(1).strip()
+    try:
+        return model.model_validate_json(candidate)
+    except ValidationError as e:
+        error = e
+
+    # Texto antes/depois do objeto (ex.: "Segue o JSON: {...}")
+    start, end = candidate.find("{"), candidate.rfind("}") + 1
+    if 0 <= start < end and (start, end) != (0, len(candidate)):
+        try:
+            return model.model_validate_json(candidate[start:end])
+        except ValidationError as e:
+            error = e
+    first = error.errors()[0]
+    location = ".".join(str(part) for part in first["loc"]) or "resposta"
+    raise StructuredOutputError(f"Resposta fora do formato {model.__name__} ({location}: {first['msg']})", text)
@@ -0,0 +1,91 @@
+"""
+Renderização de templates de documentos (propostas, e-mails, contratos)
+
+Cada template é compilado uma única vez (na importação) em uma lista de
+trechos fixos intercalados com os nomes das variáveis; a renderização é
+um único "".join, sem varrer o texto de novo a cada variável. Valores
+informados não são reinterpretados: um "{x}" dentro de um valor fica como
+está.
+
+Templates têm variantes por idioma; idioma sem variante usa o padrão
+("pt"). Documentos renderizados ficam em um LRU (TEMPLATE_CACHE_*) pela
+combinação template + idioma + valores das variáveis usadas.
+"""
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Mapping, Tuple
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+PLACEHOLDER = re.compile(r"\{([^}]+)\}")
+DEFAULT_LANGUAGE = "pt"
+MISSING = {"pt": "[PENDENTE]", "en": "[PENDING]", "es": "[PENDIENTE]"}
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """Template já separado em trechos: literals[i], names[i], literals[i + 1], ..."""
+    literals: Tuple[str, ...]
+    names: Tuple[str, ...]
+    variables: FrozenSet[str]
+
+    def render(self, values: Mapping[str, str], missing: str) -> str:
+        parts = [self.literals[0]]
+        for name, literal in zip(self.names, self.literals[1:]):
+            parts.append(values.get(name, missing))
+            parts.append(literal)
+        return "".join(parts)
+
+
+def compile_template(source: str) -> CompiledTemplate:
+    literals, names = [], []
+    position = 0
+    for match in PLACEHOLDER.finditer(source):
+        literals.append(source[position:match.start()])
+        names.append(match.group(1))
+        position = match.end()
+    literals.append(source[position:])
+    return CompiledTemplate(tuple(literals), tuple(names), frozenset(names))
+
+
+@dataclass(frozen=True)
+class RenderedTemplate:
+    content: str
+    language: str
+    variables_used: Dict[str, Any]
+
+
+class TemplateEngine:
+    """Templates compilados por (tipo, idioma) e cache dos documentos gerados"""
+
+    def __init__(self, templates: Mapping[str, Mapping[str, str]]):
+        self._compiled = {
+            (template_type, language): compile_template(source)
+            for template_type, variants in templates.items()
+            for language, source in variants.items()
+        }
+        self.types = frozenset(templates)
+        self._cache = TTLCache(
+            settings.TEMPLATE_CACHE_SIZE,
+            settings.TEMPLATE_CACHE_TTL,
+            max_bytes=settings.TEMPLATE_CACHE_MAX_BYTES
+        )
+
+    def resolve(self, template_type: str, language: str) -> Tuple[CompiledTemplate, str]:
+        """Template no idioma pedido ou, sem variante, no idioma padrão (KeyError se o tipo não existe)"""
+        template = self._compiled.get((template_type, language))
+        if template is not None:
+            return template, language
+        return self._compiled[(template_type, DEFAULT_LANGUAGE)], DEFAULT_LANGUAGE
+
+    def render(self, template_type: str, language: str, data: Mapping[str, Any]) -> RenderedTemplate:
+        template, language = self.resolve(template_type, language)
+        variables_used = {key: value for key, value in data.items() if key in template.variables}
+        values = {key: str(value) for key, value in variables_used.items()}
+
+        cache_key = (template_type, language, tuple(sorted(values.items())))
+        content = self._cache.get(cache_key)
+        if content is None:
+            content = template.render(values, MISSING.get(language, MISSING[DEFAULT_LANGUAGE]))
+            self._cache.set(cache_key, content, size=len(content))
+        return RenderedTemplate(content=content, language=language, variables_used=variables_used)
@@ -0,0 +1,47 @@
+"""
+Resolução de nomes de usuários em lote
+
+Formatadores de resposta que mostram nomes (responsável, criador, vendedor)
+registram os ids de todas as linhas primeiro e carregam os nomes em uma
+única consulta, em vez de um SELECT por linha:
+
+    names = UserNameResolver(db)
+    names.want(*(goal.creator_id for goal in goals))
+    await names.load()
+    names.get(goal.creator_id)
+"""
+from typing import Dict, Iterable, Optional, Set
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.user import User
+
+
+class UserNameResolver:
+    """Carrega id -> nome para os ids pedidos (só busca os que ainda não conhece)"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._names: Dict[int, Optional[str]] = {}
+        self._pending: Set[int] = set()
+
+    def want(self, *user_ids: Optional[int]) -> "UserNameResolver":
+        for user_id in user_ids:
+            if user_id is not None and user_id not in self._names:
+                self._pending.add(user_id)
+        return self
+
+    async def load(self) -> "UserNameResolver":
+        if self._pending:
+            pending, self._pending = self._pending, set()
+            result = await self.db.execute(select(User.id, User.name).where(User.id.in_(pending)))
+            self._names.update(dict.fromkeys(pending))
+            self._names.update({row.id: row.name for row in result})
+        return self
+
+    def get(self, user_id: Optional[int]) -> Optional[str]:
+        return self._names.get(user_id) if user_id is not None else None
+
+
+async def resolve_user_names(db: AsyncSession, user_ids: Iterable[Optional[int]]) -> UserNameResolver:
+    """Atalho: resolver já carregado com os ids informados"""
+    return await UserNameResolver(db).want(*user_ids).load()
@@ -0,0 +1,36 @@
+"""
+Worker da fila de jobs em background
+
+Uso: python -m app.worker
+"""
+import asyncio
+import signal
+from app.core.database import engine, AsyncSessionLocal
+from app.core.migrations import upgrade_database
+from app.core.cache import close_redis
+from app.core.http_clients import init_http_clients, close_http_clients
+from app.services.jobs import JobWorker
+import app.models  # noqa: F401  (registra todos os modelos)
+import app.api.lead_analysis  # noqa: F401  (registra os handlers lead_analysis e lead_analysis_batch)
+from app.services.goal_progress import ensure_goal_progress_schedule  # registra o handler goal_progress
+
+async def main():
+    await upgrade_database()
+    async with AsyncSessionLocal() as db:
+        await ensure_goal_progress_schedule(db)
+    await init_http_clients()
+    
+    worker = JobWorker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    
+    try:
+        await worker.run()
+    finally:
+        await close_http_clients()
+        await close_redis()
+        await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,12 +1,11 @@
 import asyncio
-from app.core.database import engine, Base
-from app.models import commission
+from app.core.database import engine
+from app.core.migrations import upgrade_database
 
 async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await upgrade_database()
+    await engine.dispose()
     print("Tabelas criadas com sucesso!")
 
 if __name__ == "__main__":
     asyncio.run(init_db())
-